@@ -0,0 +1,108 @@
+"""
+Microbenchmark de classify_text_rules: implementacion original (un re.search
+por patron) vs KeywordMatcher (una sola pasada).
+
+    python -m benchmarks.bench_classifier
+    python -m benchmarks.bench_classifier --json-dir output/tesseract_json --repeat 5
+
+Usa los textos de OUTPUT_DIR/JSON_DIR_NAME (por defecto output/json). Si no hay
+JSONs genera textos sinteticos de ~200 KB con las palabras clave de KEYWORDS.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+from src.classifier_rules import (
+    KEYWORDS,
+    _classify_text_rules_legacy,
+    classify_text_rules,
+)
+
+
+def load_json_texts(json_dir: Path) -> list[str]:
+    texts = []
+    for json_path in sorted(json_dir.glob("*.json")):
+        try:
+            payload = json.loads(json_path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        text = payload.get("text") or ""
+        if isinstance(text, str):
+            texts.append(text)
+    return texts
+
+
+def _pattern_phrase(pattern: str) -> str:
+    return (
+        pattern.replace(r"\b", "").replace(r"\(", "(").replace(r"\)", ")")
+        .replace("[oó]", "ó").replace("[aá]", "a").replace("[eé]", "e")
+    )
+
+
+def synthetic_texts(count: int, size: int, seed: int = 0) -> list[str]:
+    """Textos tipo OCR: relleno en espanol + frases de un solo label por documento."""
+    rng = random.Random(seed)
+    filler = (
+        "el la de que y en los se del las un por con no una su para es al lo como "
+        "pero sus le ha me si sin sobre este ya entre cuando todo esta ser son dos"
+    ).split()
+    labels = list(KEYWORDS)
+    texts = []
+    for i in range(count):
+        phrases = [_pattern_phrase(p) for p in KEYWORDS[labels[i % len(labels)]]]
+        words = []
+        length = 0
+        while length < size:
+            w = rng.choice(phrases) if rng.random() < 0.02 else rng.choice(filler)
+            words.append(w)
+            length += len(w) + 1
+        texts.append(" ".join(words))
+    return texts
+
+
+def _time(fn, texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    output_dir = os.getenv("OUTPUT_DIR") or "output"
+    json_dir_name = (os.getenv("JSON_DIR_NAME") or "json").strip() or "json"
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json-dir", type=Path, default=Path(output_dir) / json_dir_name)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--synthetic", type=int, default=20, help="textos sinteticos si no hay JSONs")
+    parser.add_argument("--size", type=int, default=200_000, help="largo de cada texto sintetico")
+    args = parser.parse_args(argv)
+
+    texts = load_json_texts(args.json_dir) if args.json_dir.exists() else []
+    source = str(args.json_dir)
+    if not texts:
+        texts = synthetic_texts(args.synthetic, args.size)
+        source = f"sintetico ({args.synthetic} x {args.size} chars)"
+
+    mismatches = [
+        i for i, text in enumerate(texts)
+        if classify_text_rules(text) != _classify_text_rules_legacy(text)
+    ]
+    total_chars = sum(len(t) for t in texts)
+    legacy = _time(_classify_text_rules_legacy, texts, args.repeat)
+    matcher = _time(classify_text_rules, texts, args.repeat)
+
+    print(f"Corpus: {source} ({len(texts)} textos, {total_chars / 1e6:.1f} MB)")
+    print(f"- legacy  : {legacy * 1000:.1f} ms ({legacy / len(texts) * 1000:.2f} ms/doc)")
+    print(f"- matcher : {matcher * 1000:.1f} ms ({matcher / len(texts) * 1000:.2f} ms/doc)")
+    print(f"- speedup : {legacy / max(matcher, 1e-9):.1f}x")
+    print(f"- resultados distintos: {len(mismatches)}")
+
+
+if __name__ == "__main__":
+    main()
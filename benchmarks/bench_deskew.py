@@ -0,0 +1,69 @@
+"""
+Benchmark del estimador de inclinacion: metodo original (rotar la imagen por
+cada angulo candidato) vs perfil de proyeccion vectorizado.
+
+    python -m benchmarks.bench_deskew
+    python -m benchmarks.bench_deskew --width 2480 --height 3508 --scale 0.5
+
+Las paginas son sinteticas (ver benchmarks/synthetic.py) con inclinacion conocida.
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic import synthetic_text_page
+from src.ocr_tesseract import (
+    _binarize,
+    _estimate_skew_angle,
+    _estimate_skew_angle_projection,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=2480, help="ancho de pagina (300 DPI A4 = 2480)")
+    parser.add_argument("--height", type=int, default=3508)
+    parser.add_argument("--scale", type=float, default=0.5, help="como TESSERACT_DESKEW_SCALE")
+    parser.add_argument("--max-angle", type=float, default=5.0)
+    parser.add_argument("--step", type=float, default=0.5)
+    parser.add_argument("--threshold", type=int, default=180)
+    args = parser.parse_args(argv)
+
+    angles = [-4.5, -3.0, -1.5, -0.5, 0.0, 1.0, 2.5, 4.0]
+    totals = {"rotate": 0.0, "projection": 0.0}
+    errors = {"rotate": [], "projection": []}
+
+    print(f"Pagina {args.width}x{args.height}, scale={args.scale}, max_angle={args.max_angle}, step={args.step}")
+    for i, skew in enumerate(angles):
+        page = synthetic_text_page(skew, args.width, args.height, seed=i)
+        small = page.resize(
+            (max(1, int(page.width * args.scale)), max(1, int(page.height * args.scale))),
+            Image.BILINEAR,
+        )
+
+        started = time.perf_counter()
+        rotate = _estimate_skew_angle(_binarize(small, args.threshold), args.max_angle, args.step)
+        totals["rotate"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        ink = np.asarray(small) <= args.threshold
+        projection = _estimate_skew_angle_projection(ink, args.max_angle, args.step)
+        totals["projection"] += time.perf_counter() - started
+
+        # el angulo correcto es el que deshace la inclinacion: -skew
+        errors["rotate"].append(abs(rotate + skew))
+        errors["projection"].append(abs(projection + skew))
+        print(f"- skew={skew:+.1f}: rotate={rotate:+.1f} projection={projection:+.1f}")
+
+    for method, total in totals.items():
+        print(
+            f"{method:>10}: {total / len(angles) * 1000:.1f} ms/pagina, "
+            f"error max={max(errors[method]):.2f} grados"
+        )
+    print(f"speedup: {totals['rotate'] / max(totals['projection'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
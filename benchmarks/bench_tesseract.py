@@ -0,0 +1,63 @@
+"""
+Tesseract por pagina (un proceso por pagina, como pytesseract.image_to_string)
+vs una invocacion por lote de paginas con lista de archivos.
+
+    python -m benchmarks.bench_tesseract
+    python -m benchmarks.bench_tesseract --pages 24 --batch-sizes 4,8,24 --dpi 200
+
+Las paginas salen del corpus sintetico (benchmarks/corpus.py), escaneadas sin
+inclinacion. Requiere el binario de tesseract (TESSERACT_CMD o en el PATH).
+Ademas del throughput verifica que el texto por lote sea igual al por pagina.
+"""
+import argparse
+import os
+import random
+import shutil
+import time
+
+from benchmarks.corpus import page_text, scanned_image
+from src.classifier_rules import KEYWORDS
+from src.ocr_tesseract import ocr_image_tesseract, ocr_images_tesseract
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=16)
+    parser.add_argument("--batch-sizes", default="4,16")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--words", type=int, default=80, help="palabras por pagina (paginas cortas = mas costo de arranque)")
+    parser.add_argument("--lang", default=os.getenv("TESSERACT_LANG") or "spa")
+    args = parser.parse_args(argv)
+
+    if not (os.getenv("TESSERACT_CMD") or shutil.which("tesseract")):
+        print("No se encontro tesseract (TESSERACT_CMD o PATH); no hay nada que medir.")
+        return
+
+    rng = random.Random(0)
+    labels = list(KEYWORDS)
+    pages = [
+        scanned_image(page_text(labels[i % len(labels)], rng, args.words), args.dpi, 0.0, 0.0, i)
+        for i in range(args.pages)
+    ]
+    print(f"{len(pages)} paginas a {args.dpi} DPI, lang={args.lang}")
+
+    started = time.perf_counter()
+    expected = [ocr_image_tesseract(page, lang=args.lang) for page in pages]
+    base = time.perf_counter() - started
+    print(f"- por pagina : {len(pages) / base:.2f} pages/s")
+
+    for size in [int(s) for s in args.batch_sizes.split(",") if s.strip()]:
+        started = time.perf_counter()
+        texts = []
+        for start in range(0, len(pages), size):
+            texts.extend(ocr_images_tesseract(pages[start:start + size], lang=args.lang))
+        elapsed = time.perf_counter() - started
+        same = sum(1 for a, b in zip(texts, expected) if a == b)
+        print(
+            f"- lote de {size:<3}: {len(pages) / elapsed:.2f} pages/s "
+            f"({base / elapsed:.2f}x), texto igual en {same}/{len(pages)} paginas"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Throughput del backend de Vision contra un anotador falso con latencia fija
+(sin red): request por pagina vs batches + requests concurrentes.
+
+    python -m benchmarks.bench_vision --pages 64 --latency 0.2
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import src.ocr_vision as ocr_vision
+from benchmarks.fake_vision import FakeAnnotator
+
+
+def run(pages: int, latency: float, batch_size: int, workers: int, max_in_flight: int) -> tuple[float, FakeAnnotator]:
+    os.environ["VISION_MAX_IN_FLIGHT"] = str(max_in_flight)
+    ocr_vision._in_flight = None
+    fake = FakeAnnotator(latency=latency)
+    ocr_vision.set_client(fake)
+
+    images = [f"pagina {i}".encode() for i in range(pages)]
+    batches = [images[i:i + batch_size] for i in range(0, pages, batch_size)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda b: ocr_vision.ocr_images_vision(b, batch_size=batch_size), batches))
+    elapsed = time.perf_counter() - started
+    assert [t for batch in results for t in batch] == [i.decode() for i in images]
+    return elapsed, fake
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2, help="segundos por request")
+    args = parser.parse_args(argv)
+
+    scenarios = [
+        ("1 pagina/request, secuencial", 1, 1, 1),
+        ("batch 8, secuencial", 8, 1, 1),
+        ("batch 8, 4 en vuelo", 8, 4, 4),
+        ("batch 16, 4 en vuelo", 16, 4, 4),
+    ]
+    for name, batch_size, workers, in_flight in scenarios:
+        elapsed, fake = run(args.pages, args.latency, batch_size, workers, in_flight)
+        print(
+            f"- {name:<30} {args.pages / elapsed:7.1f} pages/s "
+            f"({fake.calls} requests, max en vuelo {fake.max_in_flight})"
+        )
+
+
+if __name__ == "__main__":
+    main()
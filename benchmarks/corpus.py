@@ -0,0 +1,154 @@
+"""
+Corpus sintetico de PDFs, reproducible y sin red, para benchmarks.
+
+Por cada label de KEYWORDS genera:
+- text: PDF con texto seleccionable (va por texto embebido, sin OCR).
+- scan: paginas rasterizadas como imagen con inclinacion y ruido controlados.
+- mixed: primera pagina con texto y el resto escaneadas.
+
+    python -m benchmarks.corpus --out bench_corpus --docs-per-label 2 --pages 3
+
+Deja un corpus.json con label esperado, tipo, paginas e inclinacion de cada PDF.
+Con la misma semilla los PDFs y sus paginas renderizadas son identicos.
+"""
+import argparse
+import json
+import random
+from io import BytesIO
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+from PIL import Image
+
+from benchmarks.bench_classifier import _pattern_phrase
+from src.classifier_rules import KEYWORDS
+
+KINDS = ("text", "scan", "mixed")
+A4 = (595, 842)
+
+_FILLER = (
+    "el la de que y en los se del las un por con no una su para es al lo como "
+    "pero sus le ha me si sin sobre este ya entre cuando todo esta ser son dos "
+    "fecha nombre domicilio documento empresa firma santiago region numero"
+).split()
+
+
+def page_text(label: str, rng: random.Random, words: int = 260) -> str:
+    """Texto de una pagina: relleno en espanol con frases de un solo label."""
+    phrases = [_pattern_phrase(p) for p in KEYWORDS[label]]
+    out = [rng.choice(phrases)]
+    while len(out) < words:
+        out.append(rng.choice(phrases) if rng.random() < 0.04 else rng.choice(_FILLER))
+    return " ".join(out)
+
+
+def _add_text_page(doc: "fitz.Document", text: str) -> None:
+    page = doc.new_page(width=A4[0], height=A4[1])
+    page.insert_textbox(fitz.Rect(50, 50, A4[0] - 50, A4[1] - 50), text, fontsize=11, fontname="helv")
+
+
+def scanned_image(text: str, dpi: int, skew: float, noise: float, seed: int) -> Image.Image:
+    """Pagina de texto rasterizada, rotada `skew` grados y con ruido sal y pimienta."""
+    tmp = fitz.open()
+    _add_text_page(tmp, text)
+    zoom = dpi / 72.0
+    pix = tmp[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    tmp.close()
+    if skew:
+        img = img.rotate(skew, resample=Image.BICUBIC, expand=False, fillcolor=255)
+    if noise:
+        arr = np.array(img)
+        rng = np.random.default_rng(seed)
+        mask = rng.random(arr.shape) < noise
+        arr[mask] = np.where(rng.random(int(mask.sum())) < 0.5, 0, 255)
+        img = Image.fromarray(arr)
+    return img
+
+
+def _add_scanned_page(doc: "fitz.Document", img: Image.Image) -> None:
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    page = doc.new_page(width=A4[0], height=A4[1])
+    page.insert_image(page.rect, stream=buf.getvalue())
+
+
+def build_pdf(
+    path: Path,
+    label: str,
+    kind: str,
+    pages: int,
+    seed: int,
+    dpi: int = 150,
+    max_skew: float = 4.0,
+    noise: float = 0.01,
+) -> dict:
+    rng = random.Random(seed)
+    skew = round(rng.uniform(-max_skew, max_skew), 1) if kind != "text" else 0.0
+    doc = fitz.open()
+    for n in range(pages):
+        text = page_text(label, rng)
+        if kind == "text" or (kind == "mixed" and n == 0):
+            _add_text_page(doc, text)
+        else:
+            _add_scanned_page(doc, scanned_image(text, dpi, skew, noise, seed * 1000 + n))
+    # metadata fija: sin fechas de creacion el archivo es identico entre corridas
+    doc.set_metadata({"producer": "benchmarks.corpus", "creator": "benchmarks.corpus"})
+    doc.save(str(path), garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return {"file": path.name, "label": label, "kind": kind, "pages": pages, "skew": skew, "noise": noise if kind != "text" else 0.0}
+
+
+def generate_corpus(
+    out_dir: str | Path,
+    docs_per_label: int = 1,
+    pages: int = 3,
+    kinds: tuple[str, ...] = KINDS,
+    seed: int = 0,
+    dpi: int = 150,
+    max_skew: float = 4.0,
+    noise: float = 0.01,
+) -> list[dict]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    docs = []
+    n = 0
+    for label in KEYWORDS:
+        for kind in kinds:
+            for i in range(docs_per_label):
+                path = out_dir / f"{label.lower()}_{kind}_{i:02d}.pdf"
+                docs.append(build_pdf(path, label, kind, pages, seed + n, dpi, max_skew, noise))
+                n += 1
+    (out_dir / "corpus.json").write_text(json.dumps(docs, ensure_ascii=False, indent=2), encoding="utf-8")
+    return docs
+
+
+def load_corpus(out_dir: str | Path) -> list[dict]:
+    return json.loads((Path(out_dir) / "corpus.json").read_text(encoding="utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", type=Path, default=Path("bench_corpus"))
+    parser.add_argument("--docs-per-label", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--kinds", default=",".join(KINDS), help="text,scan,mixed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dpi", type=int, default=150, help="resolucion de las paginas escaneadas")
+    parser.add_argument("--max-skew", type=float, default=4.0)
+    parser.add_argument("--noise", type=float, default=0.01, help="fraccion de pixeles con ruido")
+    args = parser.parse_args(argv)
+
+    kinds = tuple(k.strip() for k in args.kinds.split(",") if k.strip())
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"tipos desconocidos: {', '.join(sorted(unknown))}")
+    docs = generate_corpus(
+        args.out, args.docs_per_label, args.pages, kinds, args.seed, args.dpi, args.max_skew, args.noise
+    )
+    print(f"{len(docs)} PDFs en {args.out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
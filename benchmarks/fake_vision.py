@@ -0,0 +1,64 @@
+"""
+Anotador falso con la interfaz de vision.ImageAnnotatorClient.batch_annotate_images,
+para probar batching, concurrencia y reintentos sin red ni credenciales.
+"""
+import threading
+import time
+
+from google.api_core import exceptions as gexc
+from google.cloud import vision
+
+
+class FakeAnnotator:
+    """
+    Devuelve como texto el contenido de cada imagen (decodificado) despues de
+    `latency` segundos por request. Las primeras `fail_calls` llamadas fallan
+    con `fail_exc`; `image_errors` mapea contenido -> veces que esa imagen
+    responde con un error transitorio (RESOURCE_EXHAUSTED) dentro del batch.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_calls: int = 0, fail_exc=gexc.ResourceExhausted,
+                 image_errors: dict | None = None):
+        self.latency = latency
+        self.fail_calls = fail_calls
+        self.fail_exc = fail_exc
+        self.image_errors = dict(image_errors or {})
+        self.calls = 0
+        self.images = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def batch_annotate_images(self, requests):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.fail_calls > 0
+            if fail:
+                self.fail_calls -= 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise self.fail_exc("fake quota exceeded")
+            responses = []
+            for req in requests:
+                content = bytes(req.image.content)
+                with self._lock:
+                    self.images += 1
+                    errors_left = self.image_errors.get(content, 0)
+                    if errors_left:
+                        self.image_errors[content] = errors_left - 1
+                if errors_left:
+                    responses.append(vision.AnnotateImageResponse(
+                        error={"code": 8, "message": "fake per-image quota"}
+                    ))
+                    continue
+                responses.append(vision.AnnotateImageResponse(
+                    full_text_annotation=vision.TextAnnotation(text=content.decode("utf-8", "replace"))
+                ))
+            return vision.BatchAnnotateImagesResponse(responses=responses)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
@@ -0,0 +1,289 @@
+"""
+Suite de benchmarks por etapa y end-to-end sobre el corpus sintetico
+(benchmarks/corpus.py). Todo corre offline; el end-to-end usa solo Tesseract.
+
+    python -m benchmarks.run                       # compara con benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline       # guarda los resultados como baseline
+    python -m benchmarks.run --stages classify,deskew --tolerance 0.3
+
+Cada etapa se mide `--repeat` veces y se guarda el mejor tiempo en ms por item
+(pagina o documento). Una etapa es regresion si su ms/item supera el del
+baseline en mas de `--tolerance` (fraccion); en ese caso el comando sale con 1.
+Los tiempos dependen de la maquina: el baseline es de la maquina donde se guardo.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.corpus import generate_corpus
+from src.classifier_rules import classify_text_rules
+from src.ocr_tesseract import (
+    _binarize,
+    _estimate_skew_angle,
+    _estimate_skew_angle_projection,
+    preprocess_image,
+    preprocess_params,
+)
+from src.pdf_utils import extract_embedded_text, pdf_pages_as_png_bytes, pdf_pages_as_rasters
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Bench:
+    def __init__(self, corpus_dir: Path, docs: list[dict], dpi: int, repeat: int):
+        self.corpus_dir = corpus_dir
+        self.docs = docs
+        self.dpi = dpi
+        self.repeat = repeat
+        self._images = None
+        self._temp_dirs: list[Path] = []
+
+    def _mkdtemp(self, prefix: str) -> Path:
+        """Carpeta temporal que se borra en cleanup() (run_stages la llama al terminar)."""
+        path = Path(tempfile.mkdtemp(prefix=prefix))
+        self._temp_dirs.append(path)
+        return path
+
+    def cleanup(self) -> None:
+        while self._temp_dirs:
+            shutil.rmtree(self._temp_dirs.pop(), ignore_errors=True)
+
+    def paths(self, *kinds: str) -> list[str]:
+        return [str(self.corpus_dir / d["file"]) for d in self.docs if d["kind"] in kinds]
+
+    def scanned_images(self) -> list[Image.Image]:
+        if self._images is None:
+            self._images = []
+            for path in self.paths("scan"):
+                for raster in pdf_pages_as_rasters(path, self.dpi):
+                    self._images.append(raster.image().copy())
+        return self._images
+
+    def render_png(self):
+        paths = self.paths("scan", "mixed")
+        pages = sum(1 for p in paths for _ in pdf_pages_as_png_bytes(p, self.dpi))
+        return pages, lambda: [None for p in paths for _ in pdf_pages_as_png_bytes(p, self.dpi)]
+
+    def render_raster(self):
+        paths = self.paths("scan", "mixed")
+        pages = sum(1 for p in paths for _ in pdf_pages_as_rasters(p, self.dpi))
+        return pages, lambda: [r.width for p in paths for r in pdf_pages_as_rasters(p, self.dpi)]
+
+    def preprocess(self):
+        images = self.scanned_images()
+        params = preprocess_params()
+        return len(images), lambda: [preprocess_image(img, params) for img in images]
+
+    def _deskew_inputs(self):
+        params = preprocess_params()
+        scale = params["deskew_scale"]
+        small = [
+            img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.BILINEAR)
+            for img in self.scanned_images()
+        ]
+        return small, params
+
+    def deskew_projection(self):
+        small, p = self._deskew_inputs()
+        return len(small), lambda: [
+            _estimate_skew_angle_projection(np.asarray(img) <= p["threshold"], p["deskew_max_angle"], p["deskew_step"])
+            for img in small
+        ]
+
+    def deskew_rotate(self):
+        small, p = self._deskew_inputs()
+        return len(small), lambda: [
+            _estimate_skew_angle(_binarize(img, p["threshold"]), p["deskew_max_angle"], p["deskew_step"])
+            for img in small
+        ]
+
+    def classify(self):
+        texts = [extract_embedded_text(p) for p in self.paths("text", "mixed")]
+        return len(texts), lambda: [classify_text_rules(t) for t in texts]
+
+    def process_json(self):
+        from src import process_json
+
+        texts = [extract_embedded_text(p) for p in self.paths("text", "mixed")]
+        out = self._mkdtemp("bench_json_")
+        json_dir = out / "json"
+        json_dir.mkdir()
+        for i, text in enumerate(texts):
+            (json_dir / f"doc_{i:04d}.json").write_text(json.dumps({"text": text}, ensure_ascii=False), encoding="utf-8")
+
+        def run():
+            # sin indice de busqueda: la etapa mide la reclasificacion, comparable con el baseline
+            env = {"OUTPUT_DIR": str(out), "JSON_DIR_NAME": "json", "STORE_BACKEND": "files", "SEARCH_INDEX": "0"}
+            saved = {k: os.environ.get(k) for k in env}
+            os.environ.update(env)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    process_json.main(["--force", "--workers", "1"])
+            finally:
+                for k, v in saved.items():
+                    if v is None:
+                        os.environ.pop(k, None)
+                    else:
+                        os.environ[k] = v
+
+        return len(texts), run
+
+    def end_to_end(self):
+        """src.main con Tesseract en un subproceso (config lee el entorno al importar)."""
+        if not shutil.which("tesseract"):
+            return None
+        pages = sum(d["pages"] for d in self.docs)
+        input_dir = self.corpus_dir
+
+        def run():
+            out = tempfile.mkdtemp(prefix="bench_e2e_")
+            env = dict(
+                os.environ,
+                OCR_ENGINE="tesseract",
+                INPUT_DIR=str(input_dir),
+                OUTPUT_DIR=out,
+                OCR_DPI=str(self.dpi),
+                OCR_CACHE="0",
+                METRICS_FILE="",
+                METRICS_PROM_FILE="",
+            )
+            try:
+                subprocess.run(
+                    [sys.executable, "-m", "src.main", "--force"],
+                    cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+                )
+            finally:
+                shutil.rmtree(out, ignore_errors=True)
+
+        return pages, run
+
+
+STAGES = (
+    "render_png",
+    "render_raster",
+    "preprocess",
+    "deskew_projection",
+    "deskew_rotate",
+    "classify",
+    "process_json",
+    "end_to_end",
+)
+
+
+def run_stages(bench: Bench, stages) -> dict:
+    results = {}
+    for name in stages:
+        try:
+            prepared = getattr(bench, name)()
+            if prepared is None:
+                print(f"- {name:<18} omitido (no hay binario de tesseract)")
+                continue
+            items, fn = prepared
+            seconds = _best(fn, bench.repeat)
+        finally:
+            bench.cleanup()
+        results[name] = {
+            "items": items,
+            "seconds": round(seconds, 6),
+            "ms_per_item": round(seconds / max(items, 1) * 1000, 4),
+        }
+        print(f"- {name:<18} {results[name]['ms_per_item']:>10.3f} ms/item ({items} items, {seconds:.3f}s)")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Etapas cuyo ms/item empeoro mas de `tolerance` respecto del baseline."""
+    regressions = []
+    for name, current in results.items():
+        base = (baseline.get("stages") or {}).get(name)
+        if not base or not base.get("ms_per_item"):
+            continue
+        ratio = current["ms_per_item"] / base["ms_per_item"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {base['ms_per_item']:.3f} -> {current['ms_per_item']:.3f} ms/item ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=Path, default=None, help="carpeta del corpus (default: temporal)")
+    parser.add_argument("--docs-per-label", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, default=None, help="guarda los resultados en este JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"etapas desconocidas: {', '.join(sorted(unknown))}")
+
+    corpus_dir = args.corpus or Path(tempfile.mkdtemp(prefix="bench_corpus_"))
+    docs = generate_corpus(corpus_dir, args.docs_per_label, args.pages, dpi=args.dpi)
+    print(f"Corpus: {len(docs)} PDFs en {corpus_dir} (dpi={args.dpi}, repeat={args.repeat})")
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "docs": len(docs),
+            "pages_per_doc": args.pages,
+            "dpi": args.dpi,
+        },
+        "stages": run_stages(Bench(corpus_dir, docs, args.dpi, args.repeat), stages),
+    }
+    if args.corpus is None:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline guardado en {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Sin baseline en {args.baseline}; usar --save-baseline")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results["stages"], baseline, args.tolerance)
+    if regressions:
+        print(f"REGRESIONES (> {args.tolerance:.0%} vs baseline):")
+        for line in regressions:
+            print(f"- {line}")
+        return 1
+    print(f"Sin regresiones (tolerancia {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Paginas sinteticas para benchmarks y tests (sin OCR ni red)."""
+import random
+
+from PIL import Image, ImageDraw
+
+
+def synthetic_text_page(
+    angle: float = 0.0,
+    width: int = 1240,
+    height: int = 1754,
+    seed: int = 0,
+) -> Image.Image:
+    """
+    Pagina en escala de grises con "lineas de texto" (bloques negros de largo
+    variable, interlineado fijo) rotada `angle` grados en sentido antihorario.
+    """
+    rng = random.Random(seed)
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    margin = max(10, width // 12)
+    line_height = max(4, height // 120)
+    y = margin
+    while y < height - margin:
+        x = margin
+        while x < width - margin - line_height * 8:
+            word = rng.randint(line_height * 2, line_height * 6)
+            draw.rectangle([x, y, x + word, y + line_height], fill=0)
+            x += word + rng.randint(line_height, line_height * 2)
+        y += line_height * 3
+    if angle:
+        img = img.rotate(angle, resample=Image.BICUBIC, expand=False, fillcolor=255)
+    return img
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import re
 from dataclasses import dataclass
 
@@ -100,21 +102,230 @@ WEIGHTS = {
 }
 
 
+COMPROBANTE_OVERRIDES = [
+    r"\bcomprobante de registro\b",
+]
+
+DEFAULT_THRESHOLD = 0.12
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# escapes en mayuscula (\B, \W, \S...) o grupos/flags inline cambian de sentido al pasar a minuscula
+_CASE_SENSITIVE_SYNTAX_RE = re.compile(r"\\[A-Z]|\(\?")
+
+
 def normalize(text: str) -> str:
     text = text.lower()
-    text = re.sub(r"\s+", " ", text)
+    text = _WHITESPACE_RE.sub(" ", text)
     return text
 
-def classify_text_rules(text: str, threshold: float = 0.12) -> ClassificationResult:
+
+def _first_chars(pattern: str) -> set[str] | None:
+    """
+    Caracteres con los que puede empezar un match del patron (ya en minuscula),
+    o None si no se puede saber con certeza (el patron se prueba en cada hit).
+    Solo entiende lo que usan las tablas: \\b inicial + letra o clase [..] simple.
+    """
+    body = pattern[2:] if pattern.startswith(r"\b") else pattern
+    if not body:
+        return None
+    head = body[0]
+    if head.isalnum():
+        return {head.lower()}
+    if head == "[" and "]" in body:
+        members = body[1:body.index("]")]
+        if members and all(ch.isalnum() for ch in members):
+            return {ch.lower() for ch in members}
+    return None
+
+
+class KeywordMatcher:
+    """
+    Automata de una sola pasada sobre las tablas KEYWORDS/WEIGHTS.
+
+    Todos los patrones se combinan en una alternancia precedida por una clase con
+    sus posibles primeros caracteres, asi el motor de `re` salta en C hasta el
+    proximo candidato. En cada hit se prueban (con .match en esa posicion) los
+    patrones aun no encontrados que empiezan con ese caracter, y la busqueda sigue
+    desde hit + 1 para no perder matches solapados ("se deja constancia" /
+    "constancia"). El resultado es el mismo conjunto de patrones que daria un
+    re.search por patron.
+    """
+
+    def __init__(self, keywords: dict, weights: dict, overrides: list[str]):
+        self.keywords = {label: list(patterns) for label, patterns in keywords.items()}
+        self.overrides = list(overrides)
+
+        # pesos y total por label precalculados en el mismo orden que el original
+        self.weights = {}
+        self.total_weights = {}
+        for label, patterns in self.keywords.items():
+            label_weights = weights.get(label, {})
+            total = 0.0
+            for p in patterns:
+                total += float(label_weights.get(p, 1.0))
+            self.weights[label] = {p: float(label_weights.get(p, 1.0)) for p in patterns}
+            self.total_weights[label] = total
+
+        unique = list(dict.fromkeys(self.overrides + [p for ps in self.keywords.values() for p in ps]))
+        self.compiled = {p: re.compile(p, flags=re.IGNORECASE) for p in unique}
+
+        self.buckets: dict[str, list[str]] = {}
+        self.wildcard: list[str] = []
+        first_chars = set()
+        for p in unique:
+            chars = _first_chars(p)
+            if chars is None:
+                self.wildcard.append(p)
+                continue
+            first_chars |= chars
+            for ch in chars:
+                self.buckets.setdefault(ch, []).append(p)
+
+        charset = ""
+        if first_chars and not self.wildcard:
+            charset = "".join(sorted(re.escape(ch) for ch in first_chars))
+
+        def _alternation(sources):
+            alternation = "|".join(f"(?:{p})" for p in sources)
+            return f"(?=[{charset}])(?:{alternation})" if charset else alternation
+
+        self.combined = re.compile(_alternation(unique), flags=re.IGNORECASE)
+        # Sobre texto ya en minuscula el prefiltro sin IGNORECASE es ~3x mas rapido;
+        # solo se arma si bajar los patrones a minuscula no cambia su significado.
+        self.lower_prefilter = None
+        if not any(_CASE_SENSITIVE_SYNTAX_RE.search(p) for p in unique):
+            self.lower_prefilter = re.compile(_alternation(p.lower() for p in unique))
+
+    def find(self, t: str) -> set[str]:
+        """Patrones (fuente) que aparecen en el texto normalizado `t`."""
+        found = set()
+        remaining = len(self.compiled)
+        pos = 0
+        search = self.combined.search
+        # t.upper().lower() == t descarta mayusculas y caracteres con equivalencias
+        # especiales de IGNORECASE (ſ, ı, ς...), donde el prefiltro en minuscula podria
+        # saltarse un match. Los candidatos siempre se validan con el patron original.
+        if self.lower_prefilter is not None and t.upper().lower() == t:
+            search = self.lower_prefilter.search
+        while remaining:
+            m = search(t, pos)
+            if m is None:
+                break
+            start = m.start()
+            candidates = self.buckets.get(t[start])
+            if candidates is None:
+                # caracter fuera de las tablas (p.ej. equivalencias unicode de IGNORECASE)
+                candidates = self.compiled
+            for p in (*candidates, *self.wildcard):
+                if p not in found and self.compiled[p].match(t, start):
+                    found.add(p)
+                    remaining -= 1
+            if any(p in found for p in self.overrides):
+                break
+            pos = start + 1
+        return found
+
+    def label_scores(self, found: set[str]) -> list[tuple[str, float, list[str]]]:
+        """(label, score, evidencia) por label, en el orden de KEYWORDS."""
+        scores = []
+        for label, patterns in self.keywords.items():
+            matches = [p for p in patterns if p in found]
+            weights = self.weights[label]
+            score = sum(weights[p] for p in matches) / max(1.0, self.total_weights[label])
+            scores.append((label, score, matches))
+        return scores
+
+    def classify_found(self, found: set[str], threshold: float) -> ClassificationResult:
+        for p in self.overrides:
+            if p in found:
+                return ClassificationResult("comprobantes", 1.0, [p])
+
+        best_label = "Desconocido"
+        best_score = 0.0
+        best_evidence = []
+
+        for label, score, matches in self.label_scores(found):
+            if score > best_score:
+                best_score = score
+                best_label = label
+                best_evidence = matches
+
+        if best_score < threshold:
+            return ClassificationResult("Desconocido", best_score, best_evidence)
+
+        return ClassificationResult(best_label, best_score, best_evidence)
+
+    def classify(self, t: str, threshold: float) -> ClassificationResult:
+        return self.classify_found(self.find(t), threshold)
+
+
+_MATCHER = KeywordMatcher(KEYWORDS, WEIGHTS, COMPROBANTE_OVERRIDES)
+
+# subir si cambia la logica de clasificacion (normalize, scoring) sin cambiar las tablas
+_RULES_SCHEMA = 1
+
+
+def rules_fingerprint(
+    keywords: dict = KEYWORDS,
+    weights: dict = WEIGHTS,
+    overrides: list = COMPROBANTE_OVERRIDES,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> str:
+    """Hash corto de las tablas de reglas: cambia si cambia cualquier patron, peso o umbral."""
+    data = json.dumps(
+        {
+            "schema": _RULES_SCHEMA,
+            "keywords": keywords,
+            "weights": weights,
+            "overrides": overrides,
+            "threshold": threshold,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:12]
+
+
+RULES_VERSION = rules_fingerprint()
+
+
+def classify_text_rules(text: str, threshold: float = DEFAULT_THRESHOLD) -> ClassificationResult:
     """
     score = matches / total_keywords (por categoría). Simple y efectivo para partir.
     threshold: mínimo para no quedar en Desconocido
     """
+    return _MATCHER.classify(normalize(text), threshold)
+
+
+def is_decisive(
+    text: str,
+    min_score: float,
+    min_margin: float,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> bool:
+    """
+    True si el texto ya alcanza para clasificar: un override, o un label con
+    score >= min_score (y >= threshold) y al menos min_margin sobre el segundo.
+    Se usa para cortar el OCR de documentos largos apenas el label queda claro.
+    """
+    found = _MATCHER.find(normalize(text))
+    if any(p in found for p in _MATCHER.overrides):
+        return True
+    scores = sorted((score for _, score, _ in _MATCHER.label_scores(found)), reverse=True)
+    if not scores:
+        return False
+    best = scores[0]
+    runner_up = scores[1] if len(scores) > 1 else 0.0
+    return best >= max(min_score, threshold) and best - runner_up >= min_margin
+
+
+def _classify_text_rules_legacy(text: str, threshold: float = DEFAULT_THRESHOLD) -> ClassificationResult:
+    """
+    Implementacion original (un re.search por patron). Se mantiene como
+    referencia para los tests de equivalencia y el benchmark.
+    """
     t = normalize(text)
-    comprobante_overrides = [
-        r"\bcomprobante de registro\b",
-    ]
-    for p in comprobante_overrides:
+    for p in COMPROBANTE_OVERRIDES:
         if re.search(p, t, flags=re.IGNORECASE):
             return ClassificationResult("comprobantes", 1.0, [p])
     best_label = "Desconocido"
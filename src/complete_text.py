@@ -0,0 +1,132 @@
+"""
+Pasada diferida de texto completo para documentos clasificados con early exit
+(CLASSIFY_EARLY_EXIT=1): hace OCR de las paginas en "pending_pages" de cada
+JSON, las intercala en el texto en orden de pagina y reclasifica con el texto
+completo (score y evidencia dejan de ser los del early exit). Si el label
+cambia, el PDF clasificado se mueve a la carpeta nueva.
+
+    python -m src.complete_text
+"""
+import os
+import re
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+from src.classifier_rules import RULES_VERSION, classify_text_rules
+from src.config import INPUT_DIR, OCR_ENGINE, OUTPUT_DIR, STORE_BACKEND, STORE_BATCH_SIZE, validate
+from src.corpus_store import open_store
+from src.daemon import WORK_DIR_NAME
+from src.main import get_json_dir_name, open_search_index
+from src.manifest import Manifest
+
+_PAGE_MARKER_RE = re.compile(r"^--- PAGE (\d+) ---$", re.MULTILINE)
+
+
+def split_pages(text: str) -> dict[int, str]:
+    """Texto con marcadores --- PAGE n --- -> {n: texto de la pagina}."""
+    pages = {}
+    markers = list(_PAGE_MARKER_RE.finditer(text))
+    for i, m in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages[int(m.group(1))] = text[m.end():end].strip()
+    return pages
+
+
+def join_pages(pages: dict[int, str]) -> str:
+    return "\n".join(f"\n--- PAGE {n} ---\n{t}" for n, t in sorted(pages.items()) if t).strip()
+
+
+def find_source(file_name: str, manifest: Manifest | None = None) -> Path | None:
+    """
+    PDF original de un documento: donde lo registro el manifest (el daemon lo
+    archiva en INPUT_DIR/.daemon/done), en INPUT_DIR o en .daemon/done.
+    """
+    in_dir = Path(INPUT_DIR)
+    found = [in_dir / file_name, in_dir / WORK_DIR_NAME / "done" / file_name]
+    record = manifest.find_by_name(file_name, OCR_ENGINE) if manifest is not None else None
+    if record:
+        found.insert(0, Path(record["path"]))
+    return next((path for path in found if path.exists()), None)
+
+
+def complete_payload(payload: dict, pdf_path: Path) -> bool:
+    pending = payload.get("pending_pages") or []
+    if not pending:
+        return False
+
+    from src.extract_text import extract_pdf
+
+    extraction = extract_pdf(str(pdf_path), only_pages=set(pending))
+    pages_text = split_pages(payload.get("text") or "")
+    pages_text.update(split_pages(extraction.text))
+
+    info = {p["page"]: p for p in payload.get("pages") or []}
+    info.update({p.page: asdict(p) for p in extraction.pages})
+
+    payload["text"] = join_pages(pages_text)
+    payload["pages"] = [info[n] for n in sorted(info)]
+    payload["blank_pages"] = [n for n in sorted(info) if info[n].get("source") == "blank"]
+    payload["pending_pages"] = extraction.pending_pages
+    payload["text_complete"] = not extraction.pending_pages
+    payload["completed_at"] = datetime.now().isoformat(timespec="seconds")
+
+    result = classify_text_rules(payload["text"])
+    payload["label"] = result.label
+    payload["score"] = result.score
+    payload["evidence"] = result.evidence
+    payload["rules_version"] = RULES_VERSION
+    payload["classified_at"] = payload["completed_at"]
+    return True
+
+
+def move_classified(file_name: str, old_label: str | None, new_label: str) -> None:
+    """Mueve OUTPUT_DIR/classified/<old_label>/<file> a la carpeta del label nuevo, si estaba."""
+    classified = Path(OUTPUT_DIR) / "classified"
+    src = classified / (old_label or "Desconocido") / file_name
+    if not os.path.lexists(src):
+        return
+    dest = classified / new_label / file_name
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(src, dest)
+
+
+def main():
+    validate()
+    store = open_store(STORE_BACKEND, OUTPUT_DIR, get_json_dir_name(), STORE_BATCH_SIZE)
+    index = open_search_index(OUTPUT_DIR, get_json_dir_name())
+    manifest_path = Path(OUTPUT_DIR) / "manifest.sqlite"
+    manifest = Manifest(manifest_path) if manifest_path.exists() else None
+    completed = 0
+    for name, payload in store.iter_payloads():
+        try:
+            if not payload.get("pending_pages"):
+                continue
+            pdf_path = find_source(payload["file"], manifest)
+            if pdf_path is None:
+                print(f"[SKIP] {name}: no se encontro {payload['file']} en {INPUT_DIR}")
+                continue
+            print(f"[START] {name}: {len(payload['pending_pages'])} paginas pendientes")
+            old_label = payload.get("label")
+            if complete_payload(payload, pdf_path):
+                store.put(name, payload)
+                if payload["label"] != old_label:
+                    print(f"[CAMBIO] {name}: {old_label} -> {payload['label']} con el texto completo")
+                    move_classified(payload["file"], old_label, payload["label"])
+                if index is not None:
+                    index.add(name, payload["text"], payload.get("label"), payload.get("score"))
+                completed += 1
+                print(f"[DONE] {name}")
+        except Exception as exc:
+            print(f"[ERROR] {name}: {exc}")
+    store.close()
+    if index is not None:
+        index.close()
+    if manifest is not None:
+        manifest.close()
+
+    print(f"Documentos completados: {completed}")
+
+
+if __name__ == "__main__":
+    main()
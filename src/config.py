@@ -9,19 +9,143 @@ OUTPUT_DIR = os.getenv("OUTPUT_DIR")
 OCR_ENGINE = (os.getenv("OCR_ENGINE") or "vision").strip().lower()
 TESSERACT_LANG = (os.getenv("TESSERACT_LANG") or "spa").strip()
 
-_OCR_DPI_RAW = (os.getenv("OCR_DPI") or "300").strip()
-try:
-    OCR_DPI = int(_OCR_DPI_RAW)
-except ValueError as exc:
-    raise RuntimeError(" OCR_DPI debe ser un entero") from exc
+
+def _env_int(name: str, default: str) -> int:
+    raw = (os.getenv(name) or default).strip()
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise RuntimeError(f" {name} debe ser un entero") from exc
+
+
+def _env_float(name: str, default: str) -> float:
+    raw = (os.getenv(name) or default).strip()
+    try:
+        return float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f" {name} debe ser un numero") from exc
+
+
+def _env_flag(name: str, default: str) -> bool:
+    value = (os.getenv(name) or default).strip().lower()
+    return value not in {"0", "false", "no", "off"}
+
+
+OCR_DPI = _env_int("OCR_DPI", "300")
+OCR_ADAPTIVE_DPI = _env_flag("OCR_ADAPTIVE_DPI", "0")
+OCR_DPI_LOW = _env_int("OCR_DPI_LOW", "150")
+OCR_MIN_CONFIDENCE = _env_float("OCR_MIN_CONFIDENCE", "70")
+OCR_MIN_CHARS = _env_int("OCR_MIN_CHARS", "40")
+PIPELINE_WORKERS = _env_int("PIPELINE_WORKERS", "1")
+OCR_PAGE_WORKERS_TESSERACT = _env_int("OCR_PAGE_WORKERS_TESSERACT", "1")
+OCR_PAGE_WORKERS_VISION = _env_int("OCR_PAGE_WORKERS_VISION", "1")
+VISION_BATCH_SIZE = _env_int("VISION_BATCH_SIZE", "4")
+TESSERACT_BATCH_SIZE = _env_int("TESSERACT_BATCH_SIZE", "1")
+EXTRACT_MODE = (os.getenv("EXTRACT_MODE") or "document").strip().lower()
+EMBEDDED_MIN_CHARS = _env_int("EMBEDDED_MIN_CHARS", "50")
+BLANK_PAGE_FILTER = _env_flag("BLANK_PAGE_FILTER", "0")
+BLANK_DPI = _env_int("BLANK_DPI", "50")
+BLANK_MAX_INK_RATIO = _env_float("BLANK_MAX_INK_RATIO", "0.0003")
+BLANK_MAX_STD = _env_float("BLANK_MAX_STD", "8")
+BLANK_INK_DELTA = _env_int("BLANK_INK_DELTA", "60")
+CLASSIFY_EARLY_EXIT = _env_flag("CLASSIFY_EARLY_EXIT", "0")
+EARLY_EXIT_MIN_SCORE = _env_float("EARLY_EXIT_MIN_SCORE", "0.5")
+EARLY_EXIT_MIN_MARGIN = _env_float("EARLY_EXIT_MIN_MARGIN", "0.25")
+OCR_CACHE = _env_flag("OCR_CACHE", "1")
+OCR_CACHE_MAX_MB = _env_int("OCR_CACHE_MAX_MB", "512")
+OCR_CACHE_PATH = (os.getenv("OCR_CACHE_PATH") or "").strip()
+PLACEMENT_MODE = (os.getenv("PLACEMENT_MODE") or "copy").strip().lower()
+DEDUP = _env_flag("DEDUP", "1")
+STORE_BACKEND = (os.getenv("STORE_BACKEND") or "files").strip().lower()
+STORE_BATCH_SIZE = _env_int("STORE_BATCH_SIZE", "500")
+PIPELINE_ECHO_TEXT = _env_flag("PIPELINE_ECHO_TEXT", "0")
+SEARCH_INDEX = _env_flag("SEARCH_INDEX", "1")
+METRICS_FILE = (os.getenv("METRICS_FILE") or "").strip()
+METRICS_PROM_FILE = (os.getenv("METRICS_PROM_FILE") or "").strip()
 
 HAS_GCP_CREDENTIALS = bool(GCP_CREDENTIALS and os.path.exists(GCP_CREDENTIALS))
 
-if OCR_ENGINE not in {"vision", "tesseract", "auto"}:
-    raise RuntimeError(" OCR_ENGINE invalido: use vision, tesseract o auto")
+DAEMON_WATCH = (os.getenv("DAEMON_WATCH") or "auto").strip().lower()
+DAEMON_POLL_SECONDS = _env_float("DAEMON_POLL_SECONDS", "2")
+DAEMON_SETTLE_SECONDS = _env_float("DAEMON_SETTLE_SECONDS", "2")
+DAEMON_BATCH_SIZE = _env_int("DAEMON_BATCH_SIZE", "16")
+QUEUE_DB = (os.getenv("QUEUE_DB") or "").strip()
+QUEUE_NODE = (os.getenv("QUEUE_NODE") or "").strip()
+QUEUE_LEASE_SECONDS = _env_float("QUEUE_LEASE_SECONDS", "120")
+QUEUE_MAX_ATTEMPTS = _env_int("QUEUE_MAX_ATTEMPTS", "3")
+
+
+def validate() -> None:
+    """
+    Valida la combinacion de variables. La llaman los comandos (src.main,
+    src.daemon, src.complete_text) al arrancar y no el import, asi importar un
+    modulo (tests, --help, benchmarks) no exige un .env completo.
+    """
+    if OCR_ENGINE not in {"vision", "tesseract", "auto"}:
+        raise RuntimeError(" OCR_ENGINE invalido: use vision, tesseract o auto")
+
+    if EXTRACT_MODE not in {"document", "hybrid"}:
+        raise RuntimeError(" EXTRACT_MODE invalido: use document o hybrid")
+
+    if PLACEMENT_MODE not in {"copy", "hardlink", "reflink", "symlink", "auto"}:
+        raise RuntimeError(" PLACEMENT_MODE invalido: use copy, hardlink, reflink, symlink o auto")
+
+    if STORE_BACKEND not in {"files", "sqlite"}:
+        raise RuntimeError(" STORE_BACKEND invalido: use files o sqlite")
+
+    if not INPUT_DIR or not OUTPUT_DIR:
+        raise RuntimeError(" INPUT_DIR o OUTPUT_DIR no definidos")
+
+    if OCR_ENGINE == "vision" and not HAS_GCP_CREDENTIALS:
+        raise RuntimeError(" No se encontro el JSON de Google Vision")
+
+    if DAEMON_WATCH not in {"auto", "inotify", "poll"}:
+        raise RuntimeError(" DAEMON_WATCH invalido: use auto, inotify o poll")
+
+
+_NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "ceph", "glusterfs", "fuse.sshfs", "lustre", "gpfs"}
+
+
+def _is_network_path(path: str) -> bool:
+    """True si `path` queda en un filesystem de red segun /proc/self/mounts (Linux)."""
+    try:
+        with open("/proc/self/mounts", encoding="utf-8") as fh:
+            mounts = [line.split()[1:3] for line in fh if len(line.split()) >= 3]
+    except OSError:
+        return False
+    real = os.path.realpath(path)
+    best, fstype = "", ""
+    for mount_point, kind in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (real == mount_point or real.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) >= len(best):
+            best, fstype = mount_point, kind
+    return fstype in _NETWORK_FS
+
+
+def _is_within(path: str, directory: str) -> bool:
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def validate_queue() -> None:
+    """
+    Modo --queue (varias maquinas): el store SQLite, el cache OCR y el indice
+    usan WAL, que no funciona entre maquinas; se exige la configuracion segura.
+    """
+    if STORE_BACKEND != "files":
+        raise RuntimeError(" STORE_BACKEND invalido con --queue: use files (el store SQLite usa WAL)")
 
-if not INPUT_DIR or not OUTPUT_DIR:
-    raise RuntimeError(" INPUT_DIR o OUTPUT_DIR no definidos")
+    if SEARCH_INDEX:
+        raise RuntimeError(
+            " SEARCH_INDEX invalido con --queue: use SEARCH_INDEX=0 y despues python -m src.search_index build"
+        )
 
-if OCR_ENGINE == "vision" and not HAS_GCP_CREDENTIALS:
-    raise RuntimeError(" No se encontro el JSON de Google Vision")
+    if OCR_CACHE and (
+        not OCR_CACHE_PATH
+        or any(_is_within(OCR_CACHE_PATH, d) for d in (OUTPUT_DIR, INPUT_DIR) if d)
+        or _is_network_path(os.path.dirname(os.path.abspath(OCR_CACHE_PATH)))
+    ):
+        raise RuntimeError(
+            " OCR_CACHE invalido con --queue: use un OCR_CACHE_PATH en disco local (fuera de INPUT_DIR/OUTPUT_DIR)"
+            " u OCR_CACHE=0"
+        )
@@ -0,0 +1,309 @@
+"""
+Almacenamiento de los resultados por documento (texto + clasificacion).
+
+- files (default): un JSON con indent=2 por PDF en OUTPUT_DIR/<json_dir>, el
+  formato de siempre.
+- sqlite: una tabla en OUTPUT_DIR/<json_dir>.sqlite con el payload como JSON
+  compacto comprimido con zlib. Escrituras en lotes (una transaccion cada
+  `batch_size` documentos) y lectura en streaming, sin miles de archivos chicos.
+
+Ambos guardan aparte la version de reglas (RULES_VERSION) con la que se
+verifico cada clasificacion, para que process_json pueda saltarse los
+documentos al dia sin leerlos ni reescribirlos (mark_version).
+
+Exportar/importar entre ambos formatos:
+
+    python -m src.corpus_store export --to output/json_export
+    python -m src.corpus_store import --from output/json
+"""
+import argparse
+import fcntl
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+BACKENDS = ("files", "sqlite")
+
+
+class FileStore:
+    def __init__(self, json_dir: str | Path):
+        self.json_dir = Path(json_dir)
+        self.json_dir.mkdir(parents=True, exist_ok=True)
+        # fuera de json_dir para no mezclarlo con los *.json de documentos
+        self.versions_path = self.json_dir.parent / f"{self.json_dir.name}.rules.json"
+        self._versions = None
+        self._dirty: set[str] = set()
+
+    def _read_versions(self) -> dict[str, str]:
+        if not self.versions_path.exists():
+            return {}
+        try:
+            return json.loads(self.versions_path.read_text(encoding="utf-8"))
+        except ValueError:
+            print(f"[WARN] {self.versions_path.name} ilegible, se reconstruye")
+            return {}
+
+    def _load_versions(self) -> dict[str, str]:
+        if self._versions is None:
+            self._versions = self._read_versions()
+        return self._versions
+
+    def mark_version(self, names: list[str], version: str) -> None:
+        versions = self._load_versions()
+        for name in names:
+            versions[name] = version
+        self._dirty.update(names)
+
+    def path(self, name: str) -> Path:
+        return self.json_dir / f"{name}.json"
+
+    def exists(self, name: str) -> bool:
+        return self.path(name).exists()
+
+    def _with_version(self, name: str, payload: dict) -> dict:
+        version = self._load_versions().get(name)
+        if version:
+            payload["rules_version"] = version
+        return payload
+
+    def get(self, name: str) -> dict | None:
+        path = self.path(name)
+        if not path.exists():
+            return None
+        return self._with_version(name, json.loads(path.read_text(encoding="utf-8")))
+
+    def put(self, name: str, payload: dict) -> int:
+        data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        self.path(name).write_bytes(data)
+        if payload.get("rules_version"):
+            self.mark_version([name], payload["rules_version"])
+        return len(data)
+
+    def iter_payloads(self, stale_for: str | None = None) -> Iterator[tuple[str, dict]]:
+        """
+        (nombre, payload) en orden; los JSON ilegibles se informan y se saltan.
+        Con stale_for solo los que no estan verificados con esa version de reglas.
+        """
+        versions = self._load_versions()
+        for path in sorted(self.json_dir.glob("*.json")):
+            if stale_for and versions.get(path.stem) == stale_for:
+                continue
+            try:
+                payload = self._with_version(path.stem, json.loads(path.read_text(encoding="utf-8")))
+            except Exception as exc:
+                print(f"[ERROR] {path.name}: {exc}")
+                continue
+            if stale_for and payload.get("rules_version") == stale_for:
+                self.mark_version([path.stem], stale_for)
+                continue
+            yield path.stem, payload
+
+    def labels(self, known: dict | None = None, since_ns: int | None = None) -> Iterator[tuple[str, str, float]]:
+        """
+        (nombre, label, score) de todos los documentos. Con `known` ({nombre:
+        (label, score)}, p.ej. un resumen anterior) y `since_ns`, los JSON sin
+        modificar desde entonces no se leen.
+        """
+        known = known or {}
+        for path in sorted(self.json_dir.glob("*.json")):
+            if path.stem in known and since_ns is not None and path.stat().st_mtime_ns < since_ns:
+                yield (path.stem, *known[path.stem])
+                continue
+            try:
+                payload = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as exc:
+                print(f"[ERROR] {path.name}: {exc}")
+                continue
+            yield path.stem, payload.get("label"), payload.get("score")
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.json_dir.glob("*.json"))
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        # se relee y se aplican solo los cambios propios: otros procesos/nodos
+        # (src.main --queue) pueden haber escrito el archivo mientras tanto. El
+        # flock serializa la relectura y el reemplazo entre ellos.
+        lock_path = self.versions_path.with_name(f"{self.versions_path.name}.lock")
+        with open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            versions = self._read_versions()
+            versions.update({name: self._versions[name] for name in self._dirty})
+            tmp = self.versions_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(versions, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.versions_path)
+        self._versions = versions
+        self._dirty.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class SqliteStore:
+    def __init__(self, path: str | Path, batch_size: int = 500, level: int = 6):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self.level = level
+        self._pending: dict[str, tuple] = {}
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " name TEXT PRIMARY KEY,"
+            " label TEXT,"
+            " score REAL,"
+            " updated_at TEXT NOT NULL,"
+            " rules_version TEXT,"
+            " payload BLOB NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "rules_version" not in columns:
+            self._conn.execute("ALTER TABLE documents ADD COLUMN rules_version TEXT")
+        self._conn.commit()
+
+    def exists(self, name: str) -> bool:
+        if name in self._pending:
+            return True
+        row = self._conn.execute("SELECT 1 FROM documents WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def get(self, name: str) -> dict | None:
+        self.flush()
+        row = self._conn.execute(
+            "SELECT rules_version, payload FROM documents WHERE name = ?", (name,)
+        ).fetchone()
+        return _decode(row[1], row[0]) if row else None
+
+    def mark_version(self, names: list[str], version: str) -> None:
+        """Registra que el resultado guardado sigue valido con `version` sin reescribir el payload."""
+        self.flush()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE documents SET rules_version = ? WHERE name = ?", [(version, n) for n in names]
+            )
+
+    def put(self, name: str, payload: dict) -> int:
+        blob = zlib.compress(
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), self.level
+        )
+        self._pending[name] = (
+            name,
+            payload.get("label"),
+            payload.get("score"),
+            datetime.now().isoformat(timespec="seconds"),
+            payload.get("rules_version"),
+            blob,
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return len(blob)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (name, label, score, updated_at, rules_version, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                list(self._pending.values()),
+            )
+        self._pending.clear()
+
+    def iter_payloads(self, stale_for: str | None = None, chunk_size: int = 200) -> Iterator[tuple[str, dict]]:
+        """
+        Streaming por nombre con una conexion de solo lectura aparte: se puede
+        llamar a put() mientras se itera (WAL, la lectura ve un snapshot).
+        Con stale_for el filtro de version se hace en SQL, sin descomprimir.
+        """
+        self.flush()
+        reader = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            if stale_for:
+                cur = reader.execute(
+                    "SELECT name, rules_version, payload FROM documents"
+                    " WHERE rules_version IS NOT ? ORDER BY name",
+                    (stale_for,),
+                )
+            else:
+                cur = reader.execute("SELECT name, rules_version, payload FROM documents ORDER BY name")
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for name, version, blob in rows:
+                    yield name, _decode(blob, version)
+        finally:
+            reader.close()
+
+    def labels(self, known: dict | None = None, since_ns: int | None = None) -> Iterator[tuple[str, str, float]]:
+        """(nombre, label, score) de todos los documentos, de las columnas (sin descomprimir)."""
+        self.flush()
+        yield from self._conn.execute("SELECT name, label, score FROM documents ORDER BY name")
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+def _decode(blob: bytes, version: str | None = None) -> dict:
+    payload = json.loads(zlib.decompress(blob).decode("utf-8"))
+    if version:
+        payload["rules_version"] = version
+    return payload
+
+
+def open_store(backend: str, output_dir: str | Path, json_dir_name: str, batch_size: int = 500):
+    if backend == "files":
+        return FileStore(Path(output_dir) / json_dir_name)
+    if backend == "sqlite":
+        return SqliteStore(Path(output_dir) / f"{json_dir_name}.sqlite", batch_size=batch_size)
+    raise RuntimeError(" STORE_BACKEND invalido: use files o sqlite")
+
+
+def copy_store(src, dest) -> int:
+    copied = 0
+    for name, payload in src.iter_payloads():
+        dest.put(name, payload)
+        copied += 1
+    dest.flush()
+    return copied
+
+
+def main(argv=None):
+    output_dir = os.getenv("OUTPUT_DIR") or "output"
+    json_dir_name = (os.getenv("JSON_DIR_NAME") or "json").strip() or "json"
+    parser = argparse.ArgumentParser(description="Exporta/importa el store SQLite al formato de un JSON por PDF")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("--output-dir", type=Path, default=Path(output_dir))
+    parser.add_argument("--name", default=json_dir_name, help="json o tesseract_json (default: JSON_DIR_NAME o json)")
+    parser.add_argument("--to", type=Path, help="export: carpeta destino (default: OUTPUT_DIR/<name>)")
+    parser.add_argument("--from", dest="source", type=Path, help="import: carpeta de JSON (default: OUTPUT_DIR/<name>)")
+    args = parser.parse_args(argv)
+
+    store = open_store("sqlite", args.output_dir, args.name)
+    try:
+        if args.command == "export":
+            target = FileStore(args.to or args.output_dir / args.name)
+            copied = copy_store(store, target)
+            print(f"Exportados {copied} documentos a {target.json_dir.resolve()}")
+        else:
+            source = FileStore(args.source or args.output_dir / args.name)
+            copied = copy_store(source, store)
+            print(f"Importados {copied} documentos a {store.path.resolve()}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Modo daemon: vigila INPUT_DIR y procesa cada PDF que llega con el mismo
+pipeline que src.main (dedup, OCR, clasificacion, store, manifest), sin pagar
+el arranque en frio de cada corrida por cron.
+
+    python -m src.daemon --workers 4
+    python -m src.daemon --once          # procesa lo que haya y termina
+
+- Aviso de llegada con inotify (IN_CLOSE_WRITE / IN_MOVED_TO); si no hay
+  inotify (otro SO, NFS) o DAEMON_WATCH=poll, se revisa la carpeta cada
+  DAEMON_POLL_SECONDS. Un PDF sin evento se toma cuando lleva
+  DAEMON_SETTLE_SECONDS sin modificarse.
+- Reclamo atomico: el PDF se renombra a INPUT_DIR/.daemon/processing antes de
+  procesarlo y al terminar queda en .daemon/done o .daemon/failed. Un archivo
+  a medio copiar o ya tomado nunca se procesa dos veces.
+- Motores calientes: el pool de procesos vive lo mismo que el daemon y cada
+  worker importa fitz/numpy/PIL, abre el cache OCR y crea el cliente de Vision
+  una sola vez (warm_up).
+"""
+import argparse
+import ctypes
+import fcntl
+import os
+import select
+import signal
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from src.config import (
+    DAEMON_BATCH_SIZE,
+    DAEMON_POLL_SECONDS,
+    DAEMON_SETTLE_SECONDS,
+    DAEMON_WATCH,
+    HAS_GCP_CREDENTIALS,
+    INPUT_DIR,
+    OCR_ENGINE,
+    OUTPUT_DIR,
+    PIPELINE_ECHO_TEXT,
+    PIPELINE_WORKERS,
+    STORE_BACKEND,
+    STORE_BATCH_SIZE,
+    validate,
+)
+from src.corpus_store import open_store
+from src.main import (
+    ensure_dirs,
+    get_json_dir_name,
+    open_search_index,
+    print_summary,
+    run_batch,
+    write_prometheus,
+)
+from src.manifest import Manifest
+from src.placement import place_file
+
+WORK_DIR_NAME = ".daemon"
+
+# linux/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+_EVENT = struct.Struct("iIII")
+
+
+def _parse_events(data: bytes) -> list[str]:
+    """Nombres de archivo de un buffer leido del fd de inotify."""
+    names = []
+    offset = 0
+    while offset + _EVENT.size <= len(data):
+        _, mask, _, length = _EVENT.unpack_from(data, offset)
+        offset += _EVENT.size
+        raw = data[offset:offset + length].split(b"\0", 1)[0]
+        offset += length
+        if raw and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            names.append(os.fsdecode(raw))
+    return names
+
+
+def _inotify_open(directory: Path) -> int:
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        init1, add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError) as exc:
+        raise OSError("inotify no disponible") from exc
+    fd = init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 fallo")
+    if add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        errno = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(errno, f"inotify_add_watch fallo en {directory}")
+    return fd
+
+
+class Watcher:
+    """
+    Espera llegadas a `directory`. wait() devuelve los nombres avisados por
+    inotify (vacio en modo poll o si vence el timeout); el daemon igual revisa
+    la carpeta completa en cada vuelta, asi un evento perdido solo se atrasa.
+    """
+
+    def __init__(self, directory: str | Path, mode: str = "auto"):
+        self.directory = Path(directory)
+        self._fd = None
+        if mode in ("auto", "inotify"):
+            try:
+                self._fd = _inotify_open(self.directory)
+            except OSError as exc:
+                if mode == "inotify":
+                    raise RuntimeError(f" DAEMON_WATCH=inotify no disponible: {exc}") from exc
+        self.mode = "inotify" if self._fd is not None else "poll"
+
+    def wait(self, timeout: float) -> set[str]:
+        if self._fd is None:
+            time.sleep(timeout)
+            return set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            return set(_parse_events(os.read(self._fd, 64 * 1024)))
+        except BlockingIOError:
+            return set()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def work_dirs(in_dir: Path) -> dict[str, Path]:
+    base = in_dir / WORK_DIR_NAME
+    dirs = {name: base / name for name in ("processing", "done", "failed")}
+    for path in dirs.values():
+        path.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+
+def candidates(in_dir: Path, ready: set[str], settle: float, now: float | None = None) -> list[Path]:
+    """PDFs de in_dir avisados por inotify o sin cambios hace `settle` segundos, por antiguedad."""
+    now = time.time() if now is None else now
+    found = []
+    for entry in os.scandir(in_dir):
+        if not entry.name.endswith(".pdf") or not entry.is_file(follow_symlinks=False):
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if entry.name in ready or now - mtime >= settle:
+            found.append((mtime, Path(entry.path)))
+    return [path for _, path in sorted(found)]
+
+
+def claim(pdfs: list[Path], processing: Path) -> list[Path]:
+    """Mueve cada PDF a `processing` con rename (atomico); los que ya no estan se ignoran."""
+    claimed = []
+    for pdf in pdfs:
+        target = processing / pdf.name
+        try:
+            os.rename(pdf, target)
+        except FileNotFoundError:
+            continue
+        claimed.append(target)
+    return claimed
+
+
+def archive(stats: dict, dirs: dict[str, Path], out_dir: Path) -> None:
+    """Deja el PDF reclamado en done/ o failed/ y actualiza stats["path"] antes del manifest."""
+    src = Path(stats["path"])
+    target = dirs["failed" if stats.get("error") else "done"] / src.name
+    try:
+        os.replace(src, target)
+    except OSError as e:
+        print(f"[DAEMON] No se pudo mover {src.name}: {e}")
+        return
+    stats["path"] = str(target)
+    if stats.get("placement") == "symlink" and stats.get("label"):
+        # el enlace apuntaba a processing/: se rehace al destino final
+        place_file(target, out_dir / "classified" / stats["label"] / target.name, "symlink")
+
+
+def warm_up() -> None:
+    """Carga una vez por proceso lo caro de arrancar: fitz/numpy/PIL, cache OCR y clientes."""
+    from src.extract_text import get_ocr_cache
+
+    get_ocr_cache()
+    if OCR_ENGINE in ("tesseract", "auto"):
+        import src.ocr_tesseract  # noqa: F401  (pytesseract, PIL, numpy)
+    if OCR_ENGINE in ("vision", "auto") and HAS_GCP_CREDENTIALS:
+        from src.ocr_vision import get_client
+
+        get_client()
+
+
+def _init_worker() -> None:
+    # el SIGTERM lo maneja el proceso principal: termina el lote y cierra el pool
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    warm_up()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Vigila INPUT_DIR y procesa los PDFs que llegan")
+    parser.add_argument(
+        "--workers", type=int, default=PIPELINE_WORKERS, help="Procesos en paralelo (default: PIPELINE_WORKERS o 1)"
+    )
+    parser.add_argument(
+        "--poll", type=float, default=DAEMON_POLL_SECONDS, help="Segundos entre revisiones (default: DAEMON_POLL_SECONDS)"
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="Procesa los PDFs presentes (sin esperar settle) y termina"
+    )
+    parser.add_argument("--echo-text", action="store_true", default=PIPELINE_ECHO_TEXT)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    validate()
+    in_dir = Path(INPUT_DIR)
+    out_dir = Path(OUTPUT_DIR)
+    json_dir_name = get_json_dir_name()
+    ensure_dirs(str(out_dir), json_dir_name)
+    dirs = work_dirs(in_dir)
+
+    lock = open(in_dir / WORK_DIR_NAME / "daemon.lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        raise RuntimeError(f" Ya hay un daemon vigilando {in_dir.resolve()}")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    workers = max(1, args.workers)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    else:
+        warm_up()
+    manifest = Manifest(out_dir / "manifest.sqlite")
+    store = open_store(STORE_BACKEND, out_dir, json_dir_name, STORE_BATCH_SIZE)
+    index = open_search_index(out_dir, json_dir_name)
+    watcher = Watcher(in_dir, DAEMON_WATCH)
+    print(f"Daemon: vigilando {in_dir.resolve()} ({watcher.mode}, workers={workers})")
+
+    # lo que quedo en processing/ de una ejecucion anterior que se corto
+    backlog = sorted(dirs["processing"].glob("*.pdf"))
+    if backlog:
+        print(f"Daemon: {len(backlog)} PDFs reclamados sin terminar, se reprocesan")
+    ready: set[str] = set()
+    settle = 0.0 if args.once else DAEMON_SETTLE_SECONDS
+    try:
+        while not stopping:
+            limit = max(1, DAEMON_BATCH_SIZE)
+            if len(backlog) < limit:
+                found = candidates(in_dir, ready, settle)[: limit - len(backlog)]
+                backlog += claim(found, dirs["processing"])
+                ready.difference_update(p.name for p in found)
+            batch, backlog = backlog[:limit], backlog[limit:]
+            if not batch:
+                if args.once:
+                    break
+                ready |= {name for name in watcher.wait(args.poll) if name.endswith(".pdf")}
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = run_batch(
+                    batch, out_dir, json_dir_name, manifest, store, workers, args.echo_text, pool,
+                    on_done=lambda stats: archive(stats, dirs, out_dir), index=index,
+                )
+            except BrokenProcessPool as e:
+                # lo ya terminado quedo archivado; el resto sigue en processing/
+                print(f"[DAEMON] Pool de workers caido ({e}), se recrea")
+                pool.shutdown(cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                backlog = sorted(set(backlog) | {p for p in batch if p.exists()})
+                continue
+            store.flush()
+            if index is not None:
+                index.flush()
+            elapsed = time.perf_counter() - started
+            print_summary(results, elapsed)
+            write_prometheus(results, elapsed)
+    except KeyboardInterrupt:
+        print("Daemon: interrumpido")
+    finally:
+        watcher.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        store.close()
+        if index is not None:
+            index.close()
+        manifest.close()
+        lock.close()
+    print("Daemon: detenido")
+
+
+if __name__ == "__main__":
+    main()
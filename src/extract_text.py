@@ -1,59 +1,432 @@
-from src.config import HAS_GCP_CREDENTIALS, OCR_DPI, OCR_ENGINE, TESSERACT_LANG
-from src.pdf_utils import extract_embedded_text, pdf_pages_as_png_bytes
+import json
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
 
+from src import metrics
+from src.config import (
+    BLANK_DPI,
+    BLANK_INK_DELTA,
+    BLANK_MAX_INK_RATIO,
+    BLANK_MAX_STD,
+    BLANK_PAGE_FILTER,
+    EMBEDDED_MIN_CHARS,
+    EXTRACT_MODE,
+    HAS_GCP_CREDENTIALS,
+    OCR_CACHE,
+    OCR_ADAPTIVE_DPI,
+    OCR_CACHE_MAX_MB,
+    OCR_CACHE_PATH,
+    OCR_DPI,
+    OCR_DPI_LOW,
+    OCR_ENGINE,
+    OCR_MIN_CHARS,
+    OCR_MIN_CONFIDENCE,
+    OCR_PAGE_WORKERS_TESSERACT,
+    OCR_PAGE_WORKERS_VISION,
+    OUTPUT_DIR,
+    TESSERACT_BATCH_SIZE,
+    TESSERACT_LANG,
+    VISION_BATCH_SIZE,
+)
+from src.ocr_cache import OcrCache, cache_key
+from src.pdf_utils import PageRaster, is_blank_page, open_pdf, render_page
 
-def _ocr_with_vision(png_bytes: bytes) -> str:
-    from src.ocr_vision import ocr_image_bytes_vision
+_cache = None
+_cache_lock = threading.Lock()
 
-    return ocr_image_bytes_vision(png_bytes)
 
+def get_ocr_cache() -> OcrCache | None:
+    """Cache OCR del proceso (None si OCR_CACHE=0)."""
+    global _cache
+    if not OCR_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            path = OCR_CACHE_PATH or Path(OUTPUT_DIR) / "ocr_cache.sqlite"
+            _cache = OcrCache(path, OCR_CACHE_MAX_MB * 1024 * 1024)
+        return _cache
 
-def _ocr_with_tesseract(png_bytes: bytes) -> str:
-    from src.ocr_tesseract import ocr_image_bytes_tesseract
 
-    return ocr_image_bytes_tesseract(png_bytes, lang=TESSERACT_LANG)
+def _cached_ocr(engine: str, rasters: list[PageRaster], params: dict, ocr_many) -> list[str]:
+    """
+    OCR de un grupo de paginas pasando por el cache: solo las que no estan
+    cacheadas llegan a `ocr_many` (una sola llamada, p.ej. un batch de Vision).
+    """
+    cache = get_ocr_cache()
+    if cache is None:
+        return ocr_many(rasters)
+
+    keys = [cache_key(r.digest(), engine, r.dpi, params) for r in rasters]
+    texts = [cache.get(key) for key in keys]
+    missing = [i for i, text in enumerate(texts) if text is None]
+    if missing:
+        fresh = ocr_many([rasters[i] for i in missing])
+        for i, text in zip(missing, fresh):
+            texts[i] = text
+            cache.put(keys[i], text)
+    return texts
+
+
+def _ocr_with_vision(rasters: list[PageRaster]) -> list[str]:
+    from src.ocr_vision import ocr_images_vision
+
+    params = {"feature": "document_text_detection"}
+    return _cached_ocr(
+        "vision",
+        rasters,
+        params,
+        lambda rs: _vision_many(rs, ocr_images_vision),
+    )
+
+
+def _vision_many(rasters: list[PageRaster], ocr_images_vision) -> list[str]:
+    images = []
+    for r in rasters:
+        with metrics.stage("png_encode", page=r.page_num):
+            images.append(r.png_bytes())
+        metrics.count("png_bytes", len(images[-1]))
+    page = rasters[0].page_num if len(rasters) == 1 else None
+    with metrics.stage("ocr", page=page):
+        return ocr_images_vision(images, batch_size=VISION_BATCH_SIZE)
+
+
+def _tesseract_one(raster: PageRaster) -> str:
+    from src.ocr_tesseract import ocr_image_tesseract
+
+    with metrics.page(raster.page_num):
+        return ocr_image_tesseract(raster.image(), lang=TESSERACT_LANG)
+
+
+def _tesseract_many(rasters: list[PageRaster]) -> list[str]:
+    from src.ocr_tesseract import ocr_images_tesseract
+
+    if len(rasters) == 1:
+        return [_tesseract_one(rasters[0])]
+    return ocr_images_tesseract([r.image() for r in rasters], lang=TESSERACT_LANG)
+
+
+def _ocr_with_tesseract(rasters: list[PageRaster]) -> list[str]:
+    from src.ocr_tesseract import ocr_params
+
+    return _cached_ocr(
+        "tesseract",
+        rasters,
+        ocr_params(TESSERACT_LANG),
+        _tesseract_many,
+    )
+
+
+def _tesseract_one_data(raster: PageRaster) -> str:
+    from src.ocr_tesseract import ocr_image_tesseract_data
 
+    with metrics.page(raster.page_num):
+        text, confidence = ocr_image_tesseract_data(raster.image(), lang=TESSERACT_LANG)
+    return json.dumps({"text": text, "confidence": confidence}, ensure_ascii=False)
 
-def _ocr_page(png_bytes: bytes) -> str:
+
+def _ocr_with_tesseract_confidence(rasters: list[PageRaster]) -> list[str]:
+    """
+    Tesseract via image_to_data: deja la confianza media en raster.confidence.
+    En el cache se guarda texto + confianza (clave aparte de la de solo texto).
+    """
+    from src.ocr_tesseract import ocr_params
+
+    results = _cached_ocr(
+        "tesseract-data",
+        rasters,
+        ocr_params(TESSERACT_LANG),
+        lambda rs: [_tesseract_one_data(r) for r in rs],
+    )
+    texts = []
+    for raster, raw in zip(rasters, results):
+        data = json.loads(raw)
+        raster.confidence = data["confidence"]
+        texts.append(data["text"])
+    return texts
+
+
+def _needs_more_dpi(text: str, confidence: float | None) -> bool:
+    return confidence is None or confidence < OCR_MIN_CONFIDENCE or len(text) < OCR_MIN_CHARS
+
+
+def _ocr_batch(rasters: list[PageRaster]) -> list[str]:
     if OCR_ENGINE == "vision":
-        return _ocr_with_vision(png_bytes)
+        return _ocr_with_vision(rasters)
 
     if OCR_ENGINE == "tesseract":
-        return _ocr_with_tesseract(png_bytes)
+        return _ocr_with_tesseract(rasters)
 
     if HAS_GCP_CREDENTIALS:
         try:
-            return _ocr_with_vision(png_bytes)
+            return _ocr_with_vision(rasters)
         except Exception as exc:
             print(f"[OCR] Vision failed: {exc}. Falling back to Tesseract.")
 
-    return _ocr_with_tesseract(png_bytes)
+    return _ocr_with_tesseract(rasters)
 
 
-def extract_text_from_pdf(pdf_path: str, dpi: int = OCR_DPI) -> str:
+def _ocr_page(raster: PageRaster) -> str:
+    return _ocr_batch([raster])[0]
+
+
+def _page_workers(engine: str) -> int:
+    if engine == "vision":
+        return max(1, OCR_PAGE_WORKERS_VISION)
+    return max(1, OCR_PAGE_WORKERS_TESSERACT)
+
+
+def _batch_size(engine: str) -> int:
+    if engine == "vision":
+        return max(1, VISION_BATCH_SIZE)
+    return max(1, TESSERACT_BATCH_SIZE)
+
+
+def _page_units(jobs, batch_size: int):
     """
-    1) If the PDF has embedded text, use it.
-    2) Otherwise run OCR per page with the selected engine.
+    Agrupa (page_num, raster, embedded_text) en unidades de trabajo ordenadas:
+    hasta batch_size paginas para OCR juntas, o una pagina con texto embebido.
+    """
+    batch = []
+    for page_num, raster, embedded in jobs:
+        if raster is None:
+            if batch:
+                yield batch
+                batch = []
+            yield [(page_num, None, embedded)]
+            continue
+        print(f"[OCR] Page {page_num}: sending to OCR...")
+        batch.append((page_num, raster, None))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _unit_results(unit, texts):
+    for (page_num, raster, _), text in zip(unit, texts):
+        yield page_num, "embedded" if raster is None else "ocr", text, raster
+
+
+def _run_unit(unit, ocr_batch=_ocr_batch) -> list[str]:
+    if unit[0][1] is None:
+        return [unit[0][2]]
+    return ocr_batch([raster for _, raster, _ in unit])
+
+
+def _ocr_pages(jobs, workers: int, batch_size: int = 1, ocr_batch=_ocr_batch):
     """
-    print("[OCR] Looking for embedded text...")
-    embedded = extract_embedded_text(pdf_path)
-    if embedded and len(embedded) > 50:
-        print(f"[OCR] Embedded text found ({len(embedded)} chars).")
-        return embedded
+    Recorre (page_num, raster, embedded_text) y devuelve (page_num, source, text,
+    raster) siempre en orden de pagina. Las paginas con raster=None ya traen su
+    texto embebido y no pasan por OCR. Con batch_size > 1 las paginas se mandan
+    al motor en grupos (un request de Vision por grupo).
 
-    engine = OCR_ENGINE
-    if engine == "auto":
-        engine = "vision" if HAS_GCP_CREDENTIALS else "tesseract"
-    print(f"[OCR] No embedded text. OCR per page (engine={engine})...")
+    Con workers > 1 los grupos se reparten en un pool de hilos (Tesseract corre
+    en un subproceso y Vision es red, asi que el GIL no estorba) mientras el hilo
+    principal sigue renderizando. Solo hay `workers * 2` grupos en vuelo para
+    no acumular todas las paginas renderizadas de un PDF grande en memoria.
+    """
+    units = _page_units(jobs, batch_size)
+    if workers <= 1:
+        for unit in units:
+            yield from _unit_results(unit, _run_unit(unit, ocr_batch))
+        return
 
-    pages_text = []
-    for page_num, png_bytes in pdf_pages_as_png_bytes(pdf_path, dpi=dpi):
-        print(f"[OCR] Page {page_num}: sending to OCR...")
-        t = _ocr_page(png_bytes)
-        if t:
-            print(f"[OCR] Page {page_num}: received {len(t)} chars.")
-            pages_text.append(f"\n--- PAGE {page_num} ---\n{t}")
+    max_in_flight = workers * 2
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-page") as pool:
+        try:
+            for unit in units:
+                if unit[0][1] is None:
+                    future = Future()
+                    future.set_result([unit[0][2]])
+                else:
+                    future = pool.submit(metrics.bind(_run_unit), unit, ocr_batch)
+                in_flight.append((unit, future))
+                if len(in_flight) >= max_in_flight:
+                    done_unit, future = in_flight.popleft()
+                    yield from _unit_results(done_unit, future.result())
+            while in_flight:
+                done_unit, future = in_flight.popleft()
+                yield from _unit_results(done_unit, future.result())
+        finally:
+            # si el consumidor corta antes (early exit o error) no se espera
+            # por las paginas que aun no empezaron
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class PageInfo:
+    page: int
+    source: str  # "embedded" | "ocr" | "blank"
+    chars: int
+    dpi: int | None = None
+    # confianza media de Tesseract (0-100); solo con OCR_ADAPTIVE_DPI
+    confidence: float | None = None
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    pages: list[PageInfo] = field(default_factory=list)
+    page_count: int = 0
+    # paginas que no se procesaron por early exit (ver src.complete_text)
+    pending_pages: list[int] = field(default_factory=list)
+
+
+def extract_pdf(
+    pdf_path: str,
+    dpi: int = OCR_DPI,
+    mode: str = EXTRACT_MODE,
+    only_pages: set[int] | None = None,
+    stop_when=None,
+) -> ExtractionResult:
+    """
+    Abre el PDF una sola vez y devuelve el texto con la procedencia por pagina.
+
+    mode="document": si el documento completo tiene texto embebido se usa ese;
+    si no, OCR de todas las paginas (comportamiento historico).
+    mode="hybrid": decide por pagina; solo se renderizan y pasan por OCR las
+    paginas con menos de EMBEDDED_MIN_CHARS caracteres embebidos (p.ej. anexos
+    escaneados agregados a un contrato digital).
+
+    Con OCR_ADAPTIVE_DPI=1 y Tesseract cada pagina se renderiza primero a
+    OCR_DPI_LOW y solo se vuelve a renderizar a `dpi` si la confianza media
+    queda bajo OCR_MIN_CONFIDENCE o salen menos de OCR_MIN_CHARS caracteres.
+
+    Con BLANK_PAGE_FILTER=1 las paginas a OCR pasan antes por un render a
+    BLANK_DPI; las que quedan en blanco (dorsos, separadores) no se hacen OCR
+    y quedan con source="blank".
+
+    only_pages: procesa solo esas paginas (1-based).
+    stop_when: callable(texto_acumulado) -> bool evaluado despues de cada
+    pagina; si devuelve True se deja de hacer OCR y las paginas restantes
+    quedan en pending_pages.
+    """
+    doc = open_pdf(pdf_path)
+    try:
+        print("[OCR] Looking for embedded text...")
+        with metrics.stage("embedded_text"):
+            raw = [page.get_text("text") or "" for page in doc]
+        embedded = [t.strip() for t in raw]
+        selected = [only_pages is None or i + 1 in only_pages for i in range(len(raw))]
+
+        if mode == "document" and only_pages is None:
+            joined = "\n".join(t for t in raw if t.strip()).strip()
+            if joined and len(joined) > EMBEDDED_MIN_CHARS:
+                print(f"[OCR] Embedded text found ({len(joined)} chars).")
+                pages = [PageInfo(i + 1, "embedded", len(t)) for i, t in enumerate(embedded)]
+                return ExtractionResult(joined, pages, len(raw))
+            use_embedded = [False] * len(raw)
+        elif mode == "document":
+            use_embedded = [False] * len(raw)
         else:
-            print(f"[OCR] Page {page_num}: no text detected.")
+            use_embedded = [len(t) > EMBEDDED_MIN_CHARS for t in embedded]
+
+        to_ocr = sum(1 for use, sel in zip(use_embedded, selected) if sel and not use)
+        engine = OCR_ENGINE
+        if engine == "auto":
+            engine = "vision" if HAS_GCP_CREDENTIALS else "tesseract"
+        workers = _page_workers(engine)
+        adaptive = OCR_ADAPTIVE_DPI and engine == "tesseract" and OCR_DPI_LOW < dpi
+        first_dpi = OCR_DPI_LOW if adaptive else dpi
+        ocr_batch = _ocr_with_tesseract_confidence if adaptive else _ocr_batch
+        if to_ocr:
+            print(
+                f"[OCR] {to_ocr}/{sum(selected)} pages without embedded text. "
+                f"OCR per page (engine={engine}, workers={workers}, dpi={first_dpi}"
+                f"{f'->{dpi}' if adaptive else ''})..."
+            )
+
+        cache = get_ocr_cache()
+        hits_before = (cache.hits, cache.misses) if cache else (0, 0)
+
+        blank = set()
+
+        def jobs():
+            for page in doc:
+                i = page.number
+                if not selected[i]:
+                    continue
+                if use_embedded[i]:
+                    yield i + 1, None, embedded[i]
+                    continue
+                if BLANK_PAGE_FILTER:
+                    with metrics.stage("blank_check", page=i + 1):
+                        is_blank = is_blank_page(
+                            page, BLANK_DPI, BLANK_MAX_INK_RATIO, BLANK_MAX_STD, BLANK_INK_DELTA
+                        )
+                    if is_blank:
+                        print(f"[OCR] Page {i + 1}: blank, skipping OCR.")
+                        blank.add(i + 1)
+                        yield i + 1, None, ""
+                        continue
+                with metrics.stage("render", page=i + 1):
+                    raster = render_page(page, first_dpi)
+                metrics.count("render_bytes", raster.width * raster.height)
+                yield i + 1, raster, None
+
+        pages = []
+        pages_text = []
+        page_results = _ocr_pages(jobs(), workers, _batch_size(engine), ocr_batch)
+        for page_num, source, t, raster in page_results:
+            if page_num in blank:
+                pages.append(PageInfo(page_num, "blank", 0))
+                continue
+            if adaptive and source == "ocr" and _needs_more_dpi(t, raster.confidence):
+                # se re-renderiza en este hilo: PyMuPDF no es thread-safe
+                low_confidence = raster.confidence
+                with metrics.stage("render", page=page_num):
+                    high = render_page(doc[page_num - 1], dpi)
+                metrics.count("render_bytes", high.width * high.height)
+                metrics.count("dpi_escalations")
+                high_text = ocr_batch([high])[0]
+                # se queda el resultado con mejor confianza (sin confianza cuenta como peor)
+                keep_high = low_confidence is None or (
+                    high.confidence is not None and high.confidence >= low_confidence
+                )
+                print(
+                    f"[OCR] Page {page_num}: confidence={low_confidence} at {first_dpi} DPI, "
+                    f"retried at {dpi} DPI (confidence={high.confidence}), "
+                    f"keeping {dpi if keep_high else first_dpi} DPI."
+                )
+                if keep_high:
+                    t, raster = high_text, high
+            if raster is None:
+                pages.append(PageInfo(page_num, source, len(t)))
+            else:
+                pages.append(PageInfo(page_num, source, len(t), raster.dpi, raster.confidence))
+            if t:
+                if source == "ocr":
+                    print(f"[OCR] Page {page_num}: received {len(t)} chars.")
+                pages_text.append(f"\n--- PAGE {page_num} ---\n{t}")
+            else:
+                print(f"[OCR] Page {page_num}: no text detected.")
+            if stop_when is not None and stop_when("\n".join(pages_text)):
+                page_results.close()
+                break
 
-    return "\n".join(pages_text).strip()
+        done = {p.page for p in pages}
+        pending = [i + 1 for i in range(len(raw)) if selected[i] and i + 1 not in done]
+        if pending:
+            print(f"[OCR] Early exit after page {pages[-1].page}: {len(pending)} pages pending.")
+
+        if cache and to_ocr:
+            hits = cache.hits - hits_before[0]
+            misses = cache.misses - hits_before[1]
+            print(f"[OCR] Cache: hits={hits} misses={misses}")
+
+        return ExtractionResult("\n".join(pages_text).strip(), pages, len(raw), pending)
+    finally:
+        doc.close()
+
+
+def extract_text_from_pdf(pdf_path: str, dpi: int = OCR_DPI) -> str:
+    """
+    1) If the PDF has embedded text, use it.
+    2) Otherwise run OCR per page with the selected engine.
+    """
+    return extract_pdf(pdf_path, dpi).text
@@ -1,19 +1,51 @@
 import os
-import json
-import shutil
+import sqlite3
+import time
+import argparse
 from pathlib import Path
+from dataclasses import asdict
 from datetime import datetime
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 
-from src.config import INPUT_DIR, OUTPUT_DIR, OCR_ENGINE
-from src.classifier_rules import classify_text_rules, KEYWORDS
-from src.extract_text import extract_text_from_pdf
+from src.config import (
+    CLASSIFY_EARLY_EXIT,
+    DEDUP,
+    EARLY_EXIT_MIN_MARGIN,
+    EARLY_EXIT_MIN_SCORE,
+    INPUT_DIR,
+    METRICS_FILE,
+    METRICS_PROM_FILE,
+    OUTPUT_DIR,
+    OCR_ENGINE,
+    PIPELINE_ECHO_TEXT,
+    PIPELINE_WORKERS,
+    PLACEMENT_MODE,
+    QUEUE_DB,
+    QUEUE_LEASE_SECONDS,
+    QUEUE_MAX_ATTEMPTS,
+    QUEUE_NODE,
+    SEARCH_INDEX,
+    STORE_BACKEND,
+    STORE_BATCH_SIZE,
+    validate,
+    validate_queue,
+)
+from src import metrics
+from src.corpus_store import open_store
+from src.classifier_rules import classify_text_rules, is_decisive, KEYWORDS, RULES_VERSION
+from src.manifest import Manifest, file_sha256
+from src.placement import place_file
+from src.search_index import open_index
 
 def ensure_dirs(base_out: str, json_dir_name: str):
     labels = list(KEYWORDS.keys()) + ["Desconocido"]
     Path(base_out, "classified").mkdir(parents=True, exist_ok=True)
     for l in labels:
         Path(base_out, "classified", l).mkdir(parents=True, exist_ok=True)
-    Path(base_out, json_dir_name).mkdir(parents=True, exist_ok=True)
+    if STORE_BACKEND == "files":
+        Path(base_out, json_dir_name).mkdir(parents=True, exist_ok=True)
 
 
 def get_json_dir_name() -> str:
@@ -21,7 +53,491 @@ def get_json_dir_name() -> str:
         return "tesseract_json"
     return "json"
 
-def main():
+
+def _new_stats(pdf: Path) -> dict:
+    return {"file": pdf.name, "path": str(pdf), "sha256": None, "label": None, "score": 0.0, "pages": 0, "error": None,
+            "seconds": 0.0, "cache_hits": 0, "cache_misses": 0, "pages_skipped": 0, "pages_blank": 0, "deduplicated": False, "placement": None,
+            "metrics": None}
+
+
+def process_pdf(
+    pdf: Path, out_dir: Path, json_dir_name: str, echo_text: bool = False, sha256: str | None = None
+) -> dict:
+    """
+    Procesa un PDF completo: texto -> clasificacion -> copia clasificada.
+    Nunca lanza excepciones: los errores quedan en el campo "error" del resultado,
+    asi un documento malo no detiene el lote. Los tiempos por etapa quedan en
+    stats["metrics"] y el payload a guardar en stats["payload"]: lo escribe el
+    proceso principal en el store (ver store_result). `sha256` evita volver a
+    hashear si el proceso principal ya lo hizo (dedup).
+    """
+    doc_metrics = metrics.DocMetrics(pdf.name)
+    with metrics.recording(doc_metrics):
+        stats = _process_pdf(pdf, out_dir, json_dir_name, echo_text, sha256)
+    stats["metrics"] = doc_metrics.to_dict()
+    return stats
+
+
+def _process_pdf(pdf: Path, out_dir: Path, json_dir_name: str, echo_text: bool, sha256: str | None) -> dict:
+    # fitz/numpy/PIL recien aqui: una corrida sin pendientes (cron) no los importa
+    from src.extract_text import extract_pdf, get_ocr_cache
+
+    started = time.perf_counter()
+    stats = _new_stats(pdf)
+    try:
+        print(f"[START] {pdf.name}")
+        if sha256 is None:
+            with metrics.stage("hash"):
+                sha256 = file_sha256(pdf)
+        stats["sha256"] = sha256
+        metrics.count("pdf_bytes", pdf.stat().st_size)
+        print("[STEP] Extrayendo texto...")
+        cache = get_ocr_cache()
+        if cache:
+            hits, misses = cache.hits, cache.misses
+        stop_when = None
+        if CLASSIFY_EARLY_EXIT:
+            stop_when = lambda t: is_decisive(t, EARLY_EXIT_MIN_SCORE, EARLY_EXIT_MIN_MARGIN)
+        with metrics.stage("extract"):
+            extraction = extract_pdf(str(pdf), stop_when=stop_when)
+        text = extraction.text
+        stats["pages"] = len(extraction.pages)
+        metrics.count("pages", len(extraction.pages))
+        stats["pages_skipped"] = len(extraction.pending_pages)
+        blank_pages = [p.page for p in extraction.pages if p.source == "blank"]
+        stats["pages_blank"] = len(blank_pages)
+        if cache:
+            stats["cache_hits"] = cache.hits - hits
+            stats["cache_misses"] = cache.misses - misses
+        if echo_text:
+            print(f"----- OCR TEXT BEGIN: {pdf.name} -----")
+            print(text if text else "[empty]")
+            print("----- OCR TEXT END -----")
+        print("[STEP] Clasificando...")
+        with metrics.stage("classify"):
+            result = classify_text_rules(text)
+
+        stats["payload"] = {
+            "file": pdf.name,
+            "text": text,
+            "label": result.label,
+            "score": result.score,
+            "evidence": result.evidence,
+            "rules_version": RULES_VERSION,
+            "pages": [asdict(p) for p in extraction.pages],
+            "page_count": extraction.page_count,
+            "pending_pages": extraction.pending_pages,
+            "blank_pages": blank_pages,
+            "text_complete": not extraction.pending_pages,
+            "processed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        # copia/enlace segun PLACEMENT_MODE
+        print("[STEP] Copiando PDF clasificado...")
+        dest_pdf = out_dir / "classified" / result.label / pdf.name
+        with metrics.stage("place"):
+            stats["placement"] = place_file(pdf, dest_pdf, PLACEMENT_MODE)
+
+        stats["label"] = result.label
+        stats["score"] = result.score
+        print(f"✅ {pdf.name} -> {result.label} (score={result.score:.2f})")
+        print(f"[DONE] {pdf.name}")
+
+    except Exception as e:
+        stats["error"] = str(e)
+        print(f"❌ Error con {pdf.name}: {e}")
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def store_result(store, stats: dict, index=None) -> None:
+    """
+    Guarda el payload de un documento procesado (y su texto en el indice de
+    busqueda, si hay) y suma los tiempos a sus metricas.
+    """
+    payload = stats.pop("payload", None)
+    if payload is None or stats.get("error"):
+        return
+    name = Path(stats["file"]).stem
+    started = time.perf_counter()
+    try:
+        written = store.put(name, payload)
+    except (OSError, sqlite3.Error) as e:
+        stats["error"] = f"no se pudo guardar el resultado: {e}"
+        print(f"❌ Error con {stats['file']}: {stats['error']}")
+        return
+    doc_metrics = stats.get("metrics")
+    if doc_metrics is not None:
+        doc_metrics["stages"]["json_write"] = round(time.perf_counter() - started, 6)
+        doc_metrics["counters"]["json_bytes"] = written
+    if index is None:
+        return
+    started = time.perf_counter()
+    try:
+        index.add(name, payload.get("text") or "", payload.get("label"), payload.get("score"))
+    except sqlite3.Error as e:
+        # el resultado ya esta guardado: el indice se puede completar con src.search_index build
+        print(f"[INDEX] No se pudo indexar {stats['file']}: {e}")
+        return
+    if doc_metrics is not None:
+        doc_metrics["stages"]["index"] = round(time.perf_counter() - started, 6)
+
+
+def open_search_index(out_dir: Path, json_dir_name: str):
+    return open_index(out_dir, json_dir_name) if SEARCH_INDEX else None
+
+
+def reuse_result(pdf: Path, sha256: str, payload: dict, out_dir: Path) -> dict:
+    """
+    Resultado de un PDF cuyo contenido ya se proceso (mismo sha256): reutiliza
+    texto y clasificacion del original, sin OCR, y solo lo coloca en classified.
+    """
+    started = time.perf_counter()
+    stats = _new_stats(pdf)
+    stats["sha256"] = sha256
+    try:
+        original = payload.get("duplicate_of") or payload.get("file")
+        label = payload.get("label") or "Desconocido"
+        stats["placement"] = place_file(pdf, out_dir / "classified" / label / pdf.name, PLACEMENT_MODE)
+        stats["payload"] = dict(
+            payload,
+            file=pdf.name,
+            duplicate_of=original,
+            processed_at=datetime.now().isoformat(timespec="seconds"),
+        )
+        stats["label"] = label
+        stats["score"] = payload.get("score") or 0.0
+        stats["pages"] = len(payload.get("pages") or [])
+        stats["deduplicated"] = True
+        print(f"♻️ {pdf.name} -> {label} (mismo contenido que {original}, sin OCR)")
+    except Exception as e:
+        stats["error"] = str(e)
+        print(f"❌ Error con {pdf.name}: {e}")
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def dedup_pending(pdfs: list[Path], manifest: Manifest, store, reuse_previous: bool = True):
+    """
+    Hashea los PDFs pendientes y separa los que repiten contenido:
+    - reuse: [(pdf, payload)] iguales a un documento ya procesado antes (solo
+      con reuse_previous; --force no reutiliza resultados de corridas previas).
+    - waiting: {sha256: [pdf]} iguales a otro PDF de esta misma corrida; se
+      resuelven cuando termina el primero.
+    Devuelve (a_procesar, hashes, reuse, waiting).
+    """
+    to_process, hashes, reuse, waiting = [], {}, [], {}
+    first = set()
+    for pdf in pdfs:
+        sha = file_sha256(pdf)
+        hashes[pdf] = sha
+        if sha in first:
+            waiting.setdefault(sha, []).append(pdf)
+            continue
+        record = manifest.find_done_by_sha256(sha, OCR_ENGINE, exclude=pdf) if reuse_previous else None
+        payload = store.get(Path(record["path"]).stem) if record else None
+        if payload is not None:
+            reuse.append((pdf, payload))
+            continue
+        first.add(sha)
+        to_process.append(pdf)
+    return to_process, hashes, reuse, waiting
+
+
+def _run_sequential(pdfs: list[Path], out_dir: Path, json_dir_name: str, echo_text: bool = False, hashes=None):
+    hashes = hashes or {}
+    for pdf in pdfs:
+        yield process_pdf(pdf, out_dir, json_dir_name, echo_text, hashes.get(pdf))
+
+
+def _run_pool(
+    pdfs: list[Path],
+    out_dir: Path,
+    json_dir_name: str,
+    workers: int,
+    echo_text: bool = False,
+    hashes=None,
+    pool: ProcessPoolExecutor | None = None,
+):
+    """
+    Reparte los PDFs en un pool de procesos. La cola en vuelo esta acotada
+    (2 documentos por worker) para no encolar miles de futures de golpe.
+    Con `pool` se usa ese pool (el daemon lo mantiene vivo entre lotes) y no
+    se cierra al terminar; si ese pool se cae se relanza BrokenProcessPool
+    (despues de entregar lo ya terminado) para que el dueno lo recree y
+    reintente el resto, en vez de marcar todo lo que estaba en vuelo como error.
+    """
+    external = pool is not None
+    hashes = hashes or {}
+    max_in_flight = workers * 2
+    pending = iter(pdfs)
+    in_flight = {}
+    with (ProcessPoolExecutor(max_workers=workers) if pool is None else nullcontext(pool)) as pool:
+        while True:
+            while len(in_flight) < max_in_flight:
+                pdf = next(pending, None)
+                if pdf is None:
+                    break
+                future = pool.submit(process_pdf, pdf, out_dir, json_dir_name, echo_text, hashes.get(pdf))
+                in_flight[future] = pdf
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = None
+            for future in done:
+                pdf = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    if not external:
+                        yield _worker_error(pdf, e, hashes)
+                    broken = e
+                except Exception as e:
+                    # excepcion fuera del contrato de _process_pdf: se aisla el documento
+                    yield _worker_error(pdf, e, hashes)
+            if broken is not None and external:
+                raise broken
+
+
+def _worker_error(pdf: Path, error: Exception, hashes: dict) -> dict:
+    print(f"❌ Error con {pdf.name}: {error}")
+    stats = _new_stats(pdf)
+    stats["sha256"] = hashes.get(pdf)
+    stats["error"] = str(error)
+    return stats
+
+
+def print_summary(results: list[dict], elapsed: float):
+    docs = len(results)
+    errors = sum(1 for r in results if r.get("error"))
+    pages = sum(r.get("pages", 0) for r in results if not r.get("error") and not r.get("deduplicated"))
+    elapsed = max(elapsed, 1e-9)
+    print("Resumen:")
+    print(f"- Documentos: {docs} (ok={docs - errors}, errores={errors})")
+    print(f"- Paginas: {pages}")
+    skipped = sum(r.get("pages_skipped", 0) for r in results)
+    if skipped:
+        print(f"- Paginas sin OCR por early exit: {skipped} (pendientes para src.complete_text)")
+    dedup = sum(1 for r in results if r.get("deduplicated"))
+    if dedup:
+        print(f"- Duplicados por contenido (sin OCR): {dedup}")
+    blank = sum(r.get("pages_blank", 0) for r in results)
+    if blank:
+        print(f"- Paginas en blanco sin OCR: {blank}")
+    hits = sum(r.get("cache_hits", 0) for r in results)
+    misses = sum(r.get("cache_misses", 0) for r in results)
+    if hits or misses:
+        print(f"- Cache OCR: hits={hits} misses={misses} ({hits / (hits + misses):.0%} hit rate)")
+    print(f"- Tiempo: {elapsed:.1f}s")
+    print(f"- Throughput: {docs / elapsed:.2f} docs/s, {pages / elapsed:.2f} pages/s")
+    stages = {}
+    for r in results:
+        for name, seconds in ((r.get("metrics") or {}).get("stages") or {}).items():
+            stages[name] = stages.get(name, 0.0) + seconds
+    if stages:
+        # "extract" incluye render/preprocess/deskew/ocr; en paralelo las etapas suman tiempo de CPU/hilo
+        detail = ", ".join(f"{k}={v:.2f}s" for k, v in sorted(stages.items(), key=lambda kv: -kv[1]))
+        print(f"- Etapas: {detail}")
+
+
+def export_metrics(stats: dict) -> None:
+    if not METRICS_FILE or not stats.get("metrics"):
+        return
+    record = {k: stats.get(k) for k in ("file", "label", "score", "pages", "pages_skipped", "error", "seconds")}
+    record.update(stats["metrics"])
+    record["recorded_at"] = datetime.now().isoformat(timespec="seconds")
+    try:
+        metrics.append_jsonl(METRICS_FILE, record)
+    except OSError as e:
+        print(f"[METRICS] No se pudo escribir {METRICS_FILE}: {e}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="OCR y clasificacion de PDFs")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=PIPELINE_WORKERS,
+        help="Procesos en paralelo (default: PIPELINE_WORKERS o 1)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        default=True,
+        help="Solo procesa PDFs nuevos, modificados o con error segun el manifest (default)",
+    )
+    mode.add_argument(
+        "--force",
+        dest="resume",
+        action="store_false",
+        help="Reprocesa todos los PDFs aunque el manifest diga que estan listos",
+    )
+    parser.add_argument(
+        "--echo-text",
+        action="store_true",
+        default=PIPELINE_ECHO_TEXT,
+        help="Imprime el texto extraido de cada PDF (default: PIPELINE_ECHO_TEXT o no)",
+    )
+    parser.add_argument(
+        "--queue",
+        action="store_true",
+        help="Varios nodos sobre el mismo INPUT_DIR: reparte los PDFs con la cola compartida (src.work_queue)",
+    )
+    args = parser.parse_args(argv)
+    if args.queue and not args.resume:
+        parser.error("--force no aplica con --queue; usar python -m src.work_queue reset")
+    return args
+
+
+def run_batch(
+    pdfs: list[Path],
+    out_dir: Path,
+    json_dir_name: str,
+    manifest: Manifest,
+    store,
+    workers: int = 1,
+    echo_text: bool = False,
+    pool: ProcessPoolExecutor | None = None,
+    on_done=None,
+    index=None,
+    reuse_previous: bool = True,
+) -> list[dict]:
+    """
+    Dedup -> proceso -> store + manifest + metricas de un lote de PDFs;
+    devuelve los stats de cada uno. Lo usan src.main (una corrida) y src.daemon
+    (un lote por llegada, con `pool` vivo entre lotes). `on_done(stats)` se
+    llama con cada resultado ya guardado y antes de registrarlo en el manifest
+    (el daemon mueve ahi el PDF, --queue cierra el lease). Con `index` el texto
+    de cada documento guardado se agrega al indice de busqueda. Con
+    reuse_previous=False (--force) el dedup solo cubre los PDFs del lote.
+    """
+    hashes, reuse, waiting = {}, [], {}
+    if DEDUP:
+        pdfs, hashes, reuse, waiting = dedup_pending(pdfs, manifest, store, reuse_previous)
+        duplicates = len(reuse) + sum(len(v) for v in waiting.values())
+        if duplicates:
+            print(f"Dedup: {duplicates} PDFs repiten el contenido de otro, se reutiliza su resultado")
+
+    results = []
+
+    def finish(stats: dict) -> None:
+        store_result(store, stats, index)
+        if on_done is not None:
+            on_done(stats)
+        results.append(stats)
+        try:
+            manifest.record(Path(stats["path"]), OCR_ENGINE, stats)
+        except OSError as e:
+            print(f"[MANIFEST] No se pudo registrar {stats['file']}: {e}")
+        export_metrics(stats)
+
+    for pdf, payload in reuse:
+        finish(reuse_result(pdf, hashes[pdf], payload, out_dir))
+
+    if pool is None:
+        workers = max(1, min(workers, len(pdfs) or 1))
+    if pdfs:
+        print(f"Procesando {len(pdfs)} PDFs desde {pdfs[0].parent.resolve()} (workers={workers})")
+    if pool is None and workers == 1:
+        runner = _run_sequential(pdfs, out_dir, json_dir_name, echo_text, hashes)
+    else:
+        runner = _run_pool(pdfs, out_dir, json_dir_name, workers, echo_text, hashes, pool)
+    for stats in runner:
+        payload = stats.get("payload")
+        finish(stats)
+        for dup in waiting.pop(stats["sha256"], []) if stats.get("sha256") else []:
+            if payload is None:
+                dup_stats = _new_stats(dup)
+                dup_stats["sha256"] = stats["sha256"]
+                dup_stats["error"] = f"mismo contenido que {stats['file']}, que fallo: {stats['error']}"
+                finish(dup_stats)
+            else:
+                finish(reuse_result(dup, stats["sha256"], payload, out_dir))
+    return results
+
+
+def write_prometheus(results: list[dict], elapsed: float) -> None:
+    if not METRICS_PROM_FILE:
+        return
+    docs = [dict(r.get("metrics") or {}, error=r.get("error")) for r in results]
+    try:
+        metrics.write_prometheus(METRICS_PROM_FILE, docs, elapsed)
+    except OSError as e:
+        print(f"[METRICS] No se pudo escribir {METRICS_PROM_FILE}: {e}")
+
+
+def select_pending(pdfs: list[Path], manifest: Manifest, store) -> list[Path]:
+    pending = []
+    for pdf in pdfs:
+        if not manifest.is_up_to_date(pdf, OCR_ENGINE, store.exists(pdf.stem)):
+            pending.append(pdf)
+    return pending
+
+
+def run_queue(pdfs: list[Path], out_dir: Path, json_dir_name: str, workers: int, echo_text: bool) -> list[dict]:
+    """
+    Modo multi-nodo: encola los PDFs de INPUT_DIR en la cola compartida y
+    procesa solo los que este nodo reclama, de a pocos, hasta vaciarla. El
+    manifest es por nodo (OUTPUT_DIR/nodes/<nodo>, WAL no sirve entre
+    maquinas); el store y classified/ son comunes. Exige una configuracion
+    sin bases WAL compartidas (validate_queue).
+    """
+    from src.work_queue import WorkQueue, print_status
+
+    validate_queue()
+
+    in_dir = Path(INPUT_DIR)
+    queue = WorkQueue(
+        QUEUE_DB or out_dir / "queue.sqlite", QUEUE_NODE or None, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS
+    )
+    added = queue.enqueue(pdfs)
+    print(f"Cola: {added} PDFs nuevos o modificados encolados (nodo {queue.node})")
+    manifest = Manifest(out_dir / "nodes" / queue.node / "manifest.sqlite")
+    store = open_store(STORE_BACKEND, out_dir, json_dir_name, STORE_BATCH_SIZE)
+    index = open_search_index(out_dir, json_dir_name)
+    workers = max(1, workers)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def close_lease(stats: dict) -> None:
+        if not queue.complete(Path(stats["path"]).name, stats):
+            print(f"[QUEUE] {stats['file']}: el lease vencio y lo tomo otro nodo")
+
+    results = []
+    try:
+        with queue.heartbeating():
+            while True:
+                names = queue.claim(workers * 2)
+                if not names:
+                    break
+                batch = [in_dir / name for name in names]
+                results += run_batch(
+                    batch, out_dir, json_dir_name, manifest, store, workers, echo_text, pool,
+                    on_done=close_lease, index=index,
+                )
+                store.flush()
+                if index is not None:
+                    index.flush()
+    finally:
+        released = queue.release()
+        if released:
+            print(f"[QUEUE] {released} PDFs sin terminar vuelven a la cola")
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        store.close()
+        if index is not None:
+            index.close()
+        manifest.close()
+        print_status(queue)
+        queue.close()
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    validate()
     in_dir = Path(INPUT_DIR)
     out_dir = Path(OUTPUT_DIR)
     json_dir_name = get_json_dir_name()
@@ -32,42 +548,38 @@ def main():
         print(f"⚠️ No hay PDFs en {in_dir.resolve()}")
         return
 
-    print(f"Procesando {len(pdfs)} PDFs desde {in_dir.resolve()}")
+    if args.queue:
+        started = time.perf_counter()
+        results = run_queue(pdfs, out_dir, json_dir_name, args.workers, args.echo_text)
+        elapsed = time.perf_counter() - started
+        print_summary(results, elapsed)
+        write_prometheus(results, elapsed)
+        return
 
-    for pdf in pdfs:
-        try:
-            print(f"[START] {pdf.name}")
-            print("[STEP] Extrayendo texto...")
-            text = extract_text_from_pdf(str(pdf))
-            print(f"----- OCR TEXT BEGIN: {pdf.name} -----")
-            print(text if text else "[empty]")
-            print("----- OCR TEXT END -----")
-            print("[STEP] Clasificando...")
-            result = classify_text_rules(text)
+    manifest = Manifest(out_dir / "manifest.sqlite")
+    store = open_store(STORE_BACKEND, out_dir, json_dir_name, STORE_BATCH_SIZE)
+    if args.resume:
+        total = len(pdfs)
+        pdfs = select_pending(pdfs, manifest, store)
+        print(f"Manifest: {total - len(pdfs)} PDFs sin cambios, {len(pdfs)} por procesar")
+        if not pdfs:
+            store.close()
+            manifest.close()
+            return
 
-            # guarda json
-            print("[STEP] Guardando JSON...")
-            payload = {
-                "file": pdf.name,
-                "text": text,
-                "label": result.label,
-                "score": result.score,
-                "evidence": result.evidence,
-                "processed_at": datetime.now().isoformat(timespec="seconds"),
-            }
-            json_path = out_dir / json_dir_name / f"{pdf.stem}.json"
-            json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-
-            # mover/copy
-            print("[STEP] Copiando PDF clasificado...")
-            dest_pdf = out_dir / "classified" / result.label / pdf.name
-            shutil.copy2(pdf, dest_pdf)   # si quieres mover: shutil.move(pdf, dest_pdf)
-
-            print(f"✅ {pdf.name} -> {result.label} (score={result.score:.2f})")
-            print(f"[DONE] {pdf.name}")
-
-        except Exception as e:
-            print(f"❌ Error con {pdf.name}: {e}")
+    started = time.perf_counter()
+    index = open_search_index(out_dir, json_dir_name)
+    results = run_batch(
+        pdfs, out_dir, json_dir_name, manifest, store, args.workers, args.echo_text, index=index,
+        reuse_previous=args.resume,
+    )
+    store.close()
+    if index is not None:
+        index.close()
+    manifest.close()
+    elapsed = time.perf_counter() - started
+    print_summary(results, elapsed)
+    write_prometheus(results, elapsed)
 
 if __name__ == "__main__":
     main()
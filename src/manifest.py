@@ -0,0 +1,131 @@
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+
+def file_sha256(path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Registro de procesamiento por PDF (SQLite en OUTPUT_DIR/manifest.sqlite).
+
+    Una fila por (ruta, motor) con tamano, mtime y hash del PDF, estado
+    (done/error) y tiempos. Permite que un rerun procese solo documentos
+    nuevos, modificados o que fallaron.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " path TEXT NOT NULL,"
+            " engine TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " sha256 TEXT,"
+            " status TEXT NOT NULL,"
+            " label TEXT,"
+            " error TEXT,"
+            " pages INTEGER,"
+            " seconds REAL,"
+            " processed_at TEXT,"
+            " PRIMARY KEY (path, engine))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (sha256, engine)")
+        self._conn.commit()
+
+    def get(self, path: str, engine: str) -> dict | None:
+        cur = self._conn.execute(
+            "SELECT * FROM documents WHERE path = ? AND engine = ?", (path, engine)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cur.description], row))
+
+    def find_done_by_sha256(self, sha256: str, engine: str, exclude: Path | None = None) -> dict | None:
+        """Otro documento ya procesado ("done") con exactamente el mismo contenido."""
+        exclude_path = str(exclude.resolve()) if exclude is not None else ""
+        cur = self._conn.execute(
+            "SELECT * FROM documents WHERE sha256 = ? AND engine = ? AND status = 'done' AND path != ?"
+            " ORDER BY processed_at LIMIT 1",
+            (sha256, engine, exclude_path),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cur.description], row))
+
+    def find_by_name(self, file_name: str, engine: str) -> dict | None:
+        """Ultimo registro "done" de un PDF con ese nombre, este donde este (p.ej. archivado por el daemon)."""
+        suffix = os.sep + file_name
+        cur = self._conn.execute(
+            "SELECT * FROM documents WHERE substr(path, -?) = ? AND engine = ? AND status = 'done'"
+            " ORDER BY processed_at DESC LIMIT 1",
+            (len(suffix), suffix, engine),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cur.description], row))
+
+    def is_up_to_date(self, pdf: Path, engine: str, output: Path | bool) -> bool:
+        """
+        True si el PDF ya quedo "done" con este motor, su resultado existe
+        (`output`: ruta del JSON, o si ya esta en el store) y el archivo no
+        cambio. Solo se calcula el hash cuando cambian tamano o mtime (p.ej. un
+        archivo copiado de nuevo con el mismo contenido).
+        """
+        has_output = output if isinstance(output, bool) else output.exists()
+        record = self.get(str(pdf.resolve()), engine)
+        if record is None or record["status"] != "done" or not has_output:
+            return False
+        st = pdf.stat()
+        if record["size"] == st.st_size and record["mtime"] == st.st_mtime:
+            return True
+        if record["size"] != st.st_size or not record["sha256"]:
+            return False
+        if file_sha256(pdf) != record["sha256"]:
+            return False
+        self._conn.execute(
+            "UPDATE documents SET mtime = ? WHERE path = ? AND engine = ?",
+            (st.st_mtime, str(pdf.resolve()), engine),
+        )
+        self._conn.commit()
+        return True
+
+    def record(self, pdf: Path, engine: str, stats: dict) -> None:
+        st = pdf.stat()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents"
+            " (path, engine, size, mtime, sha256, status, label, error, pages, seconds, processed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(pdf.resolve()),
+                engine,
+                st.st_size,
+                st.st_mtime,
+                stats.get("sha256"),
+                "error" if stats.get("error") else "done",
+                stats.get("label"),
+                stats.get("error"),
+                stats.get("pages"),
+                stats.get("seconds"),
+                datetime.now().isoformat(timespec="seconds"),
+            ),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
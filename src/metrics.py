@@ -0,0 +1,190 @@
+"""
+Instrumentacion por etapas del pipeline (render, preprocess, deskew, ocr,
+classify, json_write, copy...).
+
+Cada documento tiene un DocMetrics; el codigo de mas abajo (ocr_tesseract,
+extract_text) solo llama a `stage("deskew")` y el tiempo se atribuye al
+documento (y a la pagina, si hay una activa) que el hilo este procesando.
+Sin un DocMetrics activo todo es no-op.
+
+PROFILE_STAGES=ocr,deskew corre esas etapas bajo cProfile y deja un .prof por
+llamada en OUTPUT_DIR/profiles (abrir con snakeviz o pstats). Para py-spy no
+hace falta nada: los hilos de OCR se llaman "ocr-page-*" y cada etapa es una
+llamada normal en el stack.
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_local = threading.local()
+_profile_seq = 0
+_profile_lock = threading.Lock()
+
+
+class DocMetrics:
+    def __init__(self, file: str):
+        self.file = file
+        self.stages: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.pages: dict[int, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, page: int | None = None) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            if page is not None:
+                per_page = self.pages.setdefault(page, {})
+                per_page[name] = per_page.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "file": self.file,
+                "stages": {k: round(v, 6) for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+                "page_stages": [
+                    {"page": n, **{k: round(v, 6) for k, v in stages.items()}}
+                    for n, stages in sorted(self.pages.items())
+                ],
+            }
+
+
+def current() -> DocMetrics | None:
+    return getattr(_local, "metrics", None)
+
+
+def current_page() -> int | None:
+    return getattr(_local, "page", None)
+
+
+@contextmanager
+def recording(metrics: DocMetrics | None, page: int | None = None):
+    """Activa `metrics` (y opcionalmente una pagina) para el hilo actual."""
+    prev = (current(), current_page())
+    _local.metrics = metrics
+    _local.page = page
+    try:
+        yield metrics
+    finally:
+        _local.metrics, _local.page = prev
+
+
+@contextmanager
+def page(page_num: int):
+    """Atribuye las etapas siguientes a esta pagina (mismo DocMetrics)."""
+    with recording(current(), page_num):
+        yield
+
+
+def bind(fn):
+    """Envuelve fn para que corra con el DocMetrics del hilo que la crea (pools)."""
+    metrics = current()
+
+    def wrapper(*args, **kwargs):
+        with recording(metrics):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def count(name: str, value: int = 1) -> None:
+    metrics = current()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def _profiled_stages() -> set[str]:
+    raw = os.getenv("PROFILE_STAGES") or ""
+    return {s.strip() for s in raw.split(",") if s.strip()}
+
+
+def _profile_path(name: str) -> Path:
+    global _profile_seq
+    with _profile_lock:
+        _profile_seq += 1
+        seq = _profile_seq
+    metrics = current()
+    doc = Path(metrics.file).stem if metrics else "run"
+    out = Path(os.getenv("OUTPUT_DIR") or "output") / "profiles"
+    out.mkdir(parents=True, exist_ok=True)
+    return out / f"{name}-{doc}-{os.getpid()}-{seq}.prof"
+
+
+@contextmanager
+def stage(name: str, page: int | None = None):
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    if page is None:
+        page = current_page()
+
+    profiler = cProfile.Profile() if name in _profiled_stages() else None
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(_profile_path(name)))
+        metrics.add(name, time.perf_counter() - started, page)
+
+
+def append_jsonl(path: str | Path, record: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def write_prometheus(path: str | Path, docs: list[dict], elapsed: float) -> None:
+    """
+    Agregados de la corrida en formato textfile de Prometheus (node_exporter).
+    Se escribe a un .tmp y se renombra para que el collector nunca lea a medias.
+    """
+    stages: dict[str, float] = {}
+    counters: dict[str, int] = {}
+    errors = 0
+    for doc in docs:
+        if doc.get("error"):
+            errors += 1
+        for name, seconds in (doc.get("stages") or {}).items():
+            stages[name] = stages.get(name, 0.0) + seconds
+        for name, value in (doc.get("counters") or {}).items():
+            counters[name] = counters.get(name, 0) + value
+
+    lines = [
+        "# HELP clasificador_documents Documentos procesados en la ultima corrida.",
+        "# TYPE clasificador_documents gauge",
+        f"clasificador_documents {len(docs)}",
+        "# HELP clasificador_document_errors Documentos con error en la ultima corrida.",
+        "# TYPE clasificador_document_errors gauge",
+        f"clasificador_document_errors {errors}",
+        "# HELP clasificador_run_seconds Duracion de la ultima corrida.",
+        "# TYPE clasificador_run_seconds gauge",
+        f"clasificador_run_seconds {elapsed:.6f}",
+        "# HELP clasificador_stage_seconds Tiempo por etapa en la ultima corrida (suma de documentos).",
+        "# TYPE clasificador_stage_seconds gauge",
+    ]
+    lines += [f'clasificador_stage_seconds{{stage="{k}"}} {v:.6f}' for k, v in sorted(stages.items())]
+    lines += [
+        "# HELP clasificador_counter Contadores de la ultima corrida (bytes, paginas...).",
+        "# TYPE clasificador_counter gauge",
+    ]
+    lines += [f'clasificador_counter{{name="{k}"}} {v}' for k, v in sorted(counters.items())]
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
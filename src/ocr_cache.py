@@ -0,0 +1,125 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# subir cuando cambie el codigo de OCR de forma que invalide textos ya guardados
+CACHE_VERSION = 1
+
+
+def cache_key(digest: str, engine: str, dpi: int, params: dict) -> str:
+    """Clave = hash de la pagina + motor + DPI + parametros de preprocesamiento."""
+    meta = json.dumps(
+        {"v": CACHE_VERSION, "engine": engine, "dpi": dpi, "params": params},
+        sort_keys=True,
+    )
+    return f"{digest}:{hashlib.sha256(meta.encode('utf-8')).hexdigest()[:16]}"
+
+
+class OcrCache:
+    """
+    Cache persistente de texto OCR por pagina (SQLite en OUTPUT_DIR).
+
+    Acotado por tamano total de texto (max_bytes) con expulsion LRU segun
+    last_used. El total se lleva en la tabla ocr_cache_meta y se actualiza en
+    la misma transaccion que cada put, asi un put no recorre la tabla; el orden
+    por last_used solo se lee cuando hay que expulsar. Los last_used de los
+    hits se acumulan en memoria y se escriben de a TOUCH_BATCH (o en el
+    siguiente put / close). Es seguro entre hilos (un lock por instancia) y
+    entre procesos (cada proceso abre su propia conexion, BEGIN IMMEDIATE
+    serializa las escrituras).
+    """
+
+    TOUCH_BATCH = 64
+
+    def __init__(self, path: str | Path, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_lru ON ocr_cache(last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ocr_cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # caches creados antes de ocr_cache_meta: el total se calcula una sola vez
+        self._conn.execute(
+            "INSERT OR IGNORE INTO ocr_cache_meta (name, value)"
+            " SELECT 'bytes', COALESCE(SUM(size), 0) FROM ocr_cache"
+        )
+        self._conn.execute("COMMIT")
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._flush_touched()
+                self._conn.execute("COMMIT")
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._flush_touched()
+                row = self._conn.execute("SELECT size FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, text, size, time.time()),
+                )
+                total = self._add_bytes(size - (row[0] if row else 0))
+                if total > self.max_bytes:
+                    self._evict(total - self.max_bytes)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE ocr_cache SET last_used = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _add_bytes(self, delta: int) -> int:
+        self._conn.execute("UPDATE ocr_cache_meta SET value = value + ? WHERE name = 'bytes'", (delta,))
+        return self._conn.execute("SELECT value FROM ocr_cache_meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self, excess: int) -> None:
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM ocr_cache WHERE key = ?", victims)
+        self._add_bytes(-freed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._touched:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._flush_touched()
+                self._conn.execute("COMMIT")
+            self._conn.close()
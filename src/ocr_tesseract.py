@@ -1,10 +1,16 @@
 import os
+import shlex
+import subprocess
+import tempfile
 from io import BytesIO
+from pathlib import Path
 
 import numpy as np
 from PIL import Image, ImageEnhance, ImageOps
 import pytesseract
 
+from src import metrics
+
 
 def _configure_tesseract_cmd() -> None:
     tesseract_cmd = os.getenv("TESSERACT_CMD")
@@ -63,7 +69,93 @@ def _estimate_skew_angle(image: Image.Image, max_angle: float, step: float) -> f
     return best_angle
 
 
-def preprocess_image(image: Image.Image) -> Image.Image:
+_DESKEW_METHODS = {"projection", "rotate"}
+# tope de pixeles de tinta usados para estimar el angulo (se submuestrea con paso fijo)
+_SKEW_MAX_POINTS = 200_000
+
+
+def _projection_scores(ys: np.ndarray, xs: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    Score de perfil de proyeccion por angulo, todos los angulos en una pasada:
+    se rota solo la coordenada y de los pixeles de tinta (misma convencion que
+    Image.rotate, antihorario) y se cuenta tinta por fila con un unico bincount.
+    """
+    rad = np.deg2rad(angles.astype(np.float32))
+    proj = np.outer(np.cos(rad), ys) - np.outer(np.sin(rad), xs)
+    bins = np.rint(proj - proj.min(axis=1, keepdims=True)).astype(np.int64)
+    n_bins = int(bins.max()) + 1
+    bins += (np.arange(len(angles), dtype=np.int64) * n_bins)[:, None]
+    counts = np.bincount(bins.ravel(), minlength=len(angles) * n_bins)
+    counts = counts.reshape(len(angles), n_bins).astype(np.float64)
+    return np.sum(counts * counts, axis=1)
+
+
+def _estimate_skew_angle_projection(ink: np.ndarray, max_angle: float, step: float) -> float:
+    """
+    Igual que _estimate_skew_angle pero sin rotar la imagen: `ink` es la mascara
+    booleana de tinta. Busqueda gruesa (1 grado) y luego fina con `step` alrededor
+    del mejor, sobre la misma grilla -max_angle + k * step que el metodo original.
+    """
+    if max_angle <= 0 or step <= 0:
+        return 0.0
+
+    ys, xs = np.nonzero(ink)
+    if ys.size == 0:
+        return 0.0
+    if ys.size > _SKEW_MAX_POINTS:
+        stride = -(-ys.size // _SKEW_MAX_POINTS)
+        ys = ys[::stride]
+        xs = xs[::stride]
+    ys = ys.astype(np.float32) - ink.shape[0] / 2.0
+    xs = xs.astype(np.float32) - ink.shape[1] / 2.0
+
+    n_steps = int(np.floor(2 * max_angle / step + 1e-9))
+    coarse = max(1, int(round(1.0 / step)))
+    ks = np.arange(0, n_steps + 1, coarse)
+    best_k = int(ks[np.argmax(_projection_scores(ys, xs, -max_angle + ks * step))])
+
+    if coarse > 1:
+        ks = np.arange(max(0, best_k - coarse + 1), min(n_steps, best_k + coarse - 1) + 1)
+        best_k = int(ks[np.argmax(_projection_scores(ys, xs, -max_angle + ks * step))])
+
+    return float(-max_angle + best_k * step)
+
+
+def _binarize(gray: Image.Image, threshold: int) -> Image.Image:
+    arr = np.asarray(gray)
+    return Image.fromarray(np.where(arr > threshold, 255, 0).astype(np.uint8))
+
+
+def _deskew_method() -> str:
+    # rotate sigue siendo el default: projection cambia levemente el angulo (y el texto OCR)
+    method = (os.getenv("TESSERACT_DESKEW_METHOD") or "rotate").strip().lower()
+    return method if method in _DESKEW_METHODS else "rotate"
+
+
+def preprocess_params() -> dict:
+    """Parametros de preprocesamiento leidos del entorno (TESSERACT_*)."""
+    return {
+        "contrast": _env_float("TESSERACT_CONTRAST", "1.8"),
+        "binarize": _env_flag("TESSERACT_BINARIZE", "1"),
+        "threshold": _env_int("TESSERACT_THRESHOLD", "180"),
+        "deskew": _env_flag("TESSERACT_DESKEW", "1"),
+        "deskew_max_angle": _env_float("TESSERACT_DESKEW_MAX_ANGLE", "5"),
+        "deskew_step": _env_float("TESSERACT_DESKEW_STEP", "0.5"),
+        "deskew_scale": _env_float("TESSERACT_DESKEW_SCALE", "0.5"),
+        "deskew_method": _deskew_method(),
+    }
+
+
+
+def ocr_params(lang: str = "spa") -> dict:
+    """Todo lo que cambia el texto que devuelve ocr_image_bytes_tesseract (clave de cache)."""
+    params = preprocess_params()
+    params["lang"] = lang
+    params["psm"] = os.getenv("TESSERACT_PSM", "6")
+    return params
+
+
+def preprocess_image(image: Image.Image, params: dict | None = None) -> Image.Image:
     """
     Basic preprocessing for OCR:
     - grayscale
@@ -72,20 +164,23 @@ def preprocess_image(image: Image.Image) -> Image.Image:
     - optional deskew
     - optional binarization (black/white)
     """
+    if params is None:
+        params = preprocess_params()
+
+    with metrics.stage("preprocess"):
+        return _preprocess_image(image, params)
+
+
+def _preprocess_image(image: Image.Image, params: dict) -> Image.Image:
     gray = ImageOps.grayscale(image)
     gray = ImageOps.autocontrast(gray)
 
-    contrast = _env_float("TESSERACT_CONTRAST", "1.8")
-    gray = ImageEnhance.Contrast(gray).enhance(contrast)
+    gray = ImageEnhance.Contrast(gray).enhance(params["contrast"])
 
-    binarize = _env_flag("TESSERACT_BINARIZE", "1")
-    threshold = _env_int("TESSERACT_THRESHOLD", "180")
+    threshold = params["threshold"]
 
-    deskew = _env_flag("TESSERACT_DESKEW", "1")
-    if deskew:
-        max_angle = _env_float("TESSERACT_DESKEW_MAX_ANGLE", "5")
-        step = _env_float("TESSERACT_DESKEW_STEP", "0.5")
-        scale = _env_float("TESSERACT_DESKEW_SCALE", "0.5")
+    if params["deskew"]:
+        scale = params["deskew_scale"]
 
         skew_img = gray
         if 0 < scale < 1:
@@ -94,23 +189,117 @@ def preprocess_image(image: Image.Image) -> Image.Image:
                 max(1, int(skew_img.height * scale)),
             )
             skew_img = skew_img.resize(new_size, Image.BILINEAR)
-        skew_img = skew_img.point(lambda p: 255 if p > threshold else 0)
-        angle = _estimate_skew_angle(skew_img, max_angle, step)
-        if abs(angle) >= 0.1:
-            gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        max_angle = params["deskew_max_angle"]
+        step = params["deskew_step"]
+        with metrics.stage("deskew"):
+            if params["deskew_method"] == "rotate":
+                angle = _estimate_skew_angle(_binarize(skew_img, threshold), max_angle, step)
+            else:
+                ink = np.asarray(skew_img) <= threshold
+                angle = _estimate_skew_angle_projection(ink, max_angle, step)
+            if abs(angle) >= 0.1:
+                gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
 
-    if binarize:
-        gray = gray.point(lambda p: 255 if p > threshold else 0)
+    if params["binarize"]:
+        gray = _binarize(gray, threshold)
 
     return gray
 
 
 def ocr_image_bytes_tesseract(png_bytes: bytes, lang: str = "spa") -> str:
+    return ocr_image_tesseract(Image.open(BytesIO(png_bytes)), lang=lang)
+
+
+def _tesseract_config() -> str:
+    psm = os.getenv("TESSERACT_PSM", "6")
+    return f"--oem 3 --psm {psm}"
+
+
+def ocr_image_tesseract(image: Image.Image, lang: str = "spa") -> str:
+    """OCR de una imagen ya decodificada (p.ej. la vista de un PageRaster)."""
     _configure_tesseract_cmd()
-    image = Image.open(BytesIO(png_bytes))
     processed = preprocess_image(image)
 
-    psm = os.getenv("TESSERACT_PSM", "6")
-    config = f"--oem 3 --psm {psm}"
-    text = pytesseract.image_to_string(processed, lang=lang, config=config)
+    with metrics.stage("ocr"):
+        text = pytesseract.image_to_string(processed, lang=lang, config=_tesseract_config())
     return (text or "").strip()
+
+
+def ocr_images_tesseract(images: list[Image.Image], lang: str = "spa") -> list[str]:
+    """
+    OCR de varias paginas con una sola invocacion de tesseract (lista de
+    archivos), en vez de un proceso por pagina: el arranque y la carga del
+    traineddata se pagan una vez. La salida se separa por el page separator
+    (\\f) y queda igual que ocr_image_tesseract pagina por pagina.
+    """
+    if len(images) <= 1:
+        return [ocr_image_tesseract(image, lang=lang) for image in images]
+    _configure_tesseract_cmd()
+    processed = [preprocess_image(image) for image in images]
+
+    with tempfile.TemporaryDirectory(prefix="tess_batch_") as tmp:
+        paths = []
+        for i, image in enumerate(processed):
+            path = Path(tmp) / f"page_{i:04d}.png"
+            image.save(path, format="PNG")
+            paths.append(str(path))
+        list_file = Path(tmp) / "pages.txt"
+        list_file.write_text("\n".join(paths) + "\n", encoding="utf-8")
+
+        cmd = [
+            pytesseract.pytesseract.tesseract_cmd,
+            str(list_file),
+            "stdout",
+            "-l",
+            lang,
+            *shlex.split(_tesseract_config()),
+            "txt",
+        ]
+        with metrics.stage("ocr"):
+            proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", "replace").strip())
+
+    pages = proc.stdout.decode("utf-8", "replace").split("\f")
+    if len(pages) == len(images) + 1 and not pages[-1].strip():
+        pages.pop()
+    if len(pages) != len(images):
+        print(f"[OCR] Tesseract batch: {len(pages)} paginas para {len(images)} imagenes, se repite por pagina")
+        return [ocr_image_tesseract(image, lang=lang) for image in images]
+    return [page.strip() for page in pages]
+
+
+def text_and_confidence(data: dict) -> tuple[str, float | None]:
+    """
+    Texto y confianza media (0-100) de las palabras a partir de la salida de
+    image_to_data (Output.DICT). Lineas separadas por salto de linea y parrafos
+    por linea en blanco, como image_to_string. None si no hay palabras.
+    """
+    paragraphs: dict[tuple, dict[int, list[str]]] = {}
+    confs = []
+    for i, word in enumerate(data.get("text") or []):
+        word = (word or "").strip()
+        if not word:
+            continue
+        key = (data["page_num"][i], data["block_num"][i], data["par_num"][i])
+        paragraphs.setdefault(key, {}).setdefault(data["line_num"][i], []).append(word)
+        conf = float(data["conf"][i])
+        if conf >= 0:
+            confs.append(conf)
+    text = "\n\n".join(
+        "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+        for _, lines in sorted(paragraphs.items())
+    )
+    return text, (round(sum(confs) / len(confs), 2) if confs else None)
+
+
+def ocr_image_tesseract_data(image: Image.Image, lang: str = "spa") -> tuple[str, float | None]:
+    """Como ocr_image_tesseract pero con una sola llamada a image_to_data: (texto, confianza media)."""
+    _configure_tesseract_cmd()
+    processed = preprocess_image(image)
+
+    with metrics.stage("ocr"):
+        data = pytesseract.image_to_data(
+            processed, lang=lang, config=_tesseract_config(), output_type=pytesseract.Output.DICT
+        )
+    return text_and_confidence(data)
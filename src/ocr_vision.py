@@ -1,14 +1,147 @@
+import os
+import random
+import threading
+import time
+
+from google.api_core import exceptions as gexc
 from google.cloud import vision
 
-def ocr_image_bytes_vision(png_bytes: bytes) -> str:
-    client = vision.ImageAnnotatorClient()
-    image = vision.Image(content=png_bytes)
+# limite de imagenes por batch_annotate_images de la API
+MAX_BATCH_SIZE = 16
+
+_RETRYABLE_EXCEPTIONS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.InternalServerError,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.TooManyRequests,
+)
+# codigos google.rpc.Code transitorios en el error de cada imagen del batch
+_RETRYABLE_CODES = {4, 8, 10, 13, 14}  # DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_in_flight = None
+_sleep = time.sleep
+
+
+def _env_int(name: str, default: str) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return int(default)
+    try:
+        return int(raw)
+    except ValueError:
+        return int(default)
+
+
+def _env_float(name: str, default: str) -> float:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return float(default)
+    try:
+        return float(raw)
+    except ValueError:
+        return float(default)
+
+
+def get_client():
+    """
+    Un ImageAnnotatorClient por proceso (canal gRPC y auth se reutilizan).
+    Si el proceso se forkeo despues de crearlo, se crea uno nuevo: los canales
+    gRPC no sobreviven a un fork.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = vision.ImageAnnotatorClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+def set_client(client) -> None:
+    """Reemplaza el cliente del proceso (p.ej. un anotador falso en tests)."""
+    global _client, _client_pid
+    with _client_lock:
+        _client = client
+        _client_pid = os.getpid()
 
+
+def _in_flight_semaphore() -> threading.BoundedSemaphore:
+    global _in_flight
+    with _client_lock:
+        if _in_flight is None:
+            _in_flight = threading.BoundedSemaphore(max(1, _env_int("VISION_MAX_IN_FLIGHT", "4")))
+        return _in_flight
+
+
+def _backoff(attempt: int) -> float:
+    base = max(0.0, _env_float("VISION_RETRY_BASE_SECONDS", "1.0"))
+    return min(32.0, base * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+
+def _request(png_bytes: bytes) -> "vision.AnnotateImageRequest":
     # document_text_detection suele ir mejor para documentos
-    response = client.document_text_detection(image=image)
+    return vision.AnnotateImageRequest(
+        image=vision.Image(content=png_bytes),
+        features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+    )
+
 
-    if response.error.message:
-        raise RuntimeError(f"Google Vision error: {response.error.message}")
+def _annotate_batch(client, images: list[bytes]) -> list[str]:
+    """
+    Un batch_annotate_images con reintentos y backoff exponencial. Los errores
+    transitorios (cuota, no disponible, timeout) se reintentan: toda la llamada
+    si falla el RPC, o solo las imagenes afectadas si el error viene por imagen.
+    """
+    max_retries = max(0, _env_int("VISION_MAX_RETRIES", "5"))
+    texts: list[str | None] = [None] * len(images)
+    pending = list(range(len(images)))
+    attempt = 0
+    while True:
+        try:
+            with _in_flight_semaphore():
+                response = client.batch_annotate_images(
+                    requests=[_request(images[i]) for i in pending]
+                )
+        except _RETRYABLE_EXCEPTIONS as exc:
+            if attempt >= max_retries:
+                raise
+            delay = _backoff(attempt)
+            print(f"[OCR] Vision {type(exc).__name__}, retry {attempt + 1}/{max_retries} en {delay:.1f}s")
+            _sleep(delay)
+            attempt += 1
+            continue
 
-    annotation = response.full_text_annotation
-    return (annotation.text or "").strip()
+        retry = []
+        for i, res in zip(pending, response.responses):
+            if res.error.message:
+                if res.error.code in _RETRYABLE_CODES and attempt < max_retries:
+                    retry.append(i)
+                    continue
+                raise RuntimeError(f"Google Vision error: {res.error.message}")
+            texts[i] = (res.full_text_annotation.text or "").strip()
+
+        if not retry:
+            return texts
+        delay = _backoff(attempt)
+        print(f"[OCR] Vision: {len(retry)} imagenes con error transitorio, retry en {delay:.1f}s")
+        _sleep(delay)
+        attempt += 1
+        pending = retry
+
+
+def ocr_images_vision(images: list[bytes], batch_size: int = MAX_BATCH_SIZE) -> list[str]:
+    """OCR de varias imagenes agrupadas en requests de hasta batch_size (max 16)."""
+    client = get_client()
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    texts = []
+    for start in range(0, len(images), batch_size):
+        texts.extend(_annotate_batch(client, images[start:start + batch_size]))
+    return texts
+
+
+def ocr_image_bytes_vision(png_bytes: bytes) -> str:
+    return ocr_images_vision([png_bytes])[0]
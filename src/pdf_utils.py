@@ -1,4 +1,9 @@
+import hashlib
+from io import BytesIO
+
 import fitz  # pymupdf
+import numpy as np
+from PIL import Image
 
 def extract_embedded_text(pdf_path: str) -> str:
     """Extrae texto si el PDF tiene texto seleccionable (no escaneado)."""
@@ -25,3 +30,95 @@ def pdf_pages_as_png_bytes(pdf_path: str, dpi: int = 200):
         yield i + 1, pix.tobytes("png")
 
     doc.close()
+
+class PageRaster:
+    """
+    Pagina renderizada en escala de grises (1 byte por pixel) directo desde fitz,
+    sin codificar a PNG. image() y array() son vistas sobre el buffer del pixmap:
+    no copian, pero solo son validas mientras este objeto siga vivo.
+    """
+
+    def __init__(self, page_num: int, pixmap: "fitz.Pixmap", dpi: int):
+        self.page_num = page_num
+        self.pixmap = pixmap
+        self.dpi = dpi
+        self.width = pixmap.width
+        self.height = pixmap.height
+        # confianza media del OCR de esta pagina, si el motor la entrega (Tesseract adaptativo)
+        self.confidence = None
+
+    def image(self) -> Image.Image:
+        pix = self.pixmap
+        return Image.frombuffer("L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride, 1)
+
+    def array(self) -> np.ndarray:
+        pix = self.pixmap
+        arr = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+        return arr[:, : pix.width]
+
+    def png_bytes(self) -> bytes:
+        """PNG solo para motores que lo necesitan (Vision). Usa PIL: seguro desde hilos."""
+        buf = BytesIO()
+        self.image().save(buf, format="PNG")
+        return buf.getvalue()
+
+    def digest(self) -> str:
+        """Hash del contenido de la pagina (pixeles + dimensiones)."""
+        h = hashlib.sha256(f"{self.width}x{self.height}:".encode("ascii"))
+        h.update(self.pixmap.samples_mv)
+        return h.hexdigest()
+
+
+def open_pdf(pdf_path: str) -> "fitz.Document":
+    return fitz.open(pdf_path)
+
+
+def render_page(page: "fitz.Page", dpi: int) -> PageRaster:
+    """Renderiza una pagina ya abierta a PageRaster (escala de grises)."""
+    zoom = dpi / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return PageRaster(page.number + 1, pix, dpi)
+
+
+def ink_stats(gray: np.ndarray, ink_delta: int = 60, margin: float = 0.04) -> tuple[float, float]:
+    """
+    (fraccion de pixeles con tinta, desviacion estandar) de una pagina en gris.
+    Tinta = pixeles al menos `ink_delta` mas oscuros que el papel (la mediana),
+    asi un escaneo de papel grisaceo no cuenta como tinta. Se ignora un margen
+    de `margin` por lado (bordes del escaner, perforaciones).
+    """
+    h, w = gray.shape
+    dy, dx = int(h * margin), int(w * margin)
+    inner = gray[dy:h - dy or None, dx:w - dx or None]
+    if inner.size == 0:
+        return 0.0, 0.0
+    paper = int(np.median(inner))
+    ink = float(np.count_nonzero(inner <= paper - ink_delta)) / inner.size
+    return ink, float(inner.std())
+
+
+def is_blank_page(
+    page: "fitz.Page",
+    dpi: int = 50,
+    max_ink_ratio: float = 0.0003,
+    max_std: float = 8.0,
+    ink_delta: int = 60,
+) -> bool:
+    """
+    Prefiltro barato de paginas en blanco (dorsos, separadores): render a baja
+    resolucion y blanco solo si casi no hay tinta y la pagina es uniforme.
+    """
+    raster = render_page(page, dpi)
+    ink, std = ink_stats(raster.array(), ink_delta)
+    return ink <= max_ink_ratio and std <= max_std
+
+
+def pdf_pages_as_rasters(pdf_path: str, dpi: int = 200):
+    """
+    Genera PageRaster por pagina (escala de grises, sin PNG). Mas barato en CPU
+    y memoria que pdf_pages_as_png_bytes para Tesseract.
+    """
+    doc = open_pdf(pdf_path)
+    for page in doc:
+        yield render_page(page, dpi)
+    doc.close()
@@ -0,0 +1,68 @@
+"""
+Colocacion de los PDFs en output/classified/<label> sin duplicar bytes.
+
+- copy: shutil.copy2 (comportamiento historico).
+- hardlink: os.link; mismo inodo, sin espacio extra (mismo filesystem).
+- reflink: clon copy-on-write (ioctl FICLONE; btrfs, XFS con reflink, ...).
+- symlink: enlace simbolico absoluto al PDF de entrada.
+- auto: reflink -> hardlink -> copy, el primero que funcione.
+
+Si el modo pedido no esta disponible (otro filesystem, sin soporte) se copia.
+"""
+import fcntl
+import os
+import shutil
+from pathlib import Path
+
+MODES = ("copy", "hardlink", "reflink", "symlink", "auto")
+
+# _IOW(0x94, 9, int) de linux/fs.h
+_FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            dest.unlink(missing_ok=True)
+            raise
+    shutil.copystat(src, dest)
+
+
+def _try(mode: str, src: Path, dest: Path) -> None:
+    if mode == "hardlink":
+        os.link(src, dest)
+    elif mode == "reflink":
+        _reflink(src, dest)
+    elif mode == "symlink":
+        os.symlink(src.resolve(), dest)
+    else:
+        shutil.copy2(src, dest)
+
+
+def place_file(src: str | Path, dest: str | Path, mode: str = "copy") -> str:
+    """
+    Deja `src` en `dest` (reemplazando lo que hubiera) y devuelve el metodo
+    usado. Se escribe a un nombre temporal y se renombra, asi `dest` nunca
+    queda a medias.
+    """
+    src, dest = Path(src), Path(dest)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    candidates = ["reflink", "hardlink"] if mode == "auto" else [mode]
+    used = "copy"
+    for candidate in candidates:
+        if candidate == "copy":
+            break
+        try:
+            _try(candidate, src, tmp)
+            used = candidate
+            break
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    if used == "copy":
+        _try("copy", src, tmp)
+    os.replace(tmp, dest)
+    return used
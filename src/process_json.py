@@ -1,7 +1,8 @@
-import json
+import argparse
 import os
 import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -24,63 +25,205 @@ except ImportError:
             value = value.strip().strip('"').strip("'")
             os.environ.setdefault(key.strip(), value)
 
-from src.classifier_rules import classify_text_rules, KEYWORDS
+from src.classifier_rules import classify_text_rules, KEYWORDS, RULES_VERSION
+from src.corpus_store import BACKENDS, open_store
+from src.search_index import open_index
 
+CHUNK_SIZE = 200
 
-def main():
+
+def _text(payload: dict) -> str:
+    text = payload.get("text", "")
+    if not isinstance(text, str):
+        text = "" if text is None else str(text)
+    return text
+
+
+def classify_chunk(items: list[tuple[str, str]]) -> list[tuple[str, str, float, list[str]]]:
+    """[(nombre, texto)] -> [(nombre, label, score, evidence)]; corre en los workers."""
+    out = []
+    for name, text in items:
+        result = classify_text_rules(text)
+        out.append((name, result.label, result.score, result.evidence))
+    return out
+
+
+def _chunks(store, stale_for: str | None, pending: dict):
+    """Lotes de (nombre, texto) de los documentos a reevaluar; guarda sus payloads en `pending`."""
+    chunk = []
+    for name, payload in store.iter_payloads(stale_for=stale_for):
+        pending[name] = payload
+        chunk.append((name, _text(payload)))
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _classify_all(chunks, workers: int):
+    if workers <= 1:
+        for chunk in chunks:
+            yield from classify_chunk(chunk)
+        return
+    # en vuelo acotado: 2 lotes por worker, los payloads pendientes no crecen sin limite
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = []
+        for chunk in chunks:
+            in_flight.append(pool.submit(classify_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.pop(0).result()
+        for future in in_flight:
+            yield from future.result()
+
+
+def read_summary(path: Path) -> dict[str, tuple[str, float]]:
+    """{nombre: (label, score)} de un json_classification.txt anterior."""
+    if not path.exists():
+        return {}
+    entries = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3 or not parts[0].endswith(".json"):
+            continue
+        try:
+            entries[parts[0][: -len(".json")]] = (parts[1], float(parts[2]))
+        except ValueError:
+            continue
+    return entries
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Reclasifica los resultados guardados con las reglas actuales")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("PIPELINE_WORKERS") or "1"),
+        help="Procesos en paralelo (default: PIPELINE_WORKERS o 1)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reevalua todos los documentos, no solo los clasificados con otra version de reglas",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     load_dotenv()
     output_dir = os.getenv("OUTPUT_DIR")
     if not output_dir:
         raise RuntimeError("OUTPUT_DIR no definido")
 
     json_dir_name = (os.getenv("JSON_DIR_NAME") or "json").strip() or "json"
-    json_dir = Path(output_dir) / json_dir_name
-    if not json_dir.exists():
-        print(f"No existe la carpeta de JSON: {json_dir.resolve()}")
+    backend = (os.getenv("STORE_BACKEND") or "files").strip().lower()
+    if backend not in BACKENDS:
+        raise RuntimeError(" STORE_BACKEND invalido: use files o sqlite")
+    if backend == "files":
+        location = Path(output_dir) / json_dir_name
+    else:
+        location = Path(output_dir) / f"{json_dir_name}.sqlite"
+    if not location.exists():
+        print(f"No existe {location.resolve()}")
         return
 
-    json_files = sorted(json_dir.glob("*.json"))
-    if not json_files:
-        print(f"No hay JSONs en {json_dir.resolve()}")
+    store = open_store(backend, output_dir, json_dir_name)
+    total = len(store)
+    if not total:
+        print(f"No hay JSONs en {location.resolve()}")
+        store.close()
         return
 
-    labels = list(KEYWORDS.keys()) + ["Desconocido"]
-    counts = Counter()
-    summary_lines = []
-
-    print(f"Procesando {len(json_files)} JSONs desde {json_dir.resolve()}")
+    # el indice se mantiene aunque no cambie el texto: label/score de lo reevaluado,
+    # documentos del store que no estaban indexados y JSONs borrados (al armar el resumen)
+    index = None
+    if (os.getenv("SEARCH_INDEX") or "1").strip().lower() not in {"0", "false", "no", "off"}:
+        index = open_index(output_dir, json_dir_name)
 
-    for json_path in json_files:
-        try:
-            payload = json.loads(json_path.read_text(encoding="utf-8"))
-        except Exception as exc:
-            print(f"[ERROR] {json_path.name}: {exc}")
+    labels = list(KEYWORDS.keys()) + ["Desconocido"]
+    transitions = Counter()
+    classified = {}
+    diff_lines = []
+    unchanged = []
+    unchanged_total = 0
+    evaluated = 0
+
+    stale_for = None if args.force else RULES_VERSION
+    print(f"Procesando {total} JSONs desde {location.resolve()} (reglas {RULES_VERSION})")
+
+    pending = {}
+    results = _classify_all(_chunks(store, stale_for, pending), max(1, args.workers))
+    for name, label, score, evidence in results:
+        payload = pending.pop(name)
+        evaluated += 1
+        old_label = payload.get("label")
+        classified[name] = (label, score)
+        if index is not None:
+            index.add(name, _text(payload), label, score)
+
+        if (old_label, payload.get("score"), payload.get("evidence")) == (label, score, evidence):
+            unchanged.append(name)
+            unchanged_total += 1
+            if len(unchanged) >= CHUNK_SIZE:
+                store.mark_version(unchanged, RULES_VERSION)
+                unchanged = []
             continue
 
-        text = payload.get("text", "")
-        if not isinstance(text, str):
-            text = "" if text is None else str(text)
-
-        result = classify_text_rules(text)
-        payload["label"] = result.label
-        payload["score"] = result.score
-        payload["evidence"] = result.evidence
+        if old_label != label:
+            transitions[(old_label, label)] += 1
+            diff_lines.append(f"{name}.json\t{old_label}\t{label}\t{payload.get('score') or 0:.2f}\t{score:.2f}")
+            print(f"[CAMBIO] {name}.json: {old_label} -> {label} (score={score:.2f})")
+        payload["label"] = label
+        payload["score"] = score
+        payload["evidence"] = evidence
+        payload["rules_version"] = RULES_VERSION
         payload["classified_at"] = datetime.now().isoformat(timespec="seconds")
+        store.put(name, payload)
+    if unchanged:
+        store.mark_version(unchanged, RULES_VERSION)
 
-        json_path.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
-
-        counts[result.label] += 1
-        summary_lines.append(f"{json_path.name}\t{result.label}\t{result.score:.2f}")
-        print(f"[OK] {json_path.name} -> {result.label} (score={result.score:.2f})")
-
+    # el resumen cubre todo el corpus: lo reevaluado sale de esta corrida y el
+    # resto del store (del resumen anterior si el JSON no cambio desde entonces)
     summary_name = (os.getenv("JSON_SUMMARY_NAME") or "json_classification.txt").strip() or "json_classification.txt"
     summary_path = Path(output_dir) / summary_name
+    since_ns = summary_path.stat().st_mtime_ns if summary_path.exists() else None
+    summary_lines = []
+    counts = Counter()
+    stale = index.names() if index is not None else set()
+    for name, label, score in store.labels(read_summary(summary_path), since_ns):
+        stale.discard(name)
+        if index is not None and name not in classified and not index.has(name):
+            index.add(name, _text(store.get(name) or {}), label, score)
+        label, score = classified.get(name, (label or "Desconocido", score or 0))
+        counts[label] += 1
+        summary_lines.append(f"{name}.json\t{label}\t{score:.2f}")
+    store.close()
+    if index is not None:
+        for name in stale:
+            index.remove(name)
+        index.close()
+
+    print(
+        f"Reevaluados: {evaluated} de {total} "
+        f"(al dia con las reglas: {total - evaluated}, reescritos: {evaluated - unchanged_total})"
+    )
+
     summary_path.write_text("\n".join(summary_lines), encoding="utf-8")
     print(f"Resumen guardado en: {summary_path.resolve()}")
 
+    diff_path = Path(output_dir) / f"{Path(summary_name).stem}_diff.tsv"
+    diff_path.write_text(
+        "\n".join(["archivo\tlabel_anterior\tlabel_nuevo\tscore_anterior\tscore_nuevo"] + diff_lines),
+        encoding="utf-8",
+    )
+    if transitions:
+        print(f"Cambios de label ({len(diff_lines)} documentos, detalle en {diff_path.resolve()}):")
+        for (old, new), n in transitions.most_common():
+            print(f"- {old} -> {new}: {n}")
+    else:
+        print("Sin cambios de label")
+
     print("Totales por clasificacion:")
     for label in labels:
         print(f"- {label}: {counts.get(label, 0)}")
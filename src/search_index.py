@@ -0,0 +1,437 @@
+"""
+Indice invertido del texto extraido (OUTPUT_DIR/<json_dir>.index.sqlite) para
+buscar sin recorrer miles de JSON.
+
+- Terminos: palabras (\\w+) de normalize(texto), el mismo que usa el
+  clasificador, por pagina (marcadores --- PAGE n ---).
+- Postings: termino -> (documento, pagina, posiciones). Cada posicion es
+  2*ordinal + 1 si el separador con la palabra anterior no es exactamente un
+  espacio. Las frases de una busqueda ignoran la puntuacion; los patrones del
+  clasificador (\\bpalabra palabra\\b) exigen el espacio y dan lo mismo que el
+  regex sobre el texto.
+- Incremental: src.main, src.process_json y src.complete_text agregan o
+  reemplazan cada documento al guardarlo (SEARCH_INDEX=0 lo desactiva); si el
+  texto no cambio solo se actualiza label/score. src.process_json y build
+  ademas agregan lo que falte y quitan los documentos que ya no estan en el
+  store.
+
+    python -m src.search_index query 'rut "contrato de trabajo"'
+    python -m src.search_index evidence <nombre>
+    python -m src.search_index build          # indexa lo que falte del store
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from src.classifier_rules import DEFAULT_THRESHOLD, _MATCHER, ClassificationResult, normalize
+
+_TOKEN_RE = re.compile(r"\w+")
+_PAGE_MARKER_RE = re.compile(r"^--- PAGE (\d+) ---$", re.MULTILINE)
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+# patron de las tablas que se puede responder con postings: \b + palabras, espacios y clases [..] + \b
+_PHRASE_PATTERN_RE = re.compile(r"^\\b((?:[\w ]|\[\w+\])+)\\b$")
+_MAX_EXPANSIONS = 64
+_IN_CHUNK = 500
+
+
+def page_texts(text: str) -> list[tuple[int, str]]:
+    """[(pagina, texto)] segun los marcadores; sin marcadores todo es la pagina 1."""
+    markers = list(_PAGE_MARKER_RE.finditer(text))
+    if not markers:
+        return [(1, text)]
+    pages = []
+    if text[: markers[0].start()].strip():
+        pages.append((0, text[: markers[0].start()]))
+    for i, m in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages.append((int(m.group(1)), text[m.end():end]))
+    return pages
+
+
+def tokenize(text: str) -> Iterator[tuple[str, int]]:
+    """(termino, posicion) de normalize(text); ver el docstring del modulo."""
+    t = normalize(text)
+    prev_end = None
+    for i, m in enumerate(_TOKEN_RE.finditer(t)):
+        spaced = prev_end is not None and t[prev_end:m.start()] == " "
+        yield m.group(), (i << 1) | (0 if spaced else 1)
+        prev_end = m.end()
+
+
+def pattern_phrases(pattern: str) -> list[tuple[str, ...]] | None:
+    """
+    Frases (tuplas de terminos) equivalentes a un patron de KEYWORDS, o None si
+    el patron usa algo que los postings no pueden responder exacto.
+    """
+    m = _PHRASE_PATTERN_RE.match(pattern)
+    if not m:
+        return None
+    options = [[c.lower() for c in part[1:-1]] if part.startswith("[") else [part.lower()]
+               for part in re.findall(r"\[\w+\]|[\w ]", m.group(1))]
+    literals = [""]
+    for chars in options:
+        literals = [prefix + c for prefix in literals for c in chars]
+        if len(literals) > _MAX_EXPANSIONS:
+            return None
+    phrases = []
+    for literal in literals:
+        tokens = literal.split(" ")
+        if not all(tokens) or any(not _TOKEN_RE.fullmatch(tok) for tok in tokens):
+            return None
+        phrases.append(tuple(tokens))
+    return phrases
+
+
+def _rule_tables():
+    """(patron -> frases, patrones que solo se pueden evaluar con regex, hash de estos ultimos)."""
+    phrases, regex_only = {}, []
+    for p in _MATCHER.compiled:
+        expanded = pattern_phrases(p)
+        if expanded is None:
+            regex_only.append(p)
+        else:
+            phrases[p] = expanded
+    regex_set = hashlib.sha256(json.dumps(sorted(regex_only)).encode("utf-8")).hexdigest()[:12]
+    return phrases, regex_only, regex_set
+
+
+_PHRASES, _REGEX_ONLY, _REGEX_SET = _rule_tables()
+
+
+def _phrase_count(page: dict[str, list[int]], tokens: tuple[str, ...], exact: bool) -> int:
+    """Ocurrencias de la frase en una pagina {termino: posiciones}."""
+    first = page.get(tokens[0])
+    if not first:
+        return 0
+    if len(tokens) == 1:
+        return len(first)
+    following = []
+    for tok in tokens[1:]:
+        positions = page.get(tok)
+        if not positions:
+            return 0
+        following.append({p >> 1 for p in positions if not (exact and p & 1)})
+    return sum(
+        1 for p in first if all((p >> 1) + k in ordinals for k, ordinals in enumerate(following, start=1))
+    )
+
+
+def parse_query(query: str) -> list[tuple[str, ...]]:
+    """'rut "contrato de trabajo"' -> [("rut",), ("contrato", "de", "trabajo")]; todas deben estar."""
+    clauses = []
+    for phrase, word in _QUERY_RE.findall(query):
+        tokens = tuple(term for term, _ in tokenize(phrase or word))
+        if tokens:
+            clauses.append(tokens)
+    return clauses
+
+
+class SearchIndex:
+    def __init__(self, path: str | Path, batch_size: int = 500):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self._uncommitted = 0
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id INTEGER PRIMARY KEY,"
+            " name TEXT NOT NULL UNIQUE,"
+            " label TEXT,"
+            " score REAL,"
+            " text_hash TEXT NOT NULL,"
+            " regex_set TEXT NOT NULL,"
+            " indexed_at TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " term_id INTEGER PRIMARY KEY,"
+            " term TEXT NOT NULL UNIQUE,"
+            " df INTEGER NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term_id INTEGER NOT NULL,"
+            " doc_id INTEGER NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " positions BLOB NOT NULL,"
+            " PRIMARY KEY (term_id, doc_id, page)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+            "CREATE TABLE IF NOT EXISTS doc_patterns ("
+            " doc_id INTEGER NOT NULL,"
+            " pattern TEXT NOT NULL,"
+            " PRIMARY KEY (doc_id, pattern)) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+
+    def _doc(self, name: str):
+        return self._conn.execute(
+            "SELECT doc_id, label, score, text_hash, regex_set FROM docs WHERE name = ?", (name,)
+        ).fetchone()
+
+    def has(self, name: str) -> bool:
+        return self._doc(name) is not None
+
+    def names(self) -> set[str]:
+        return {name for (name,) in self._conn.execute("SELECT name FROM docs")}
+
+    def _term_ids(self, terms: list[str], create: bool = False) -> dict[str, tuple[int, int]]:
+        if create:
+            self._conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(t,) for t in terms])
+        ids = {}
+        for i in range(0, len(terms), _IN_CHUNK):
+            chunk = terms[i:i + _IN_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT term, term_id, df FROM terms WHERE term IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            ids.update({term: (term_id, df) for term, term_id, df in rows})
+        return ids
+
+    def _drop_postings(self, doc_id: int) -> None:
+        counts = self._conn.execute(
+            "SELECT term_id, COUNT(*) FROM postings WHERE doc_id = ? GROUP BY term_id", (doc_id,)
+        ).fetchall()
+        self._conn.executemany("UPDATE terms SET df = df - ? WHERE term_id = ?", [(n, t) for t, n in counts])
+        self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self._conn.execute("DELETE FROM doc_patterns WHERE doc_id = ?", (doc_id,))
+
+    def add(self, name: str, text: str, label: str | None = None, score: float | None = None) -> bool:
+        """Indexa (o reemplaza) un documento. False si el texto ya estaba indexado tal cual."""
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        row = self._doc(name)
+        now = datetime.now().isoformat(timespec="seconds")
+        if row and row[3] == text_hash and row[4] == _REGEX_SET:
+            if (row[1], row[2]) != (label, score):
+                self._conn.execute("UPDATE docs SET label = ?, score = ? WHERE doc_id = ?", (label, score, row[0]))
+                self._maybe_commit()
+            return False
+        if row:
+            doc_id = row[0]
+            self._drop_postings(doc_id)
+            self._conn.execute(
+                "UPDATE docs SET label = ?, score = ?, text_hash = ?, regex_set = ?, indexed_at = ? WHERE doc_id = ?",
+                (label, score, text_hash, _REGEX_SET, now, doc_id),
+            )
+        else:
+            doc_id = self._conn.execute(
+                "INSERT INTO docs (name, label, score, text_hash, regex_set, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, label, score, text_hash, _REGEX_SET, now),
+            ).lastrowid
+
+        postings: dict[tuple[str, int], list[int]] = {}
+        for page, page_text in page_texts(text):
+            for term, pos in tokenize(page_text):
+                postings.setdefault((term, page), []).append(pos)
+        ids = self._term_ids(sorted({term for term, _ in postings}), create=True)
+        self._conn.executemany(
+            "INSERT INTO postings (term_id, doc_id, page, positions) VALUES (?, ?, ?, ?)",
+            [(ids[term][0], doc_id, page, array("I", positions).tobytes()) for (term, page), positions in postings.items()],
+        )
+        df: dict[int, int] = {}
+        for term, _ in postings:
+            df[ids[term][0]] = df.get(ids[term][0], 0) + 1
+        self._conn.executemany("UPDATE terms SET df = df + ? WHERE term_id = ?", [(n, t) for t, n in df.items()])
+
+        if _REGEX_ONLY:
+            normalized = normalize(text)
+            self._conn.executemany(
+                "INSERT INTO doc_patterns (doc_id, pattern) VALUES (?, ?)",
+                [(doc_id, p) for p in _REGEX_ONLY if _MATCHER.compiled[p].search(normalized)],
+            )
+        self._maybe_commit()
+        return True
+
+    def remove(self, name: str) -> None:
+        row = self._doc(name)
+        if row:
+            self._drop_postings(row[0])
+            self._conn.execute("DELETE FROM docs WHERE doc_id = ?", (row[0],))
+            self._maybe_commit()
+
+    def _maybe_commit(self) -> None:
+        self._uncommitted += 1
+        if self._uncommitted >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def _postings(self, term_id: int, doc_ids: set[int] | None):
+        if doc_ids is None:
+            yield from self._conn.execute(
+                "SELECT doc_id, page, positions FROM postings WHERE term_id = ?", (term_id,)
+            )
+            return
+        ordered = sorted(doc_ids)
+        for i in range(0, len(ordered), _IN_CHUNK):
+            chunk = ordered[i:i + _IN_CHUNK]
+            yield from self._conn.execute(
+                f"SELECT doc_id, page, positions FROM postings WHERE term_id = ? AND doc_id IN ({','.join('?' * len(chunk))})",
+                (term_id, *chunk),
+            )
+
+    def search(self, query: str, limit: int = 20, label: str | None = None) -> list[dict]:
+        """
+        Documentos que contienen todas las palabras/frases de `query`, con las
+        paginas donde aparecen; ordenados por cantidad de ocurrencias.
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        self.flush()
+        terms = sorted({t for clause in clauses for t in clause})
+        ids = self._term_ids(terms)
+        if len(ids) < len(terms):
+            return []
+        # del termino mas raro al mas comun, acotando los documentos candidatos
+        pages: dict[tuple[int, int], dict[str, list[int]]] = {}
+        candidates = None
+        for term in sorted(terms, key=lambda t: ids[t][1]):
+            found = set()
+            for doc_id, page, blob in self._postings(ids[term][0], candidates):
+                found.add(doc_id)
+                pages.setdefault((doc_id, page), {})[term] = array("I", blob).tolist()
+            candidates = found
+            if not candidates:
+                return []
+
+        hits: dict[int, dict[int, int]] = {}
+        for (doc_id, page), page_terms in pages.items():
+            if doc_id not in candidates:
+                continue
+            counts = [_phrase_count(page_terms, clause, exact=False) for clause in clauses]
+            if any(counts):
+                hits.setdefault(doc_id, {})[page] = counts
+        results = []
+        for doc_id, by_page in hits.items():
+            # cada clausula tiene que aparecer en alguna pagina del documento
+            if not all(any(counts[i] for counts in by_page.values()) for i in range(len(clauses))):
+                continue
+            name, doc_label, score = self._conn.execute(
+                "SELECT name, label, score FROM docs WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+            if label and doc_label != label:
+                continue
+            results.append({
+                "file": name,
+                "label": doc_label,
+                "score": score,
+                "pages": sorted(by_page),
+                "hits": sum(sum(counts) for counts in by_page.values()),
+            })
+        results.sort(key=lambda r: (-r["hits"], r["file"]))
+        return results[:limit]
+
+    def found_patterns(self, name: str) -> set[str] | None:
+        """
+        Patrones de las reglas presentes en el documento, desde los postings (sin
+        leer el texto). None si no esta indexado o se indexo con otros patrones
+        solo-regex (hay que reindexarlo).
+        """
+        self.flush()
+        row = self._doc(name)
+        if row is None or row[4] != _REGEX_SET:
+            return None
+        doc_id = row[0]
+        terms = sorted({t for phrases in _PHRASES.values() for phrase in phrases for t in phrase})
+        pages: dict[int, dict[str, list[int]]] = {}
+        for i in range(0, len(terms), _IN_CHUNK):
+            chunk = terms[i:i + _IN_CHUNK]
+            rows = self._conn.execute(
+                "SELECT t.term, p.page, p.positions FROM postings p JOIN terms t ON t.term_id = p.term_id"
+                f" WHERE p.doc_id = ? AND t.term IN ({','.join('?' * len(chunk))})",
+                (doc_id, *chunk),
+            )
+            for term, page, blob in rows:
+                pages.setdefault(page, {})[term] = array("I", blob).tolist()
+        found = {
+            p for p, phrases in _PHRASES.items()
+            if any(_phrase_count(page, phrase, exact=True) for phrase in phrases for page in pages.values())
+        }
+        found.update(r[0] for r in self._conn.execute("SELECT pattern FROM doc_patterns WHERE doc_id = ?", (doc_id,)))
+        return found
+
+    def classify(self, name: str, threshold: float = DEFAULT_THRESHOLD) -> ClassificationResult | None:
+        """Lo mismo que classify_text_rules(texto) pero desde el indice; None si no se puede."""
+        found = self.found_patterns(name)
+        return None if found is None else _MATCHER.classify_found(found, threshold)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+def index_path(output_dir: str | Path, json_dir_name: str) -> Path:
+    return Path(output_dir) / f"{json_dir_name}.index.sqlite"
+
+
+def open_index(output_dir: str | Path, json_dir_name: str) -> SearchIndex:
+    return SearchIndex(index_path(output_dir, json_dir_name))
+
+
+def main(argv=None):
+    from src.corpus_store import open_store
+
+    output_dir = os.getenv("OUTPUT_DIR") or "output"
+    json_dir_name = (os.getenv("JSON_DIR_NAME") or "json").strip() or "json"
+    parser = argparse.ArgumentParser(description="Busqueda en el texto extraido (indice invertido)")
+    parser.add_argument("command", choices=("query", "evidence", "build"))
+    parser.add_argument("args", nargs="*", help="query: palabras y \"frases\"; evidence: nombre del documento")
+    parser.add_argument("--output-dir", type=Path, default=Path(output_dir))
+    parser.add_argument("--name", default=json_dir_name, help="json o tesseract_json (default: JSON_DIR_NAME o json)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--label", default=None, help="query: solo documentos con este label")
+    args = parser.parse_intermixed_args(argv)
+
+    path = index_path(args.output_dir, args.name)
+    if args.command != "build" and not path.exists():
+        print(f"No hay indice en {path.resolve()} (python -m src.search_index build)")
+        return
+    index = SearchIndex(path)
+    try:
+        if args.command == "query":
+            started = time.perf_counter()
+            results = index.search(" ".join(args.args), args.limit, args.label)
+            elapsed = (time.perf_counter() - started) * 1000
+            for r in results:
+                pages = ",".join(str(p) for p in r["pages"])
+                print(f"{r['file']}\t{r['label']}\t{r['hits']} hits\tpaginas {pages}")
+            print(f"{len(results)} documentos en {elapsed:.1f} ms")
+        elif args.command == "evidence":
+            for name in args.args:
+                result = index.classify(name)
+                if result is None:
+                    print(f"{name}: no esta indexado con las reglas actuales (python -m src.search_index build)")
+                else:
+                    print(f"{name}\t{result.label}\t{result.score:.2f}\t{', '.join(result.evidence)}")
+        else:
+            backend = (os.getenv("STORE_BACKEND") or "files").strip().lower()
+            store = open_store(backend, args.output_dir, args.name)
+            added = total = 0
+            stale = index.names()
+            try:
+                for name, payload in store.iter_payloads():
+                    total += 1
+                    stale.discard(name)
+                    added += index.add(name, payload.get("text") or "", payload.get("label"), payload.get("score"))
+            finally:
+                store.close()
+            for name in stale:
+                index.remove(name)
+            print(f"Indexados {added} de {total} documentos en {index.path.resolve()} (quitados: {len(stale)})")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Cola de trabajo compartida para que varias maquinas vacien el mismo INPUT_DIR
+(p.ej. montado por NFS) sin procesar dos veces el mismo PDF.
+
+Una tabla `jobs` en OUTPUT_DIR/queue.sqlite (o QUEUE_DB) con un registro por
+PDF (clave: nombre dentro de INPUT_DIR, igual en todos los nodos aunque el
+punto de montaje cambie):
+
+- pending -> leased: claim() toma hasta N documentos en una transaccion
+  BEGIN IMMEDIATE y les pone un lease de QUEUE_LEASE_SECONDS a nombre del nodo.
+- Un hilo de heartbeat renueva los leases del proceso mientras trabaja; si el
+  nodo muere, el lease vence y otro nodo lo reclama (cuenta como `reclaimed`).
+- leased -> done/error: complete() solo si el lease sigue siendo del proceso.
+  Un documento que agota QUEUE_MAX_ATTEMPTS leases vencidos queda en error
+  (p.ej. un PDF que tumba al worker).
+- Si el PDF cambia (tamano o mtime) vuelve a pending al encolarlo de nuevo.
+
+La base usa journal_mode=DELETE (no WAL, que no funciona entre maquinas) y
+necesita locks de archivo funcionando en el filesystem compartido (NFSv4).
+Los vencimientos usan el reloj de cada nodo: con NTP el desfase es minimo
+frente a QUEUE_LEASE_SECONDS.
+La tabla `nodes` acumula estadisticas por nodo:
+
+    python -m src.work_queue status
+    python -m src.work_queue reset --errors
+"""
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " name TEXT PRIMARY KEY,"
+    " size INTEGER NOT NULL,"
+    " mtime_ns INTEGER NOT NULL,"
+    " status TEXT NOT NULL,"
+    " node TEXT,"
+    " pid INTEGER,"
+    " lease_until REAL,"
+    " attempts INTEGER NOT NULL DEFAULT 0,"
+    " label TEXT,"
+    " error TEXT,"
+    " seconds REAL,"
+    " updated_at TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until)",
+    "CREATE TABLE IF NOT EXISTS nodes ("
+    " node TEXT PRIMARY KEY,"
+    " pid INTEGER,"
+    " started_at TEXT,"
+    " heartbeat_at TEXT,"
+    " claimed INTEGER NOT NULL DEFAULT 0,"
+    " done INTEGER NOT NULL DEFAULT 0,"
+    " errors INTEGER NOT NULL DEFAULT 0,"
+    " reclaimed INTEGER NOT NULL DEFAULT 0,"
+    " pages INTEGER NOT NULL DEFAULT 0,"
+    " seconds REAL NOT NULL DEFAULT 0)",
+)
+
+
+def default_node() -> str:
+    return socket.gethostname()
+
+
+def _now_iso() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    # autocommit: cada operacion abre su propio BEGIN IMMEDIATE corto
+    conn = sqlite3.connect(str(path), timeout=60, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    return conn
+
+
+class WorkQueue:
+    def __init__(
+        self,
+        path: str | Path,
+        node: str | None = None,
+        lease_seconds: float = 120,
+        max_attempts: int = 3,
+        register: bool = True,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.node = node or default_node()
+        self.pid = os.getpid()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._conn = _connect(self.path)
+        self._lock = threading.Lock()
+        with self._transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            if not register:
+                return
+            conn.execute(
+                "INSERT INTO nodes (node, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(node) DO UPDATE SET pid = excluded.pid, started_at = excluded.started_at,"
+                " heartbeat_at = excluded.heartbeat_at",
+                (self.node, self.pid, _now_iso(), _now_iso()),
+            )
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, pdfs: list[Path]) -> int:
+        """Registra los PDFs nuevos o modificados como pending; devuelve cuantos."""
+        rows = []
+        for pdf in pdfs:
+            try:
+                st = pdf.stat()
+            except FileNotFoundError:
+                continue
+            rows.append((pdf.name, st.st_size, st.st_mtime_ns, _now_iso()))
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO jobs (name, size, mtime_ns, status, updated_at) VALUES (?, ?, ?, 'pending', ?)"
+                " ON CONFLICT(name) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,"
+                " status = 'pending', node = NULL, pid = NULL, lease_until = NULL, attempts = 0,"
+                " error = NULL, updated_at = excluded.updated_at"
+                " WHERE jobs.size != excluded.size OR jobs.mtime_ns != excluded.mtime_ns",
+                rows,
+            )
+            return conn.total_changes - before
+
+    def claim(self, limit: int = 1) -> list[str]:
+        """
+        Toma hasta `limit` documentos pending o con lease vencido. Los vencidos
+        que ya agotaron max_attempts pasan a error en vez de reintentarse.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'error', error = 'lease vencido ' || attempts || ' veces',"
+                " lease_until = NULL, updated_at = ?"
+                " WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (_now_iso(), now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT name, status FROM jobs"
+                " WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?)"
+                " ORDER BY status = 'leased', name LIMIT ?",
+                (now, max(1, limit)),
+            ).fetchall()
+            if not rows:
+                return []
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', node = ?, pid = ?, lease_until = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE name = ?",
+                [(self.node, self.pid, now + self.lease_seconds, _now_iso(), name) for name, _ in rows],
+            )
+            reclaimed = sum(1 for _, status in rows if status == "leased")
+            conn.execute(
+                "UPDATE nodes SET claimed = claimed + ?, reclaimed = reclaimed + ?, heartbeat_at = ?"
+                " WHERE node = ?",
+                (len(rows), reclaimed, _now_iso(), self.node),
+            )
+        return [name for name, _ in rows]
+
+    def heartbeat(self) -> int:
+        """Renueva los leases de este proceso; devuelve cuantos siguen vivos."""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = 'leased' AND node = ? AND pid = ?",
+                (time.time() + self.lease_seconds, self.node, self.pid),
+            )
+            conn.execute("UPDATE nodes SET heartbeat_at = ? WHERE node = ?", (_now_iso(), self.node))
+            return cur.rowcount
+
+    @contextmanager
+    def heartbeating(self, interval: float | None = None):
+        """Hilo que llama a heartbeat() cada lease/3 mientras dura el bloque."""
+        interval = interval or max(self.lease_seconds / 3, 0.05)
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.heartbeat()
+                except sqlite3.Error as e:
+                    print(f"[QUEUE] heartbeat fallo: {e}")
+
+        thread = threading.Thread(target=loop, name="queue-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, name: str, stats: dict) -> bool:
+        """
+        Cierra el documento como done/error con los datos de `stats`. Devuelve
+        False si el lease ya no era de este proceso (vencio y otro nodo lo tomo).
+        """
+        error = stats.get("error")
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, lease_until = NULL, label = ?, error = ?, seconds = ?, updated_at = ?"
+                " WHERE name = ? AND status = 'leased' AND node = ? AND pid = ?",
+                (
+                    "error" if error else "done",
+                    stats.get("label"),
+                    error,
+                    stats.get("seconds"),
+                    _now_iso(),
+                    name,
+                    self.node,
+                    self.pid,
+                ),
+            )
+            if cur.rowcount != 1:
+                # el resultado lo cuenta el nodo que reclamo el lease
+                return False
+            conn.execute(
+                "UPDATE nodes SET done = done + ?, errors = errors + ?, pages = pages + ?, seconds = seconds + ?,"
+                " heartbeat_at = ? WHERE node = ?",
+                (
+                    0 if error else 1,
+                    1 if error else 0,
+                    0 if stats.get("deduplicated") else stats.get("pages") or 0,
+                    stats.get("seconds") or 0.0,
+                    _now_iso(),
+                    self.node,
+                ),
+            )
+        return True
+
+    def release(self) -> int:
+        """Devuelve a pending los leases de este proceso (salida ordenada)."""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'pending', node = NULL, pid = NULL, lease_until = NULL,"
+                " attempts = MAX(attempts - 1, 0), updated_at = ?"
+                " WHERE status = 'leased' AND node = ? AND pid = ?",
+                (_now_iso(), self.node, self.pid),
+            )
+            return cur.rowcount
+
+    def reset(self, errors_only: bool = False) -> int:
+        statuses = ("error",) if errors_only else ("error", "done")
+        with self._transaction() as conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, updated_at = ?"
+                f" WHERE status IN ({', '.join('?' * len(statuses))})",
+                (_now_iso(), *statuses),
+            )
+            return cur.rowcount
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def node_stats(self) -> list[dict]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM nodes ORDER BY node")
+            columns = [c[0] for c in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def print_status(queue: WorkQueue) -> None:
+    counts = queue.counts()
+    total = sum(counts.values())
+    detail = ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+    print(f"Cola {queue.path}: {total} documentos ({detail or 'vacia'})")
+    for n in queue.node_stats():
+        rate = n["done"] / n["seconds"] if n["seconds"] else 0.0
+        print(
+            f"- {n['node']}: claimed={n['claimed']} done={n['done']} errors={n['errors']}"
+            f" reclaimed={n['reclaimed']} pages={n['pages']} ({rate:.2f} docs/s de worker),"
+            f" ultimo heartbeat {n['heartbeat_at']}"
+        )
+
+
+def main(argv=None):
+    output_dir = os.getenv("OUTPUT_DIR") or "output"
+    default_db = (os.getenv("QUEUE_DB") or "").strip() or str(Path(output_dir) / "queue.sqlite")
+    parser = argparse.ArgumentParser(description="Estado de la cola compartida de src.main --queue")
+    parser.add_argument("command", choices=("status", "reset"))
+    parser.add_argument("--db", type=Path, default=Path(default_db))
+    parser.add_argument("--errors", action="store_true", help="reset: solo los documentos con error")
+    args = parser.parse_args(argv)
+
+    if not args.db.exists():
+        print(f"No hay cola en {args.db}")
+        return
+    queue = WorkQueue(args.db, register=False)
+    try:
+        if args.command == "status":
+            print_status(queue)
+        else:
+            print(f"{queue.reset(args.errors)} documentos vuelven a pending")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from benchmarks.corpus import generate_corpus
+from benchmarks.run import compare
+from src.classifier_rules import classify_text_rules
+from src.pdf_utils import extract_embedded_text
+
+
+def test_corpus_is_reproducible_and_labelled(tmp_path):
+    a = generate_corpus(tmp_path / "a", pages=1, kinds=("text",))
+    b = generate_corpus(tmp_path / "b", pages=1, kinds=("text",))
+    assert a == b
+    for doc in a:
+        assert (tmp_path / "a" / doc["file"]).read_bytes() == (tmp_path / "b" / doc["file"]).read_bytes()
+        text = extract_embedded_text(str(tmp_path / "a" / doc["file"]))
+        assert classify_text_rules(text).label == doc["label"]
+
+
+def test_scanned_pages_have_no_embedded_text(tmp_path):
+    docs = generate_corpus(tmp_path, pages=1, kinds=("scan",), dpi=50)
+    assert extract_embedded_text(str(tmp_path / docs[0]["file"])) == ""
+
+
+def test_compare_flags_only_slower_stages():
+    baseline = {"stages": {"ocr": {"ms_per_item": 10.0}, "classify": {"ms_per_item": 1.0}}}
+    results = {"ocr": {"ms_per_item": 13.0}, "classify": {"ms_per_item": 0.5}, "new": {"ms_per_item": 9.0}}
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("ocr:")
+
+
+def test_process_json_stage_removes_its_temp_dir(tmp_path, monkeypatch):
+    import tempfile
+
+    from benchmarks.run import Bench, run_stages
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    docs = generate_corpus(tmp_path / "corpus", pages=1, kinds=("text",))
+    results = run_stages(Bench(tmp_path / "corpus", docs, dpi=50, repeat=1), ["process_json"])
+    assert results["process_json"]["items"] == len(docs)
+    assert list((tmp_path / "tmp").iterdir()) == []
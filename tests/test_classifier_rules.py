@@ -0,0 +1,65 @@
+import random
+
+from src.classifier_rules import (
+    KEYWORDS,
+    _classify_text_rules_legacy,
+    classify_text_rules,
+    is_decisive,
+)
+
+
+def _phrases() -> list[str]:
+    phrases = []
+    for patterns in KEYWORDS.values():
+        for p in patterns:
+            phrases.append(
+                p.replace(r"\b", "").replace(r"\(", "(").replace(r"\)", ")")
+                .replace("[oó]", "ó").replace("[aá]", "a").replace("[eé]", "e")
+            )
+    return phrases + [
+        "comprobante de registro", "anexos", "CONTRATOS", "Señor(A)", "ſeguro",
+        "ıva", "contrato\nde\ttrabajo", "x", "de", "", "seguros",
+    ]
+
+
+def test_matcher_matches_legacy_on_random_texts():
+    rng = random.Random(0)
+    phrases = _phrases()
+    for _ in range(2000):
+        text = " ".join(rng.choice(phrases) for _ in range(rng.randint(0, 15)))
+        if rng.random() < 0.2:
+            text = text.upper()
+        if rng.random() < 0.1:
+            text = text.replace(" ", "")
+        assert classify_text_rules(text) == _classify_text_rules_legacy(text), text
+
+
+def test_overlapping_patterns_are_all_found():
+    result = classify_text_rules("ANEXO DE CONTRATO DE TRABAJO con modificación")
+    assert result.label == "Anexos"
+    assert result.evidence == [
+        r"\banexo de contrato de trabajo\b",
+        r"\banexo\b",
+        r"\banexo de contrato\b",
+        r"\bmodificaci[oó]n\b",
+    ]
+
+
+def test_override_wins():
+    result = classify_text_rules("contrato de trabajo ... Comprobante de Registro")
+    assert result.label == "comprobantes"
+    assert result.score == 1.0
+
+
+def test_empty_text_is_unknown():
+    result = classify_text_rules("")
+    assert result.label == "Desconocido"
+    assert result.evidence == []
+
+
+def test_is_decisive_requires_score_and_margin():
+    contrato = "contrato de trabajo entre empleador y trabajador, jornada"
+    assert is_decisive(contrato, min_score=0.5, min_margin=0.25)
+    assert not is_decisive(contrato, min_score=0.9, min_margin=0.25)
+    assert not is_decisive("iva", min_score=0.05, min_margin=0.0)  # 0.1 < threshold
+    assert is_decisive("comprobante de registro", min_score=0.99, min_margin=0.99)
@@ -0,0 +1,65 @@
+import json
+from multiprocessing import get_context
+
+from src.corpus_store import FileStore, SqliteStore, copy_store
+
+
+def test_sqlite_store_batches_and_streams(tmp_path):
+    store = SqliteStore(tmp_path / "json.sqlite", batch_size=2)
+    store.put("a", {"file": "a.pdf", "text": "hola " * 100, "label": "Cartas", "score": 0.5})
+    assert store.exists("a") and store.get("a")["label"] == "Cartas"
+    store.put("b", {"file": "b.pdf", "text": "chao", "label": None, "score": 0.0})
+    store.put("c", {"file": "c.pdf", "text": "", "label": None, "score": 0.0})
+
+    names = []
+    for name, payload in store.iter_payloads(chunk_size=1):
+        names.append(name)
+        store.put(name, dict(payload, label="Contratos"))  # reescribir mientras se itera
+    store.close()
+
+    reopened = SqliteStore(tmp_path / "json.sqlite")
+    assert names == ["a", "b", "c"]
+    assert len(reopened) == 3
+    assert {p["label"] for _, p in reopened.iter_payloads()} == {"Contratos"}
+
+
+def test_export_and_import_keep_per_file_layout(tmp_path):
+    store = SqliteStore(tmp_path / "json.sqlite")
+    store.put("doc", {"file": "doc.pdf", "text": "contrato de trabajo", "label": "Contratos"})
+    target = FileStore(tmp_path / "json")
+    assert copy_store(store, target) == 1
+    exported = json.loads((tmp_path / "json" / "doc.json").read_text(encoding="utf-8"))
+    assert exported["text"] == "contrato de trabajo"
+
+    back = SqliteStore(tmp_path / "again.sqlite")
+    assert copy_store(target, back) == 1
+    assert back.get("doc") == exported
+
+
+def test_file_store_versions_merge_between_processes(tmp_path):
+    a, b = FileStore(tmp_path / "json"), FileStore(tmp_path / "json")
+    a.mark_version(["doc1"], "v1")
+    b.mark_version(["doc2"], "v1")
+    a.flush()
+    b.flush()
+    versions = json.loads((tmp_path / "json.rules.json").read_text(encoding="utf-8"))
+    assert versions == {"doc1": "v1", "doc2": "v1"}
+
+
+def _flush_versions(json_dir, worker):
+    for i in range(20):
+        store = FileStore(json_dir)
+        store.mark_version([f"w{worker}-{i}"], "v1")
+        store.flush()
+
+
+def test_file_store_versions_concurrent_flushes_keep_every_entry(tmp_path):
+    ctx = get_context("spawn")
+    procs = [ctx.Process(target=_flush_versions, args=(tmp_path / "json", w)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    versions = json.loads((tmp_path / "json.rules.json").read_text(encoding="utf-8"))
+    assert len(versions) == 80
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import fitz  # pymupdf
+import pytest
+
+from src.daemon import IN_CLOSE_WRITE, _EVENT, Watcher, _parse_events, candidates, claim, work_dirs
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def _event(name: bytes, mask: int) -> bytes:
+    padded = name + b"\0" * (16 - len(name))
+    return _EVENT.pack(1, mask, 0, len(padded)) + padded
+
+
+def test_parse_events_keeps_close_write_and_moved_to():
+    data = _event(b"a.pdf", IN_CLOSE_WRITE) + _event(b"b.pdf", 0x00000100) + _event(b"c.pdf", 0x00000080)
+    assert _parse_events(data) == ["a.pdf", "c.pdf"]
+
+
+def test_candidates_wait_for_settle_unless_notified(tmp_path):
+    old = tmp_path / "old.pdf"
+    new = tmp_path / "new.pdf"
+    for path in (old, new, tmp_path / "notes.txt"):
+        path.write_bytes(b"%PDF")
+    os.utime(old, (1000, 1000))
+    os.utime(new, (2000, 2000))
+    assert candidates(tmp_path, set(), settle=5, now=2001) == [old]
+    assert candidates(tmp_path, {"new.pdf"}, settle=5, now=2001) == [old, new]
+
+
+def test_claim_moves_once(tmp_path):
+    dirs = work_dirs(tmp_path)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF")
+    assert claim([pdf], dirs["processing"]) == [dirs["processing"] / "doc.pdf"]
+    assert claim([pdf], dirs["processing"]) == []
+    assert not pdf.exists()
+
+
+def test_watcher_reports_arrivals(tmp_path):
+    watcher = Watcher(tmp_path)
+    if watcher.mode != "inotify":
+        pytest.skip("sin inotify")
+    try:
+        (tmp_path / "doc.pdf").write_bytes(b"%PDF")
+        assert "doc.pdf" in watcher.wait(2)
+    finally:
+        watcher.close()
+
+
+def test_daemon_once_processes_and_archives(tmp_path):
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    in_dir.mkdir()
+    text = "contrato de trabajo entre empleador y trabajador, remuneracion mensual y jornada. " * 5
+    doc = fitz.open()
+    doc.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=10)
+    doc.save(str(in_dir / "a.pdf"))
+    doc.close()
+    (in_dir / "b.pdf").write_bytes((in_dir / "a.pdf").read_bytes())
+    env = dict(
+        os.environ, OCR_ENGINE="tesseract", INPUT_DIR=str(in_dir), OUTPUT_DIR=str(out_dir),
+        OCR_CACHE="0", METRICS_FILE="", METRICS_PROM_FILE="", STORE_BACKEND="files",
+    )
+    subprocess.run(
+        [sys.executable, "-m", "src.daemon", "--once"], cwd=ROOT_DIR, env=env, check=True, capture_output=True
+    )
+    done = in_dir / ".daemon" / "done"
+    assert sorted(p.name for p in done.iterdir()) == ["a.pdf", "b.pdf"]
+    assert not list(in_dir.glob("*.pdf"))
+    payload = json.loads((out_dir / "tesseract_json" / "b.json").read_text(encoding="utf-8"))
+    assert payload["duplicate_of"] == "a.pdf"
+
+
+def test_complete_text_finds_pdfs_archived_by_daemon(tmp_path, monkeypatch):
+    from src import complete_text
+    from src.manifest import Manifest
+
+    monkeypatch.setattr(complete_text, "INPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(complete_text, "OCR_ENGINE", "tesseract")
+    dirs = work_dirs(tmp_path)
+    archived = dirs["done"] / "doc.pdf"
+    archived.write_bytes(b"%PDF")
+    assert complete_text.find_source("doc.pdf") == archived
+
+    # el manifest manda: el daemon registra la ruta final antes de escribirlo
+    moved = tmp_path / "otro" / "doc.pdf"
+    moved.parent.mkdir()
+    archived.rename(moved)
+    manifest = Manifest(tmp_path / "manifest.sqlite")
+    manifest.record(moved, "tesseract", {"sha256": "x"})
+    assert complete_text.find_source("doc.pdf", manifest) == moved
+    assert complete_text.find_source("otro.pdf", manifest) is None
+    manifest.close()
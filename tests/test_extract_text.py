@@ -0,0 +1,177 @@
+from dataclasses import asdict
+
+import fitz  # pymupdf
+import pytest
+
+from src import extract_text
+
+
+def _mixed_pdf(path):
+    """Pagina 1 con texto, 2 escaneada (solo imagen), 3 con texto bajo el umbral, 4 con texto."""
+    doc = fitz.open()
+    doc.new_page().insert_text((40, 60), "contrato de trabajo digital firmado", fontsize=12)
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 40, 40), False)
+    pix.clear_with(200)
+    doc.new_page().insert_image(fitz.Rect(40, 40, 300, 300), pixmap=pix)
+    doc.new_page().insert_text((40, 60), "anexo 2", fontsize=12)
+    doc.new_page().insert_text((40, 60), "remuneracion mensual y jornada", fontsize=12)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    calls = []
+
+    def ocr_batch(rasters):
+        calls.extend(r.page_num for r in rasters)
+        return [f"texto ocr pagina {r.page_num}" for r in rasters]
+
+    for name, value in {
+        "OCR_ENGINE": "tesseract", "OCR_CACHE": False, "OCR_ADAPTIVE_DPI": False, "BLANK_PAGE_FILTER": False,
+        "OCR_PAGE_WORKERS_TESSERACT": 1, "TESSERACT_BATCH_SIZE": 1, "EMBEDDED_MIN_CHARS": 20,
+    }.items():
+        monkeypatch.setattr(extract_text, name, value)
+    monkeypatch.setattr(extract_text, "_ocr_batch", ocr_batch)
+    return calls
+
+
+def test_hybrid_ocr_only_pages_without_embedded_text(tmp_path, monkeypatch, fake_ocr):
+    pdf = tmp_path / "mixto.pdf"
+    _mixed_pdf(pdf)
+    opened = []
+    real_open = extract_text.open_pdf
+    monkeypatch.setattr(extract_text, "open_pdf", lambda path: opened.append(path) or real_open(path))
+
+    result = extract_text.extract_pdf(str(pdf), dpi=72, mode="hybrid")
+
+    assert opened == [str(pdf)]
+    assert fake_ocr == [2, 3]
+    assert [(p.page, p.source) for p in result.pages] == [(1, "embedded"), (2, "ocr"), (3, "ocr"), (4, "embedded")]
+    assert [p.dpi for p in result.pages] == [None, 72, 72, None]
+    assert result.page_count == 4 and result.pending_pages == []
+    assert "contrato de trabajo digital" in result.text and "texto ocr pagina 2" in result.text
+    assert result.text.index("--- PAGE 3 ---") < result.text.index("--- PAGE 4 ---")
+
+
+def test_document_mode_uses_embedded_text_for_whole_document(tmp_path, fake_ocr):
+    pdf = tmp_path / "mixto.pdf"
+    _mixed_pdf(pdf)
+    result = extract_text.extract_pdf(str(pdf), dpi=72, mode="document")
+    assert fake_ocr == []
+    assert {p.source for p in result.pages} == {"embedded"}
+
+
+def _scanned_pdf(path, pages):
+    doc = fitz.open()
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 40, 40), False)
+    pix.clear_with(200)
+    for _ in range(pages):
+        doc.new_page().insert_image(fitz.Rect(40, 40, 300, 300), pixmap=pix)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.fixture
+def scanned_ocr(monkeypatch, fake_ocr):
+    texts = {
+        1: "CONTRATO DE TRABAJO entre empleador y trabajador",
+        2: "jornada de trabajo y remuneracion mensual",
+        3: "anexo de contrato",
+        4: "finiquito",
+    }
+
+    def ocr_batch(rasters):
+        fake_ocr.extend(r.page_num for r in rasters)
+        return [texts[r.page_num] for r in rasters]
+
+    monkeypatch.setattr(extract_text, "_ocr_batch", ocr_batch)
+    return fake_ocr
+
+
+def test_stop_when_leaves_remaining_pages_pending(tmp_path, scanned_ocr):
+    pdf = tmp_path / "escaneado.pdf"
+    _scanned_pdf(pdf, 4)
+    seen = []
+
+    def decided(text):
+        seen.append(text)
+        return "remuneracion" in text
+
+    result = extract_text.extract_pdf(str(pdf), dpi=72, mode="hybrid", stop_when=decided)
+    assert scanned_ocr == [1, 2]
+    assert len(seen) == 2 and "--- PAGE 1 ---" in seen[0]
+    assert [p.page for p in result.pages] == [1, 2]
+    assert result.pending_pages == [3, 4] and result.page_count == 4
+
+
+def test_complete_payload_merges_pending_pages_in_order_and_reclassifies(tmp_path, scanned_ocr):
+    from src.classifier_rules import RULES_VERSION, classify_text_rules
+    from src.complete_text import complete_payload
+
+    pdf = tmp_path / "escaneado.pdf"
+    _scanned_pdf(pdf, 4)
+    partial = extract_text.extract_pdf(str(pdf), dpi=72, mode="hybrid", only_pages={1, 3})
+    early = classify_text_rules(partial.text)
+    payload = {
+        "file": pdf.name, "text": partial.text, "label": early.label, "score": early.score,
+        "evidence": early.evidence, "pages": [asdict(p) for p in partial.pages], "pending_pages": [2, 4],
+    }
+    scanned_ocr.clear()
+
+    assert complete_payload(payload, pdf)
+    assert scanned_ocr == [2, 4]
+    assert [p["page"] for p in payload["pages"]] == [1, 2, 3, 4]
+    assert payload["pending_pages"] == [] and payload["text_complete"]
+    full = extract_text.extract_pdf(str(pdf), dpi=72, mode="hybrid").text
+    assert payload["text"] == full
+    expected = classify_text_rules(full)
+    assert (payload["label"], payload["score"], payload["evidence"]) == (
+        expected.label, expected.score, expected.evidence
+    )
+    assert payload["score"] != early.score and payload["rules_version"] == RULES_VERSION
+    assert not complete_payload(payload, pdf)
+
+
+def test_concurrent_page_ocr_keeps_order_and_bounds_in_flight():
+    import time
+
+    produced, started = [], []
+
+    def jobs():
+        for n in range(1, 13):
+            produced.append(n)
+            yield n, n, None
+
+    def slow_ocr(rasters):
+        started.extend(rasters)
+        time.sleep(0.03 if rasters[0] % 3 == 0 else 0.001)  # paginas con demoras desparejas
+        return [f"pagina {n}" for n in rasters]
+
+    consumed = []
+    for page_num, source, text, raster in extract_text._ocr_pages(jobs(), workers=3, ocr_batch=slow_ocr):
+        assert len(produced) - len(consumed) <= 3 * 2
+        consumed.append((page_num, source, text))
+    assert consumed == [(n, "ocr", f"pagina {n}") for n in range(1, 13)]
+    assert sorted(started) == list(range(1, 13))
+
+
+def test_closing_page_ocr_early_cancels_pending_pages():
+    import threading
+    import time
+
+    started = []
+    lock = threading.Lock()
+
+    def slow_ocr(rasters):
+        with lock:
+            started.extend(rasters)
+        time.sleep(0.05)
+        return [str(n) for n in rasters]
+
+    pages = extract_text._ocr_pages(((n, n, None) for n in range(1, 41)), workers=2, ocr_batch=slow_ocr)
+    assert [next(pages)[0], next(pages)[0]] == [1, 2]
+    pages.close()
+    time.sleep(0.2)
+    # al cerrar, las 2 consumidas y las 2 que ocupaban los workers; las encoladas se cancelan
+    assert sorted(started) == [1, 2, 3, 4]
@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src import main
+from src.corpus_store import FileStore
+from src.manifest import Manifest
+
+
+def fake_process_pdf(pdf, out_dir, json_dir_name, echo_text=False, sha256=None):
+    stats = main._new_stats(pdf)
+    stats["sha256"] = sha256
+    stats["label"], stats["score"], stats["pages"] = "Contratos", 0.5, 1
+    stats["payload"] = {"file": pdf.name, "text": pdf.read_text(), "label": "Contratos", "score": 0.5, "pages": [{}]}
+    return stats
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    calls = []
+
+    def process_pdf(pdf, *args):
+        calls.append(pdf.name)
+        return fake_process_pdf(pdf, *args)
+
+    monkeypatch.setattr(main, "process_pdf", process_pdf)
+    monkeypatch.setattr(main, "DEDUP", True)
+    monkeypatch.setattr(main, "PLACEMENT_MODE", "copy")
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    in_dir.mkdir()
+    (out_dir / "classified" / "Contratos").mkdir(parents=True)
+    manifest = Manifest(out_dir / "manifest.sqlite")
+    store = FileStore(out_dir / "json")
+
+    def run(pdfs, **kwargs):
+        calls.clear()
+        return main.run_batch(pdfs, out_dir, "json", manifest, store, **kwargs)
+
+    run.calls, run.in_dir, run.store = calls, in_dir, store
+    yield run
+    store.close()
+    manifest.close()
+
+
+def test_force_reprocesses_duplicates_of_previous_runs(batch):
+    a, b = batch.in_dir / "a.pdf", batch.in_dir / "b.pdf"
+    a.write_text("mismo contenido")
+    b.write_text("mismo contenido")
+    batch([a])
+    assert batch.calls == ["a.pdf"]
+
+    (stats,) = batch([b])
+    assert batch.calls == [] and stats["deduplicated"]
+    assert batch.store.get("b")["duplicate_of"] == "a.pdf"
+
+    (stats,) = batch([b], reuse_previous=False)
+    assert batch.calls == ["b.pdf"] and not stats["deduplicated"]
+    assert "duplicate_of" not in batch.store.get("b")
+
+    # dentro de la misma corrida se sigue procesando una sola vez
+    results = batch([a, b], reuse_previous=False)
+    assert batch.calls == ["a.pdf"]
+    assert [r["deduplicated"] for r in results] == [False, True]
+
+
+def fake_process(pdf, out_dir, json_dir_name, echo_text=False, sha256=None):
+    content = pdf.read_text()
+    if content == "crash":
+        raise RuntimeError("worker caido")  # fuera del contrato de _process_pdf
+    if content == "boom":
+        stats = main._new_stats(pdf)
+        stats["error"] = "pdf roto"
+        return stats
+    return fake_process_pdf(pdf, out_dir, json_dir_name, echo_text, sha256)
+
+
+def _comparable(results):
+    keys = ("file", "label", "score", "pages", "deduplicated", "error")
+    return sorted(tuple(r[k] for k in keys) for r in results)
+
+
+def _run(tmp_path, pdfs, workers):
+    out_dir = tmp_path / f"out{workers}"
+    (out_dir / "classified" / "Contratos").mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(out_dir / "manifest.sqlite")
+    store = FileStore(out_dir / "json")
+    results = main.run_batch(pdfs, out_dir, "json", manifest, store, workers=workers)
+    store.close()
+    manifest.close()
+    return results, sorted(p.name for p in (out_dir / "json").iterdir())
+
+
+@pytest.fixture
+def pool_pdfs(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "_process_pdf", fake_process)
+    monkeypatch.setattr(main, "PLACEMENT_MODE", "copy")
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+
+    def make(contents):
+        pdfs = []
+        for i, content in enumerate(contents):
+            pdf = in_dir / f"doc{i}.pdf"
+            pdf.write_text(content)
+            pdfs.append(pdf)
+        return pdfs
+
+    return make
+
+
+def test_pool_results_match_sequential(tmp_path, pool_pdfs):
+    pdfs = pool_pdfs([f"contenido {i}" if i != 3 else "boom" for i in range(7)])
+    sequential, seq_files = _run(tmp_path, pdfs, 1)
+    pooled, pool_files = _run(tmp_path, pdfs, 3)
+    assert _comparable(pooled) == _comparable(sequential)
+    assert [r["file"] for r in pooled if r["error"]] == ["doc3.pdf"]
+    assert pool_files == seq_files == [f"doc{i}.json" for i in range(7) if i != 3]
+
+
+def test_pool_isolates_exception_in_worker(tmp_path, pool_pdfs):
+    pdfs = pool_pdfs([f"contenido {i}" if i != 2 else "crash" for i in range(6)])
+    results, files = _run(tmp_path, pdfs, 2)
+    assert len(results) == 6
+    (failed,) = [r for r in results if r["error"]]
+    assert failed["file"] == "doc2.pdf" and "worker caido" in failed["error"]
+    assert files == [f"doc{i}.json" for i in range(6) if i != 2]
+
+
+def dying_process(pdf, out_dir, json_dir_name, echo_text=False, sha256=None):
+    if pdf.read_text() == "exit":
+        os._exit(1)  # el proceso worker muere y rompe el pool
+    return fake_process(pdf, out_dir, json_dir_name, echo_text, sha256)
+
+
+def test_broken_external_pool_is_raised_for_the_owner_to_recreate(tmp_path, pool_pdfs, monkeypatch):
+    monkeypatch.setattr(main, "_process_pdf", dying_process)
+    pdfs = pool_pdfs(["exit", "contenido 1", "contenido 2"])
+    out_dir = tmp_path / "out"
+    (out_dir / "classified" / "Contratos").mkdir(parents=True)
+    manifest = Manifest(out_dir / "manifest.sqlite")
+    store = FileStore(out_dir / "json")
+    done = []
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool, pytest.raises(BrokenProcessPool):
+            main.run_batch(pdfs, out_dir, "json", manifest, store, 1, False, pool, on_done=done.append)
+        assert not [s for s in done if s["error"]]
+
+        # con pool propio la caida se aisla como error de los documentos afectados
+        results = main.run_batch(pdfs, out_dir, "json", manifest, store, workers=2, reuse_previous=False)
+        assert "doc0.pdf" in [r["file"] for r in results if r["error"]]
+    finally:
+        store.close()
+        manifest.close()
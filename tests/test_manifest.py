@@ -0,0 +1,52 @@
+import os
+
+from src.manifest import Manifest, file_sha256
+
+
+def _setup(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 contenido")
+    json_path = tmp_path / "doc.json"
+    json_path.write_text("{}", encoding="utf-8")
+    return Manifest(tmp_path / "manifest.sqlite"), pdf, json_path
+
+
+def test_done_document_is_up_to_date(tmp_path):
+    manifest, pdf, json_path = _setup(tmp_path)
+    assert not manifest.is_up_to_date(pdf, "tesseract", json_path)
+    manifest.record(pdf, "tesseract", {"sha256": file_sha256(pdf), "label": "Contratos"})
+    assert manifest.is_up_to_date(pdf, "tesseract", json_path)
+    assert not manifest.is_up_to_date(pdf, "vision", json_path)
+
+
+def test_failed_or_missing_json_is_reprocessed(tmp_path):
+    manifest, pdf, json_path = _setup(tmp_path)
+    manifest.record(pdf, "tesseract", {"sha256": file_sha256(pdf), "error": "boom"})
+    assert not manifest.is_up_to_date(pdf, "tesseract", json_path)
+    manifest.record(pdf, "tesseract", {"sha256": file_sha256(pdf)})
+    json_path.unlink()
+    assert not manifest.is_up_to_date(pdf, "tesseract", json_path)
+
+
+def test_touched_file_with_same_content_is_up_to_date(tmp_path):
+    manifest, pdf, json_path = _setup(tmp_path)
+    manifest.record(pdf, "tesseract", {"sha256": file_sha256(pdf)})
+    st = pdf.stat()
+    os.utime(pdf, (st.st_atime, st.st_mtime + 10))
+    assert manifest.is_up_to_date(pdf, "tesseract", json_path)
+    pdf.write_bytes(b"%PDF-1.4 contenidX")
+    os.utime(pdf, (st.st_atime, st.st_mtime + 20))
+    assert not manifest.is_up_to_date(pdf, "tesseract", json_path)
+
+
+def test_find_done_by_sha256_ignores_same_path_and_failures(tmp_path):
+    manifest, pdf, _ = _setup(tmp_path)
+    copy = tmp_path / "copia.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    sha = file_sha256(pdf)
+    manifest.record(copy, "tesseract", {"sha256": sha, "error": "boom"})
+    assert manifest.find_done_by_sha256(sha, "tesseract", exclude=pdf) is None
+    manifest.record(pdf, "tesseract", {"sha256": sha, "label": "Contratos"})
+    assert manifest.find_done_by_sha256(sha, "tesseract", exclude=pdf) is None
+    assert manifest.find_done_by_sha256(sha, "tesseract", exclude=copy)["label"] == "Contratos"
+    assert manifest.find_done_by_sha256(sha, "vision", exclude=copy) is None
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src import metrics
+
+
+def test_stage_is_noop_without_active_metrics():
+    with metrics.stage("ocr"):
+        pass
+    assert metrics.current() is None
+
+
+def test_stages_are_attributed_to_doc_and_page_across_threads():
+    doc = metrics.DocMetrics("a.pdf")
+    with metrics.recording(doc):
+        with metrics.stage("render", page=1):
+            pass
+
+        def work(page_num):
+            with metrics.page(page_num):
+                with metrics.stage("ocr"):
+                    pass
+                metrics.count("pages")
+
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(metrics.bind(work), [1, 2]))
+
+    data = doc.to_dict()
+    assert set(data["stages"]) == {"render", "ocr"}
+    assert data["counters"] == {"pages": 2}
+    assert [p["page"] for p in data["page_stages"]] == [1, 2]
+    assert set(data["page_stages"][0]) == {"page", "render", "ocr"}
+
+
+def test_write_prometheus_aggregates_docs(tmp_path):
+    path = tmp_path / "pipeline.prom"
+    docs = [
+        {"stages": {"ocr": 1.5}, "counters": {"pages": 2}, "error": None},
+        {"stages": {"ocr": 0.5}, "counters": {"pages": 1}, "error": "boom"},
+    ]
+    metrics.write_prometheus(path, docs, elapsed=3.0)
+    text = path.read_text(encoding="utf-8")
+    assert "clasificador_documents 2" in text
+    assert "clasificador_document_errors 1" in text
+    assert 'clasificador_stage_seconds{stage="ocr"} 2.000000' in text
+    assert 'clasificador_counter{name="pages"} 3' in text
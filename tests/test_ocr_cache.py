@@ -0,0 +1,82 @@
+import hashlib
+import sqlite3
+
+from src.ocr_cache import OcrCache, cache_key
+
+
+def _stored_bytes(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        tracked = conn.execute("SELECT value FROM ocr_cache_meta WHERE name = 'bytes'").fetchone()[0]
+    finally:
+        conn.close()
+    return total, tracked
+
+
+def test_get_put_counts_hits_and_misses(tmp_path):
+    cache = OcrCache(tmp_path / "cache.sqlite", max_bytes=1024)
+    key = cache_key(hashlib.sha256(b"page").hexdigest(), "tesseract", 300, {"psm": "6"})
+    assert cache.get(key) is None
+    cache.put(key, "hola")
+    assert cache.get(key) == "hola"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_engine_dpi_and_params():
+    digest = hashlib.sha256(b"page").hexdigest()
+    base = cache_key(digest, "tesseract", 300, {"psm": "6"})
+    assert base != cache_key(digest, "vision", 300, {"psm": "6"})
+    assert base != cache_key(digest, "tesseract", 200, {"psm": "6"})
+    assert base != cache_key(digest, "tesseract", 300, {"psm": "4"})
+    assert base == cache_key(digest, "tesseract", 300, {"psm": "6"})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = OcrCache(tmp_path / "cache.sqlite", max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")  # "b" queda como el menos usado (el hit se escribe en el siguiente put)
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    cache.close()
+    total, tracked = _stored_bytes(tmp_path / "cache.sqlite")
+    assert total == tracked <= 10
+
+
+def test_running_total_survives_replace_reopen_and_other_processes(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    a, b = OcrCache(path, max_bytes=1000), OcrCache(path, max_bytes=1000)
+    a.put("x", "12345")
+    b.put("y", "123")
+    a.put("x", "1")  # reemplazo: resta el tamano anterior
+    a.close()
+    b.close()
+    assert _stored_bytes(path) == (4, 4)
+
+    # un cache sin la tabla meta (version anterior) calcula el total al abrir
+    conn = sqlite3.connect(str(path))
+    conn.execute("DROP TABLE ocr_cache_meta")
+    conn.commit()
+    conn.close()
+    OcrCache(path, max_bytes=1000).close()
+    assert _stored_bytes(path) == (4, 4)
+
+
+def test_hits_update_last_used_in_batches(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = OcrCache(path, max_bytes=1000)
+    cache.TOUCH_BATCH = 2
+    cache.put("a", "a")
+    cache.put("b", "b")
+    conn = sqlite3.connect(str(path))
+    before = dict(conn.execute("SELECT key, last_used FROM ocr_cache"))
+    cache.get("a")
+    assert dict(conn.execute("SELECT key, last_used FROM ocr_cache")) == before
+    cache.get("b")
+    after = dict(conn.execute("SELECT key, last_used FROM ocr_cache"))
+    assert after["a"] > before["a"] and after["b"] > before["b"]
+    conn.close()
+    cache.close()
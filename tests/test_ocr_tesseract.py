@@ -0,0 +1,206 @@
+import json
+
+import numpy as np
+import pytesseract
+import pytest
+from PIL import Image
+
+from benchmarks.synthetic import synthetic_text_page
+from src.ocr_tesseract import (
+    _binarize,
+    _estimate_skew_angle,
+    _estimate_skew_angle_projection,
+    ocr_images_tesseract,
+    preprocess_image,
+    preprocess_params,
+    text_and_confidence,
+)
+
+
+@pytest.mark.parametrize("skew", [-4.0, -1.5, 0.0, 0.5, 3.0])
+def test_projection_estimator_matches_rotate_estimator(skew):
+    page = synthetic_text_page(skew, width=600, height=800, seed=1)
+    rotate = _estimate_skew_angle(_binarize(page, 180), 5, 0.5)
+    projection = _estimate_skew_angle_projection(np.asarray(page) <= 180, 5, 0.5)
+    assert projection == pytest.approx(-skew, abs=0.5)
+    assert projection == pytest.approx(rotate, abs=0.5)
+
+
+def test_projection_estimator_handles_blank_page():
+    ink = np.zeros((100, 80), dtype=bool)
+    assert _estimate_skew_angle_projection(ink, 5, 0.5) == 0.0
+    assert _estimate_skew_angle_projection(ink, 0, 0.5) == 0.0
+
+
+def test_binarize_matches_point_threshold():
+    gray = Image.fromarray(np.arange(256, dtype=np.uint8).reshape(16, 16))
+    expected = gray.point(lambda p: 255 if p > 180 else 0)
+    assert np.array_equal(np.asarray(_binarize(gray, 180)), np.asarray(expected))
+
+
+def test_deskew_method_is_selectable(monkeypatch):
+    monkeypatch.delenv("TESSERACT_DESKEW_METHOD", raising=False)
+    assert preprocess_params()["deskew_method"] == "rotate"
+    monkeypatch.setenv("TESSERACT_DESKEW_METHOD", "projection")
+    assert preprocess_params()["deskew_method"] == "projection"
+    monkeypatch.setenv("TESSERACT_DESKEW_METHOD", "bogus")
+    assert preprocess_params()["deskew_method"] == "rotate"
+
+    page = synthetic_text_page(2.0, width=400, height=500).convert("RGB")
+    processed = preprocess_image(page)
+    assert processed.mode == "L"
+
+
+def test_text_and_confidence_rebuilds_lines_and_averages_words():
+    data = {
+        "page_num": [1, 1, 1, 1, 1, 1],
+        "block_num": [1, 1, 1, 1, 2, 2],
+        "par_num": [0, 1, 1, 1, 1, 1],
+        "line_num": [0, 1, 1, 2, 1, 1],
+        "text": ["", "contrato", "de", "trabajo", "firma", " "],
+        "conf": [-1, 90, 80, "70", 60.0, -1],
+    }
+    text, confidence = text_and_confidence(data)
+    assert text == "contrato de\ntrabajo\n\nfirma"
+    assert confidence == 75.0
+    assert text_and_confidence({"text": [], "conf": []}) == ("", None)
+
+
+def _fake_tesseract(tmp_path, monkeypatch, body):
+    # _configure_tesseract_cmd cambia el global de pytesseract: se restaura al final del test
+    monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", pytesseract.pytesseract.tesseract_cmd)
+    script = tmp_path / "tesseract"
+    script.write_text("#!/bin/sh\n" + body, encoding="utf-8")
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_batch_runs_one_tesseract_process_and_splits_pages(tmp_path, monkeypatch):
+    calls = tmp_path / "calls"
+    # una linea de salida por imagen de la lista, separadas por \f como el renderer txt
+    cmd = _fake_tesseract(
+        tmp_path,
+        monkeypatch,
+        f'echo "$@" >> {calls}\n'
+        'while read -r img; do printf "texto %s\\n\\f" "$(basename "$img")"; done < "$1"\n',
+    )
+    monkeypatch.setenv("TESSERACT_CMD", cmd)
+    pages = [synthetic_text_page(0, width=200, height=260, seed=i) for i in range(3)]
+    assert ocr_images_tesseract(pages, lang="spa") == [
+        "texto page_0000.png",
+        "texto page_0001.png",
+        "texto page_0002.png",
+    ]
+    args = calls.read_text(encoding="utf-8").splitlines()
+    assert len(args) == 1
+    assert args[0].split()[1:4] == ["stdout", "-l", "spa"]
+
+
+def test_batch_errors_raise_tesseract_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("TESSERACT_CMD", _fake_tesseract(tmp_path, monkeypatch, 'echo "sin idioma" >&2\nexit 1\n'))
+    pages = [synthetic_text_page(0, width=100, height=100, seed=i) for i in range(2)]
+    with pytest.raises(pytesseract.TesseractError):
+        ocr_images_tesseract(pages)
+
+
+@pytest.fixture
+def adaptive(tmp_path, monkeypatch):
+    """extract_pdf con OCR_ADAPTIVE_DPI (36 -> 72 DPI), cache en tmp_path e image_to_data stub."""
+    import fitz
+
+    from src import extract_text
+    from src.ocr_cache import OcrCache
+
+    for name, value in {
+        "OCR_ENGINE": "tesseract", "OCR_ADAPTIVE_DPI": True, "OCR_DPI_LOW": 36, "OCR_MIN_CONFIDENCE": 70,
+        "OCR_MIN_CHARS": 10, "BLANK_PAGE_FILTER": False, "OCR_PAGE_WORKERS_TESSERACT": 1, "OCR_CACHE": True,
+        "_cache": OcrCache(tmp_path / "ocr_cache.sqlite", 1024 * 1024),
+    }.items():
+        monkeypatch.setattr(extract_text, name, value)
+    monkeypatch.setenv("TESSERACT_DESKEW", "0")
+
+    pdf = tmp_path / "escaneado.pdf"
+    doc = fitz.open()
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 40, 40), False)
+    pix.clear_with(120)
+    doc.new_page(width=200, height=300).insert_image(fitz.Rect(20, 20, 180, 280), pixmap=pix)
+    doc.save(str(pdf))
+    doc.close()
+
+    calls = []
+
+    def stub(confidence_at):
+        def image_to_data(image, **kwargs):
+            dpi = 36 if image.width <= 100 else 72
+            calls.append(dpi)
+            text, conf = confidence_at[dpi]
+            words = text.split()
+            ones = [1] * len(words)
+            return {"page_num": ones, "block_num": ones, "par_num": ones, "line_num": ones,
+                    "text": words, "conf": [conf] * len(words)}
+
+        monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+        calls.clear()
+        return calls
+
+    def run():
+        return extract_text.extract_pdf(str(pdf), dpi=72, mode="hybrid")
+
+    def cached(dpi):
+        from src.ocr_cache import cache_key
+        from src.ocr_tesseract import ocr_params
+        from src.pdf_utils import pdf_pages_as_rasters
+
+        (raster,) = pdf_pages_as_rasters(str(pdf), dpi=dpi)
+        key = cache_key(raster.digest(), "tesseract-data", dpi, ocr_params(extract_text.TESSERACT_LANG))
+        return extract_text._cache.get(key)
+
+    yield stub, run, cached
+    extract_text._cache.close()
+
+
+def test_needs_more_dpi_thresholds(monkeypatch):
+    from src import extract_text
+
+    monkeypatch.setattr(extract_text, "OCR_MIN_CONFIDENCE", 70)
+    monkeypatch.setattr(extract_text, "OCR_MIN_CHARS", 10)
+    assert not extract_text._needs_more_dpi("contrato de trabajo", 80.0)
+    assert extract_text._needs_more_dpi("contrato de trabajo", 69.9)
+    assert extract_text._needs_more_dpi("contrato", 95.0)
+    assert extract_text._needs_more_dpi("contrato de trabajo", None)
+
+
+def test_adaptive_dpi_keeps_confident_low_dpi_page(adaptive):
+    stub, run, cached = adaptive
+    calls = stub({36: ("contrato de trabajo indefinido", 92), 72: ("no deberia usarse", 99)})
+    (page,) = run().pages
+    assert calls == [36]
+    assert (page.source, page.dpi, page.confidence) == ("ocr", 36, 92.0)
+    assert json.loads(cached(36)) == {"text": "contrato de trabajo indefinido", "confidence": 92.0}
+    assert cached(72) is None
+
+
+def test_adaptive_dpi_escalates_low_confidence_page(adaptive):
+    stub, run, cached = adaptive
+    calls = stub({36: ("c0ntrat0 d3 trabaj0", 41), 72: ("contrato de trabajo indefinido", 88)})
+    result = run()
+    (page,) = result.pages
+    assert calls == [36, 72]
+    assert (page.dpi, page.confidence) == (72, 88.0)
+    assert result.text.endswith("contrato de trabajo indefinido")
+    assert json.loads(cached(36))["confidence"] == 41.0
+    assert json.loads(cached(72))["confidence"] == 88.0
+
+    # segunda corrida: ambas resoluciones salen del cache "tesseract-data"
+    calls.clear()
+    assert run().pages[0].dpi == 72 and calls == []
+
+
+def test_adaptive_dpi_keeps_low_dpi_when_retry_is_worse(adaptive):
+    stub, run, cached = adaptive
+    calls = stub({36: ("contrato de trabajo indefinido", 60), 72: ("c0ntrat0 d3 trabaj0 1ndef1n1d0", 40)})
+    result = run()
+    (page,) = result.pages
+    assert calls == [36, 72]
+    assert (page.dpi, page.confidence) == (36, 60.0)
+    assert result.text.endswith("contrato de trabajo indefinido")
@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from google.api_core import exceptions as gexc
+
+import src.ocr_vision as ocr_vision
+from benchmarks.fake_vision import FakeAnnotator
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    annotator = FakeAnnotator()
+    # monkeypatch restaura el cliente del modulo al terminar: el falso no se filtra a otros tests
+    monkeypatch.setattr(ocr_vision, "_client", annotator)
+    monkeypatch.setattr(ocr_vision, "_client_pid", os.getpid())
+    monkeypatch.setattr(ocr_vision, "_sleep", lambda seconds: None)
+    monkeypatch.setattr(ocr_vision, "_in_flight", None)
+    return annotator
+
+
+def test_pages_are_grouped_into_batches(fake):
+    images = [f"pagina {i}".encode() for i in range(20)]
+    texts = ocr_vision.ocr_images_vision(images, batch_size=8)
+    assert texts == [f"pagina {i}" for i in range(20)]
+    assert fake.calls == 3
+
+
+def test_batch_size_is_capped_by_api_limit(fake):
+    ocr_vision.ocr_images_vision([b"x"] * 40, batch_size=100)
+    assert fake.calls == 3
+
+
+def test_transient_rpc_errors_are_retried(fake):
+    fake.fail_calls = 2
+    assert ocr_vision.ocr_image_bytes_vision(b"hola") == "hola"
+    assert fake.calls == 3
+
+
+def test_retries_give_up_after_max(fake, monkeypatch):
+    monkeypatch.setenv("VISION_MAX_RETRIES", "1")
+    fake.fail_calls = 5
+    with pytest.raises(gexc.ResourceExhausted):
+        ocr_vision.ocr_image_bytes_vision(b"hola")
+    assert fake.calls == 2
+
+
+def test_only_failed_images_are_resent(fake):
+    fake.image_errors = {b"b": 1}
+    assert ocr_vision.ocr_images_vision([b"a", b"b", b"c"]) == ["a", "b", "c"]
+    assert fake.calls == 2
+    assert fake.images == 4
+
+
+def test_in_flight_requests_are_capped(fake, monkeypatch):
+    monkeypatch.setenv("VISION_MAX_IN_FLIGHT", "2")
+    fake.latency = 0.02
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(ocr_vision.ocr_image_bytes_vision, [b"p"] * 16))
+    assert fake.max_in_flight <= 2
@@ -0,0 +1,70 @@
+from io import BytesIO
+
+import fitz
+import numpy as np
+from PIL import Image
+
+from src.pdf_utils import ink_stats, is_blank_page, pdf_pages_as_png_bytes, pdf_pages_as_rasters
+
+
+def _make_pdf(path):
+    doc = fitz.open()
+    for i in range(2):
+        page = doc.new_page(width=200, height=300)
+        page.insert_text((20, 40 + i * 20), f"pagina {i + 1}", fontsize=14)
+    doc.save(str(path))
+    doc.close()
+
+
+def test_rasters_match_png_render_in_grayscale(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    _make_pdf(pdf)
+    rasters = list(pdf_pages_as_rasters(str(pdf), dpi=72))
+    pngs = list(pdf_pages_as_png_bytes(str(pdf), dpi=72))
+    assert [r.page_num for r in rasters] == [n for n, _ in pngs] == [1, 2]
+    for raster, (_, png) in zip(rasters, pngs):
+        expected = np.asarray(Image.open(BytesIO(png)).convert("L")).astype(int)
+        assert raster.image().mode == "L"
+        assert raster.array().shape == expected.shape
+        assert np.abs(raster.array().astype(int) - expected).max() <= 2
+        assert np.array_equal(np.asarray(Image.open(BytesIO(raster.png_bytes()))), raster.array())
+
+
+def test_digest_depends_on_content(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    _make_pdf(pdf)
+    first, second = pdf_pages_as_rasters(str(pdf), dpi=72)
+    again = next(pdf_pages_as_rasters(str(pdf), dpi=72))
+    assert first.digest() == again.digest()
+    assert first.digest() != second.digest()
+
+
+def _scanned_page(doc, gray):
+    buf = BytesIO()
+    Image.fromarray(gray).save(buf, format="PNG")
+    page = doc.new_page(width=595, height=842)
+    page.insert_image(page.rect, stream=buf.getvalue())
+
+
+def test_blank_prefilter_skips_noisy_paper_but_keeps_a_single_word():
+    doc = fitz.open()
+    rng = np.random.default_rng(0)
+    paper = np.full((1754, 1240), 235, dtype=np.uint8)
+    paper[rng.random(paper.shape) < 0.01] = 0  # motas de escaner
+    _scanned_page(doc, paper)
+    doc.new_page(width=595, height=842).insert_text((60, 100), "ANEXO", fontsize=12)
+    doc.new_page(width=595, height=842)
+
+    noisy_blank, word, empty = doc
+    assert is_blank_page(noisy_blank)
+    assert not is_blank_page(word)
+    assert is_blank_page(empty)
+
+
+def test_ink_stats_is_relative_to_paper_and_ignores_margins():
+    gray = np.full((100, 100), 200, dtype=np.uint8)  # papel gris
+    gray[:, :2] = 0  # borde del escaner
+    assert ink_stats(gray, ink_delta=60) == (0.0, 0.0)
+    gray[40:60, 40:60] = 50
+    ink, std = ink_stats(gray, ink_delta=60)
+    assert 0.04 < ink < 0.05 and std > 0
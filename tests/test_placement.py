@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from src.placement import place_file
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "in" / "doc.pdf"
+    path.parent.mkdir()
+    path.write_bytes(b"%PDF-1.4 contenido")
+    return path
+
+
+@pytest.mark.parametrize("mode", ["copy", "hardlink", "symlink", "auto"])
+def test_place_file_replaces_destination(tmp_path, pdf, mode):
+    dest = tmp_path / "classified" / "doc.pdf"
+    dest.parent.mkdir()
+    dest.write_bytes(b"version anterior")
+    used = place_file(pdf, dest, mode)
+    assert dest.read_bytes() == pdf.read_bytes()
+    assert [p.name for p in dest.parent.iterdir()] == ["doc.pdf"]
+    if used == "hardlink":
+        assert os.path.samefile(dest, pdf)
+    if mode == "symlink":
+        assert used == "symlink" and dest.is_symlink()
+
+
+def test_unavailable_mode_falls_back_to_copy(tmp_path, pdf, monkeypatch):
+    def no_link(src, dst):
+        raise OSError("EXDEV")
+
+    monkeypatch.setattr(os, "link", no_link)
+    dest = tmp_path / "doc.pdf"
+    assert place_file(pdf, dest, "hardlink") == "copy"
+    assert dest.read_bytes() == pdf.read_bytes() and not os.path.samefile(dest, pdf)
@@ -0,0 +1,108 @@
+import json
+
+from src import process_json
+from src.classifier_rules import RULES_VERSION, classify_text_rules, rules_fingerprint
+from src.corpus_store import SqliteStore
+
+
+def test_fingerprint_changes_with_any_table():
+    base = rules_fingerprint()
+    assert base == RULES_VERSION
+    assert rules_fingerprint(threshold=0.2) != base
+    assert rules_fingerprint(weights={}) != base
+    assert rules_fingerprint(overrides=[]) != base
+
+
+def _env(monkeypatch, tmp_path, backend):
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setenv("JSON_DIR_NAME", "json")
+    monkeypatch.setenv("STORE_BACKEND", backend)
+
+
+def _run(capsys, *argv):
+    process_json.main(["--workers", "1", *argv])
+    return capsys.readouterr().out
+
+
+def test_only_stale_documents_are_reevaluated_and_rewritten(tmp_path, monkeypatch, capsys):
+    _env(monkeypatch, tmp_path, "files")
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    text = "contrato de trabajo entre empleador y trabajador"
+    current = classify_text_rules(text)
+    (json_dir / "old.json").write_text(json.dumps({"text": text, "label": "Cartas"}), encoding="utf-8")
+    same = {"text": text, "label": current.label, "score": current.score, "evidence": current.evidence}
+    (json_dir / "same.json").write_text(json.dumps(same), encoding="utf-8")
+    before = (json_dir / "same.json").read_bytes()
+
+    out = _run(capsys)
+    assert "Reevaluados: 2 de 2" in out and "reescritos: 1" in out
+    assert "- Cartas -> Contratos: 1" in out
+    assert json.loads((json_dir / "old.json").read_text(encoding="utf-8"))["rules_version"] == RULES_VERSION
+    assert (json_dir / "same.json").read_bytes() == before
+    diff = (tmp_path / "json_classification_diff.tsv").read_text(encoding="utf-8").splitlines()
+    assert diff[1].startswith("old.json\tCartas\tContratos")
+
+    assert "Reevaluados: 0 de 2" in _run(capsys)
+    assert "Reevaluados: 2 de 2" in _run(capsys, "--force")
+
+
+def test_sqlite_backend_filters_by_rules_version(tmp_path, monkeypatch, capsys):
+    _env(monkeypatch, tmp_path, "sqlite")
+    store = SqliteStore(tmp_path / "json.sqlite")
+    store.put("a", {"text": "finiquito por termino de contrato", "label": None, "rules_version": "viejo"})
+    store.put("b", {"text": "certificado", "label": "Certificados", "rules_version": RULES_VERSION})
+    store.close()
+
+    out = _run(capsys)
+    assert "Reevaluados: 1 de 2" in out
+    assert SqliteStore(tmp_path / "json.sqlite").get("a")["label"] == "Finiquitos"
+
+
+def test_incremental_run_keeps_full_summary_and_totals(tmp_path, monkeypatch, capsys):
+    _env(monkeypatch, tmp_path, "files")
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    for name, text in (("a", "contrato de trabajo entre empleador y trabajador"), ("b", "finiquito")):
+        (json_dir / f"{name}.json").write_text(json.dumps({"text": text}), encoding="utf-8")
+    summary = tmp_path / "json_classification.txt"
+
+    _run(capsys)
+    first = summary.read_text(encoding="utf-8")
+    assert [line.split("\t")[0] for line in first.splitlines()] == ["a.json", "b.json"]
+
+    out = _run(capsys)
+    assert "Reevaluados: 0 de 2" in out
+    assert summary.read_text(encoding="utf-8") == first
+    assert "- Contratos: 1" in out
+
+    # un JSON reescrito despues del resumen (p.ej. por src.main) se lee del store
+    payload = json.loads((json_dir / "b.json").read_text(encoding="utf-8"))
+    payload["label"], payload["score"] = "Cartas", 0.9
+    (json_dir / "b.json").write_text(json.dumps(payload), encoding="utf-8")
+    _run(capsys)
+    assert summary.read_text(encoding="utf-8").splitlines()[1] == "b.json\tCartas\t0.90"
+
+
+def test_index_gets_missing_documents_and_drops_deleted_ones(tmp_path, monkeypatch, capsys):
+    from src.search_index import open_index
+
+    _env(monkeypatch, tmp_path, "files")
+    monkeypatch.setenv("SEARCH_INDEX", "1")
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    for name, text in (("a", "contrato de trabajo"), ("b", "finiquito"), ("c", "certificado")):
+        (json_dir / f"{name}.json").write_text(json.dumps({"text": text}), encoding="utf-8")
+    _run(capsys)
+
+    # "b" quedo al dia con las reglas pero falta en el indice; "c" se borro
+    index = open_index(tmp_path, "json")
+    index.remove("b")
+    index.close()
+    (json_dir / "c.json").unlink()
+
+    assert "Reevaluados: 0 de 2" in _run(capsys)
+    index = open_index(tmp_path, "json")
+    assert index.names() == {"a", "b"}
+    assert [r["file"] for r in index.search("finiquito")] == ["b"]
+    index.close()
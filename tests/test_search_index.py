@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from benchmarks.corpus import page_text
+from src.classifier_rules import KEYWORDS, classify_text_rules
+from src.search_index import SearchIndex, parse_query, pattern_phrases
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = SearchIndex(tmp_path / "json.index.sqlite")
+    yield idx
+    idx.close()
+
+
+def test_pattern_phrases_expand_classes_and_reject_regex_syntax():
+    assert pattern_phrases(r"\bcl[aá]usula\b") == [("clausula",), ("cláusula",)]
+    assert pattern_phrases(r"\bCONTRATO de trabajo\b") == [("contrato", "de", "trabajo")]
+    assert pattern_phrases(r"\bseñor\(a\)\b") is None
+    assert pattern_phrases(r"\bfoo\s+bar\b") is None
+
+
+def test_evidence_from_postings_matches_regex_classifier(index):
+    rng = random.Random(7)
+    labels = list(KEYWORDS)
+    extras = ["Contrato\nde  trabajo", "contrato, de trabajo", "CLÁUSULA", "señor(a)x", "anexo_de contrato", ""]
+    texts = {}
+    for i in range(150):
+        pages = [
+            f"\n--- PAGE {n} ---\n{page_text(rng.choice(labels), rng, words=rng.randint(5, 60))} {rng.choice(extras)}"
+            for n in range(1, rng.randint(1, 3) + 1)
+        ]
+        texts[f"doc{i}"] = "".join(pages)
+        index.add(f"doc{i}", texts[f"doc{i}"])
+    for name, text in texts.items():
+        expected = classify_text_rules(text)
+        got = index.classify(name)
+        assert (got.label, got.score, sorted(got.evidence)) == (
+            expected.label, expected.score, sorted(expected.evidence)
+        ), name
+
+
+def test_search_words_phrases_and_pages(index):
+    index.add("a", "\n--- PAGE 1 ---\nContrato de trabajo\n--- PAGE 2 ---\nRUT: 12.345.678-9", "Contratos", 0.5)
+    index.add("b", "contrato; de trabajo y otro contrato", "Anexos", 0.3)
+    index.add("c", "trabajo de contrato", "Anexos", 0.1)
+
+    assert parse_query('rut "contrato de trabajo"') == [("rut",), ("contrato", "de", "trabajo")]
+    assert [r["file"] for r in index.search('"contrato de trabajo"')] == ["a", "b"]
+    (hit,) = index.search('"12.345.678-9" contrato')
+    assert hit["file"] == "a" and hit["pages"] == [1, 2]
+    assert [r["file"] for r in index.search("contrato", label="Anexos")] == ["b", "c"]
+    assert index.search("inexistente") == []
+
+
+def test_reindex_replaces_postings(index):
+    assert index.add("a", "texto viejo")
+    assert not index.add("a", "texto viejo", "Cartas", 0.2)
+    assert index.search("viejo")[0]["label"] == "Cartas"
+    assert index.add("a", "texto nuevo")
+    assert index.search("viejo") == []
+    assert [r["file"] for r in index.search("nuevo")] == ["a"]
+    index.remove("a")
+    assert index.search("texto") == [] and len(index) == 0
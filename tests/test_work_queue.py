@@ -0,0 +1,123 @@
+import os
+import time
+from multiprocessing import get_context
+
+import pytest
+
+from src.work_queue import WorkQueue
+
+
+def _pdfs(tmp_path, n):
+    paths = []
+    for i in range(n):
+        path = tmp_path / f"doc{i:02d}.pdf"
+        path.write_bytes(b"%PDF " + bytes([i]))
+        paths.append(path)
+    return paths
+
+
+def _drain(db, node, out):
+    queue = WorkQueue(db, node=node)
+    with queue.heartbeating(0.05):
+        while names := queue.claim(2):
+            for name in names:
+                time.sleep(0.01)
+                assert queue.complete(name, {"label": "X", "pages": 1, "seconds": 0.01})
+                with open(out, "a") as fh:
+                    fh.write(f"{node} {name}\n")
+    queue.close()
+
+
+def test_nodes_split_the_queue_without_repeats(tmp_path):
+    db = tmp_path / "queue.sqlite"
+    queue = WorkQueue(db, node="setup", register=False)
+    assert queue.enqueue(_pdfs(tmp_path, 24)) == 24
+    out = tmp_path / "claims.txt"
+    ctx = get_context("spawn")
+    procs = [ctx.Process(target=_drain, args=(db, f"node{i}", out)) for i in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    names = [line.split()[1] for line in out.read_text().splitlines()]
+    assert sorted(names) == [f"doc{i:02d}.pdf" for i in range(24)]
+    assert queue.counts() == {"done": 24}
+    stats = queue.node_stats()
+    assert {n["node"] for n in stats} == {"node0", "node1", "node2"}
+    assert sum(n["done"] for n in stats) == 24 and sum(n["pages"] for n in stats) == 24
+    queue.close()
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    db = tmp_path / "queue.sqlite"
+    crashed = WorkQueue(db, node="a", lease_seconds=0.05)
+    crashed.enqueue(_pdfs(tmp_path, 1))
+    assert crashed.claim() == ["doc00.pdf"]
+    other = WorkQueue(db, node="b", lease_seconds=10)
+    assert other.claim() == []
+    time.sleep(0.1)
+    assert other.claim() == ["doc00.pdf"]
+    assert not crashed.complete("doc00.pdf", {"seconds": 1})
+    assert other.complete("doc00.pdf", {"label": "X"})
+    by_node = {n["node"]: n for n in other.node_stats()}
+    assert by_node["b"]["reclaimed"] == 1
+    assert (by_node["a"]["done"], by_node["b"]["done"]) == (0, 1)
+    crashed.close()
+    other.close()
+
+
+def test_poison_document_stops_after_max_attempts(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite", lease_seconds=0.01, max_attempts=2)
+    queue.enqueue(_pdfs(tmp_path, 1))
+    assert queue.claim() == ["doc00.pdf"]
+    time.sleep(0.02)
+    assert queue.claim() == ["doc00.pdf"]
+    time.sleep(0.02)
+    assert queue.claim() == []
+    assert queue.counts() == {"error": 1}
+    queue.close()
+
+
+def test_modified_file_is_requeued(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    (pdf,) = _pdfs(tmp_path, 1)
+    queue.enqueue([pdf])
+    queue.complete(queue.claim()[0], {})
+    assert queue.enqueue([pdf]) == 0
+    pdf.write_bytes(b"%PDF otra version")
+    os.utime(pdf, ns=(0, pdf.stat().st_mtime_ns + 1))
+    assert queue.enqueue([pdf]) == 1
+    assert queue.claim() == ["doc00.pdf"]
+    queue.release()
+    assert queue.counts() == {"pending": 1}
+    queue.close()
+
+
+def test_queue_mode_refuses_shared_wal_databases(tmp_path, monkeypatch):
+    from src import config
+
+    out_dir = tmp_path / "out"
+    safe = {
+        "INPUT_DIR": str(tmp_path / "in"), "OUTPUT_DIR": str(out_dir), "STORE_BACKEND": "files",
+        "SEARCH_INDEX": False, "OCR_CACHE": True, "OCR_CACHE_PATH": str(tmp_path / "local" / "ocr.sqlite"),
+    }
+    for name, value in safe.items():
+        monkeypatch.setattr(config, name, value)
+    config.validate_queue()
+
+    for name, value, message in (
+        ("STORE_BACKEND", "sqlite", "STORE_BACKEND"),
+        ("SEARCH_INDEX", True, "SEARCH_INDEX"),
+        ("OCR_CACHE_PATH", "", "OCR_CACHE"),
+        ("OCR_CACHE_PATH", str(out_dir / "ocr_cache.sqlite"), "OCR_CACHE"),
+    ):
+        with monkeypatch.context() as m:
+            m.setattr(config, name, value)
+            with pytest.raises(RuntimeError, match=message):
+                config.validate_queue()
+
+    monkeypatch.setattr(config, "OCR_CACHE", False)
+    monkeypatch.setattr(config, "OCR_CACHE_PATH", "")
+    config.validate_queue()